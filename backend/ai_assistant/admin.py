@@ -5,7 +5,8 @@ from .models import (
     AIFeedback,
     DeFiTerm,
     StrategyExplanation,
-    AIConfiguration
+    AIConfiguration,
+    TokenUsage
 )
 
 @admin.register(Conversation)
@@ -51,4 +52,12 @@ class AIConfigurationAdmin(admin.ModelAdmin):
     list_filter = ('is_active', 'data_type')
     search_fields = ('key', 'description')
     readonly_fields = ('created_at', 'updated_at')
-    list_editable = ('value', 'is_active')
\ No newline at end of file
+    list_editable = ('value', 'is_active')
+
+@admin.register(TokenUsage)
+class TokenUsageAdmin(admin.ModelAdmin):
+    list_display = ('caller', 'day', 'requests', 'prompt_tokens', 'output_tokens', 'total_tokens')
+    list_filter = ('day',)
+    search_fields = ('caller',)
+    readonly_fields = ('updated_at',)
+    date_hierarchy = 'day'
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class AiAssistantConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ai_assistant'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
+
+        # Build the versioned system prompt once at startup, not on first chat
+        from .prompts import get_system_prompt
+        get_system_prompt()
@@ -0,0 +1,188 @@
+"""
+Offline latency and behaviour benchmark for the chat endpoint.
+
+``ChatBenchmark`` starts a ``MockGeminiServer`` with the requested latency
+and failure injection, points a fresh ``AIAssistantService`` at it and
+replays a corpus of chat sessions through ``POST /api/ai_assistant/chat/``
+turn by turn. It reports latency percentiles, prompt tokens sent upstream,
+and how answers were served (API, response cache, FAQ router or fallback).
+Everything runs inside a transaction that is rolled back, and rate limits
+and quotas are lifted for the run, so it is safe against a real database.
+
+A corpus is JSON lines, one session per line::
+
+    {"wallet": "0xabc", "messages": ["Which strategy should I choose?", "And the risk?"]}
+
+Run it with ``manage.py benchmark_assistant``.
+"""
+import json
+import logging
+import math
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.test import Client
+
+from .cache import ResponseCache
+from .client import LLMClient
+from .quotas import MemoryRateLimiter, UsageTracker
+from .testing import MockGeminiServer
+
+logger = logging.getLogger(__name__)
+
+CHAT_URL = '/api/ai_assistant/chat/'
+
+DEFAULT_CORPUS = [
+    {'wallet': '0xbench01', 'messages': ['Which strategy should I choose?', 'What are the risks?', 'How do I switch?']},
+    {'wallet': '0xbench02', 'messages': ['Which strategy should I choose?', 'Is the growth strategy safe?']},
+    {'wallet': '0xbench03', 'messages': ['What is APY?', 'How is it different from APR?']},
+    {'wallet': '0xbench04', 'messages': ['Is Attestify safe?', 'Who audits the contracts?']},
+    {'wallet': '0xbench05', 'messages': ['How do I withdraw my savings?']},
+    {'wallet': '0xbench06', 'messages': ['what is apy', 'Can I lose money?', 'What happens if Moola is hacked?']},
+    {'wallet': '0xbench07', 'messages': ['How do I deposit cUSD?', 'Is there a minimum deposit?']},
+    {'wallet': '0xbench08', 'messages': ['Hello!', 'Explain impermanent loss']},
+]
+
+
+def load_corpus(path):
+    """Read a JSONL corpus of ``{"wallet", "messages"}`` sessions"""
+    sessions = []
+    with open(path, encoding='utf-8') as corpus:
+        for number, line in enumerate(corpus, 1):
+            if not line.strip():
+                continue
+            session = json.loads(line)
+            if not session.get('messages'):
+                raise ValueError(f"{path}:{number}: session has no messages")
+            sessions.append(session)
+    return sessions
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+@contextmanager
+def _patched(target, **attributes):
+    saved = {name: getattr(target, name) for name in attributes}
+    for name, value in attributes.items():
+        setattr(target, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(target, name, value)
+
+
+@contextmanager
+def _environ(**values):
+    saved = {name: os.environ.get(name) for name in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+class _Rollback(Exception):
+    pass
+
+
+class ChatBenchmark:
+    """Replays chat sessions against a mock Gemini server and summarises the run"""
+
+    def __init__(self, corpus=None, latency=0.05, jitter=0.0, failure_rate=0.0, seed=None, repeat=1):
+        self.corpus = corpus or DEFAULT_CORPUS
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self.repeat = repeat
+
+    def run(self):
+        """Replay the corpus and return the report dict"""
+        from . import views
+        from .services import AIAssistantService
+
+        server = MockGeminiServer(
+            chunks=('This is a benchmark answer ', 'from the mock ', 'Gemini server.'),
+            delay=self.latency,
+            jitter=self.jitter,
+            failure_rate=self.failure_rate,
+            seed=self.seed,
+        )
+        client_pool = LLMClient()
+        with server, _environ(GOOGLE_API_KEY='benchmark', GEMINI_API_BASE=server.base_url):
+            service = AIAssistantService(client=client_pool, cache=ResponseCache())
+            unlimited = MemoryRateLimiter(per_minute=0, burst=0)
+            with _patched(views, ai_service=service, usage_tracker=UsageTracker(daily_quota=0),
+                          get_rate_limiter=lambda: unlimited):
+                try:
+                    with transaction.atomic():
+                        latencies, sources = self._replay()
+                        raise _Rollback
+                except _Rollback:
+                    pass
+        client_pool.close()
+        return self._report(latencies, sources, server, service)
+
+    def _replay(self):
+        client = Client()
+        latencies = []
+        sources = Counter()
+        for _ in range(self.repeat):
+            for session in self.corpus:
+                session_id = None
+                for message in session['messages']:
+                    started = time.perf_counter()
+                    response = client.post(
+                        CHAT_URL,
+                        data={'message': message, 'session_id': session_id},
+                        content_type='application/json',
+                        headers={'x-wallet-address': session.get('wallet', '')},
+                    )
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    if response.status_code != 200:
+                        sources[f"http_{response.status_code}"] += 1
+                        break
+                    body = response.json()
+                    session_id = body['session_id']
+                    sources[body['source']] += 1
+        return latencies, sources
+
+    def _report(self, latencies, sources, server, service):
+        turns = len(latencies)
+        generate = [r for r in server.requests if ':generateContent' in r['path']]
+        tokens_sent = sum(server.usage(r['payload'])['promptTokenCount'] for r in generate)
+        cache_stats = service.cache.stats()
+        return {
+            'sessions': len(self.corpus) * self.repeat,
+            'turns': turns,
+            'upstream_requests': len(generate),
+            'latency_ms': {
+                'p50': round(percentile(latencies, 50), 2),
+                'p95': round(percentile(latencies, 95), 2),
+                'p99': round(percentile(latencies, 99), 2),
+                'mean': round(sum(latencies) / turns, 2) if turns else 0,
+                'max': round(max(latencies, default=0), 2),
+            },
+            'tokens_sent': tokens_sent,
+            'tokens_per_upstream_request': round(tokens_sent / len(generate), 1) if generate else 0,
+            'sources': dict(sources),
+            'cache_hits': sources['cached'],
+            'cache_hit_rate': round(sources['cached'] / turns, 4) if turns else 0,
+            'semantic_cache_hits': cache_stats['semantic_hits'],
+            'fallback_rate': round(sources['fallback'] / turns, 4) if turns else 0,
+            'circuit': service.breaker.stats(),
+        }
@@ -0,0 +1,217 @@
+"""
+In-process cache of assistant answers for repeated questions.
+
+Answers are keyed on the normalized prompt plus a coarse bucket of the user's
+context (new/returning, strategy), so two users in the same situation asking
+the same thing share an answer. Lookups try an exact hash first and then,
+optionally, a TF-IDF cosine match against prompts cached in the same bucket
+to catch rephrasings.
+
+Only standalone questions (the first turn of a conversation) are cached,
+since a follow-up like "tell me more" depends on the turns before it. Callers
+whose prompt carries their own figures (balance, deposits, goals) bypass the
+cache both ways: an answer built from one user's numbers must never reach
+another, and they should get an answer that uses their numbers.
+"""
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset({
+    'a', 'about', 'an', 'and', 'any', 'are', 'at', 'be', 'can', 'do', 'does',
+    'explain', 'for', 'how', 'i', 'in', 'is', 'it', 'me', 'mean', 'means', 'my',
+    'of', 'on', 'or', 'please', 'really', 'should', 'tell', 'that', 'the',
+    'there', 'this', 'to', 'use', 'using', 'what', 'whats', 'which', 'with', 'you',
+})
+
+
+def normalize_prompt(text):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return ' '.join(_WORD_RE.findall(text.lower().replace("'", '')))
+
+
+# user_data fields the prompt context renders as the caller's own figures
+PERSONAL_FIELDS = ('balance', 'total_deposited', 'total_earned', 'active_goals', 'conversation_summary')
+
+
+def is_personal(user_data):
+    """Whether the prompt for this context would include the caller's own figures"""
+    return any((user_data or {}).get(field) for field in PERSONAL_FIELDS)
+
+
+def context_bucket(user_data):
+    """Coarse description of the user's situation that a shared answer may depend on"""
+    user_data = user_data or {}
+    return '|'.join([
+        'new' if user_data.get('is_new_user') else 'returning',
+        str(user_data.get('current_strategy') or '-'),
+    ])
+
+
+class _Entry:
+    __slots__ = ('bucket', 'prompt', 'terms', 'response', 'expires_at')
+
+    def __init__(self, bucket, prompt, terms, response, expires_at):
+        self.bucket = bucket
+        self.prompt = prompt
+        self.terms = terms
+        self.response = response
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """LRU + TTL cache of assistant responses with optional near-duplicate matching"""
+
+    TTL = getattr(settings, 'AI_RESPONSE_CACHE_TTL', 3600)
+    MAX_ENTRIES = getattr(settings, 'AI_RESPONSE_CACHE_MAX_ENTRIES', 1000)
+    SEMANTIC = getattr(settings, 'AI_RESPONSE_CACHE_SEMANTIC', True)
+    SIMILARITY_THRESHOLD = getattr(settings, 'AI_RESPONSE_CACHE_SIMILARITY', 0.8)
+
+    def __init__(self, ttl=None, max_entries=None, semantic=None, similarity_threshold=None):
+        self.ttl = ttl or self.TTL
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self.semantic = self.SEMANTIC if semantic is None else semantic
+        self.similarity_threshold = similarity_threshold or self.SIMILARITY_THRESHOLD
+        self._entries = OrderedDict()
+        # Document frequencies over cached prompts, for IDF weights
+        self._doc_freq = Counter()
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    @staticmethod
+    def _key(bucket, prompt):
+        return hashlib.sha256(f"{bucket}\n{prompt}".encode()).hexdigest()
+
+    @staticmethod
+    def _terms(prompt):
+        return Counter(word for word in prompt.split() if word not in STOPWORDS)
+
+    @staticmethod
+    def is_cacheable(messages):
+        """Only the opening question of a conversation stands on its own"""
+        return len(messages) == 1 and messages[0].get('role') == 'user'
+
+    def get(self, message, user_data=None):
+        """Return a cached response dict for this question, or None"""
+        prompt = normalize_prompt(message)
+        if not prompt:
+            return None
+        if is_personal(user_data):
+            with self._lock:
+                self._stats['personal'] += 1
+            return None
+        bucket = context_bucket(user_data)
+        key = self._key(bucket, prompt)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry.expires_at <= now:
+                self._remove(key)
+                entry = None
+            if entry:
+                self._entries.move_to_end(key)
+                self._stats['exact_hits'] += 1
+                return dict(entry.response)
+
+            if self.semantic:
+                match = self._nearest(bucket, self._terms(prompt), now)
+                if match:
+                    self._entries.move_to_end(match)
+                    self._stats['semantic_hits'] += 1
+                    return dict(self._entries[match].response)
+
+            self._stats['misses'] += 1
+            return None
+
+    def set(self, message, user_data, response):
+        """Cache a response; only successful API answers without personal figures are worth keeping"""
+        prompt = normalize_prompt(message)
+        if not prompt or response.get('source') != 'api' or is_personal(user_data):
+            return
+        bucket = context_bucket(user_data)
+        key = self._key(bucket, prompt)
+        cached = {k: response[k] for k in ('message', 'model') if k in response}
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            terms = self._terms(prompt)
+            self._entries[key] = _Entry(bucket, prompt, terms, cached, time.monotonic() + self.ttl)
+            self._doc_freq.update(terms.keys())
+            self._stats['stores'] += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._doc_freq.clear()
+
+    def stats(self):
+        """Hit/miss counters and hit rate since the process started"""
+        with self._lock:
+            stats = {name: self._stats[name] for name in ('exact_hits', 'semantic_hits', 'misses', 'personal', 'stores', 'evictions')}
+            stats['entries'] = len(self._entries)
+        lookups = stats['exact_hits'] + stats['semantic_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['exact_hits'] + stats['semantic_hits']) / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        for term in entry.terms:
+            self._doc_freq[term] -= 1
+            if self._doc_freq[term] <= 0:
+                del self._doc_freq[term]
+
+    def _vector(self, terms):
+        total = len(self._entries) + 1
+        vector = {
+            term: count * (math.log(total / (1 + self._doc_freq[term])) + 1)
+            for term, count in terms.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return vector, norm
+
+    def _nearest(self, bucket, terms, now):
+        """Key of the most similar live entry in the bucket above the threshold"""
+        if not terms:
+            return None
+        query, query_norm = self._vector(terms)
+        best_key, best_score = None, self.similarity_threshold
+        for key, entry in self._entries.items():
+            if entry.bucket != bucket or entry.expires_at <= now:
+                continue
+            candidate, candidate_norm = self._vector(entry.terms)
+            if not candidate_norm:
+                continue
+            dot = sum(weight * candidate.get(term, 0) for term, weight in query.items())
+            score = dot / (query_norm * candidate_norm)
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Process-wide shared ``ResponseCache``"""
+    global _default_cache
+    if _default_cache is None:
+        with _default_lock:
+            if _default_cache is None:
+                _default_cache = ResponseCache()
+    return _default_cache
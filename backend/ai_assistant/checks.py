@@ -0,0 +1,27 @@
+"""
+Deployment checks for the assistant, run by ``manage.py check --deploy``.
+
+Rate limits, token quotas and the config/prompt invalidation keys live in
+the Django cache. With a per-process backend every worker gets its own
+budget, so limits effectively scale with the number of workers.
+"""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        "The default cache is local to each process, so AI rate limits and token "
+        "quotas are enforced per worker rather than per caller.",
+        hint="Point CACHES at a shared backend, e.g. set REDIS_URL.",
+        id='ai_assistant.W001',
+    )]
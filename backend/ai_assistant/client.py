@@ -0,0 +1,219 @@
+"""
+Pooled HTTP client for calls to the LLM provider.
+
+``LLMClient`` keeps one keep-alive connection pool per process for blocking
+callers and one per event loop for async callers, caps how many requests are
+in flight at once, and retries 429/5xx responses and connection failures
+with exponential backoff (honouring ``Retry-After``). Use ``get_client()``
+rather than constructing one per request so connections are actually reused.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrencyLimitExceeded(Exception):
+    """Raised when no request slot frees up within the acquire timeout"""
+
+
+class LLMClient:
+    """Sync and asyncio HTTP client with pooling, bounded concurrency and retries"""
+
+    MAX_CONNECTIONS = getattr(settings, 'LLM_MAX_CONNECTIONS', 20)
+    MAX_KEEPALIVE_CONNECTIONS = getattr(settings, 'LLM_MAX_KEEPALIVE_CONNECTIONS', 10)
+    KEEPALIVE_EXPIRY = getattr(settings, 'LLM_KEEPALIVE_EXPIRY', 30)
+    MAX_CONCURRENCY = getattr(settings, 'LLM_MAX_CONCURRENCY', 16)
+    ACQUIRE_TIMEOUT = getattr(settings, 'LLM_ACQUIRE_TIMEOUT', 10)
+    TIMEOUT = getattr(settings, 'LLM_TIMEOUT', 30)
+    CONNECT_TIMEOUT = 5
+    MAX_RETRIES = getattr(settings, 'LLM_MAX_RETRIES', 2)
+    BACKOFF_BASE = 0.5
+    BACKOFF_MAX = 8
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self, max_concurrency=None, max_retries=None, backoff_base=None, timeout=None):
+        self.max_concurrency = max_concurrency or self.MAX_CONCURRENCY
+        self.max_retries = self.MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = self.BACKOFF_BASE if backoff_base is None else backoff_base
+        self.timeout = httpx.Timeout(timeout or self.TIMEOUT, connect=self.CONNECT_TIMEOUT)
+        self.limits = httpx.Limits(
+            max_connections=self.MAX_CONNECTIONS,
+            max_keepalive_connections=self.MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=self.KEEPALIVE_EXPIRY,
+        )
+        self._lock = threading.Lock()
+        self._client = None
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        # AsyncClient and asyncio.Semaphore are bound to the loop that uses them
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    # Connection pools
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    def _async_state(self):
+        loop = asyncio.get_running_loop()
+        state = self._async_clients.get(loop)
+        if state is None:
+            state = (
+                httpx.AsyncClient(timeout=self.timeout, limits=self.limits),
+                asyncio.Semaphore(self.max_concurrency),
+            )
+            self._async_clients[loop] = state
+        return state
+
+    def close(self):
+        """Close the blocking pool; async pools close with their event loop"""
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    def _timeout(self, seconds):
+        """Per-request timeout override, keeping the pool's connect timeout"""
+        if seconds is None:
+            return self.timeout
+        return httpx.Timeout(seconds, connect=min(self.CONNECT_TIMEOUT, seconds))
+
+    # Retry policy
+
+    def _should_retry(self, response, attempt):
+        return attempt < self.max_retries and response.status_code in self.RETRY_STATUSES
+
+    def _backoff(self, attempt, response=None):
+        """Seconds to wait before the next attempt"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return min(float(retry_after), self.BACKOFF_MAX)
+        delay = min(self.backoff_base * (2 ** attempt), self.BACKOFF_MAX)
+        # Full jitter so a burst of retries doesn't hit the provider in lockstep
+        return random.uniform(0, delay)
+
+    # Blocking API
+
+    def post(self, url, json=None, headers=None, timeout=None):
+        """POST with retries; returns the final ``httpx.Response``"""
+        if not self._slots.acquire(timeout=self.ACQUIRE_TIMEOUT):
+            raise ConcurrencyLimitExceeded(f"No LLM request slot free after {self.ACQUIRE_TIMEOUT}s")
+        try:
+            attempt = 0
+            while True:
+                try:
+                    response = self.client.post(url, json=json, headers=headers, timeout=self._timeout(timeout))
+                except httpx.TransportError as e:
+                    if attempt >= self.max_retries or isinstance(e, httpx.TimeoutException):
+                        raise
+                    logger.warning(f"LLM request failed ({e.__class__.__name__}), retrying")
+                    time.sleep(self._backoff(attempt))
+                else:
+                    if not self._should_retry(response, attempt):
+                        return response
+                    logger.warning(f"LLM request returned {response.status_code}, retrying")
+                    time.sleep(self._backoff(attempt, response))
+                attempt += 1
+        finally:
+            self._slots.release()
+
+    # Async API
+
+    async def apost(self, url, json=None, headers=None, timeout=None, on_send=None):
+        """
+        Async POST with retries; returns the final ``httpx.Response``.
+        ``on_send`` is called once a request slot is held and the first
+        attempt is about to go out.
+        """
+        async with self._slot() as client:
+            if on_send:
+                on_send()
+            attempt = 0
+            while True:
+                try:
+                    response = await client.post(url, json=json, headers=headers, timeout=self._timeout(timeout))
+                except httpx.TransportError as e:
+                    if attempt >= self.max_retries or isinstance(e, httpx.TimeoutException):
+                        raise
+                    logger.warning(f"LLM request failed ({e.__class__.__name__}), retrying")
+                    await asyncio.sleep(self._backoff(attempt))
+                else:
+                    if not self._should_retry(response, attempt):
+                        return response
+                    logger.warning(f"LLM request returned {response.status_code}, retrying")
+                    await asyncio.sleep(self._backoff(attempt, response))
+                attempt += 1
+
+    @asynccontextmanager
+    async def astream(self, url, json=None, headers=None, timeout=None):
+        """
+        Open a streaming POST. Retries only happen before the response body
+        starts, so callers never see a partially replayed stream.
+        """
+        async with self._slot() as client:
+            attempt = 0
+            while True:
+                try:
+                    request = client.build_request(
+                        'POST', url, json=json, headers=headers, timeout=self._timeout(timeout)
+                    )
+                    response = await client.send(request, stream=True)
+                except httpx.TransportError as e:
+                    if attempt >= self.max_retries or isinstance(e, httpx.TimeoutException):
+                        raise
+                    logger.warning(f"LLM stream failed ({e.__class__.__name__}), retrying")
+                    await asyncio.sleep(self._backoff(attempt))
+                    attempt += 1
+                    continue
+
+                if self._should_retry(response, attempt):
+                    await response.aclose()
+                    logger.warning(f"LLM stream returned {response.status_code}, retrying")
+                    await asyncio.sleep(self._backoff(attempt, response))
+                    attempt += 1
+                    continue
+
+                try:
+                    yield response
+                finally:
+                    await response.aclose()
+                return
+
+    @asynccontextmanager
+    async def _slot(self):
+        client, semaphore = self._async_state()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.ACQUIRE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise ConcurrencyLimitExceeded(f"No LLM request slot free after {self.ACQUIRE_TIMEOUT}s")
+        try:
+            yield client
+        finally:
+            semaphore.release()
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide shared ``LLMClient``"""
+    global _default_client
+    if _default_client is None:
+        with _default_lock:
+            if _default_client is None:
+                _default_client = LLMClient()
+    return _default_client
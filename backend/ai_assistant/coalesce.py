@@ -0,0 +1,98 @@
+"""
+Single-flight coalescing of identical in-flight calls.
+
+When many requests ask for the same thing at the same moment, only the first
+(the leader) runs the call; everyone else with the same key waits for the
+leader's result instead of issuing a duplicate upstream request. Nothing is
+remembered once the call finishes, so this complements the response cache
+rather than replacing it.
+"""
+import asyncio
+import threading
+import weakref
+from collections import Counter
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls by key, for threads and for asyncio tasks"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        # Futures belong to the loop that created them
+        self._async_calls = weakref.WeakKeyDictionary()
+        self._stats = Counter()
+
+    def do(self, key, fn):
+        """
+        Run ``fn()`` unless an identical call is already running, in which
+        case wait for it. Returns ``(result, shared)`` where ``shared`` is True
+        for callers that reused another caller's result.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats['leaders'] += 1
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    async def ado(self, key, fn):
+        """Async variant of ``do``; ``fn`` returns an awaitable"""
+        loop = asyncio.get_running_loop()
+        calls = self._async_calls.setdefault(loop, {})
+
+        future = calls.get(key)
+        if future is not None:
+            self._stats['coalesced'] += 1
+            # Shield so one waiter being cancelled doesn't cancel the leader's result
+            return await asyncio.shield(future), True
+
+        future = calls[key] = loop.create_future()
+        self._stats['leaders'] += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark it retrieved so an unwaited future doesn't log a warning
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            calls.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {'leaders': self._stats['leaders'], 'coalesced': self._stats['coalesced']}
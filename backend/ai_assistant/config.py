@@ -0,0 +1,143 @@
+"""
+Typed, process-wide view of ``AIConfiguration``.
+
+Every knob the assistant reads at runtime is declared in ``SETTINGS`` with a
+type and a default. ``AIConfigRegistry`` loads all active ``AIConfiguration``
+rows in one query, coerces them to the declared types (falling back to the
+default, with a warning, for values that don't parse), and serves reads from
+memory. Saving or deleting a row bumps a version key in the shared cache via
+``signals.py``; each process notices within ``VERSION_CHECK_INTERVAL``
+seconds and reloads, so operators can tune the service without a deploy.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'ai_assistant:config_version'
+
+
+class Setting:
+    """A declared configuration key with its type and default"""
+
+    def __init__(self, key, data_type, default, description=''):
+        self.key = key
+        self.data_type = data_type
+        self.default = default
+        self.description = description
+
+    def coerce(self, value):
+        if self.data_type == 'integer':
+            return int(value)
+        if self.data_type == 'float':
+            return float(value)
+        if self.data_type == 'boolean':
+            return value if isinstance(value, bool) else str(value).lower() in ('true', 'yes', '1')
+        if self.data_type == 'json':
+            return json.loads(value) if isinstance(value, str) else value
+        return str(value)
+
+
+SETTINGS = {
+    setting.key: setting
+    for setting in [
+        Setting('model', 'string', os.environ.get('GEMINI_MODEL', 'gemini-2.0-flash-exp'),
+                'Gemini model used for chat'),
+        Setting('temperature', 'float', 0.7, 'Sampling temperature'),
+        Setting('top_k', 'integer', 40, 'Top-k sampling'),
+        Setting('top_p', 'float', 0.95, 'Nucleus sampling probability'),
+        Setting('max_output_tokens', 'integer', 1024, 'Maximum tokens in a reply'),
+        Setting('request_timeout', 'float', 30.0, 'Seconds to wait for Gemini before falling back'),
+    ]
+}
+
+
+class AIConfigRegistry:
+    """Typed configuration values loaded from active AIConfiguration rows"""
+
+    VERSION_CHECK_INTERVAL = 5
+
+    def __init__(self, values):
+        self.values = values
+
+    @classmethod
+    def load(cls):
+        from .models import AIConfiguration
+
+        values = {key: setting.default for key, setting in SETTINGS.items()}
+        for row in AIConfiguration.objects.filter(is_active=True):
+            setting = SETTINGS.get(row.key)
+            try:
+                values[row.key] = setting.coerce(row.value) if setting else row.get_value()
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Ignoring invalid AIConfiguration {row.key}={row.value!r}: {e}")
+        return cls(values)
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def generation_config(self):
+        """The generationConfig block for a Gemini request"""
+        return {
+            "temperature": self.values['temperature'],
+            "topK": self.values['top_k'],
+            "topP": self.values['top_p'],
+            "maxOutputTokens": self.values['max_output_tokens'],
+        }
+
+
+_registry = None
+_registry_version = None
+_checked_at = 0
+_lock = threading.Lock()
+
+
+def _in_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def get_ai_config():
+    """Process-wide ``AIConfigRegistry``, reloaded when any AIConfiguration changes"""
+    global _registry, _registry_version, _checked_at
+    now = time.monotonic()
+    if _registry is not None and now - _checked_at < AIConfigRegistry.VERSION_CHECK_INTERVAL:
+        return _registry
+    # The ORM can't run on an event loop; async callers refresh through aget_ai_config
+    if _registry is not None and _in_event_loop():
+        return _registry
+
+    with _lock:
+        version = cache.get(VERSION_KEY, 0)
+        if _registry is None or version != _registry_version:
+            _registry = AIConfigRegistry.load()
+            _registry_version = version
+        _checked_at = now
+        return _registry
+
+
+async def aget_ai_config():
+    """``get_ai_config`` for async callers; a reload runs in a worker thread"""
+    if _registry is not None and time.monotonic() - _checked_at < AIConfigRegistry.VERSION_CHECK_INTERVAL:
+        return _registry
+    return await sync_to_async(get_ai_config)()
+
+
+def invalidate_ai_config():
+    """Mark the registry stale here and, through the shared cache, in other processes"""
+    global _registry
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+    _registry = None
@@ -210,6 +210,125 @@ DEFI_GLOSSARY = {
 }
 
 
+# Intent table for the offline responder and FAQ router. Keywords are matched
+# as whole words/phrases; each intent scores the sum of its matched keyword
+# weights and the highest score wins (ties go to the earlier entry). Intents
+# marked "faq" may answer confident, short opening questions without the LLM.
+FALLBACK_INTENTS = [
+    {
+        "name": "strategy",
+        "faq": False,
+        "keywords": {"strategy": 2, "strategies": 2, "conservative": 2, "balanced": 2, "growth": 1.5, "risk level": 1, "recommend": 1, "which": 0.5},
+        "response": """I can help you choose a strategy! Here are the three options:
+
+**Conservative (3-5% APY)** - Low risk, best for beginners and short-term savings
+**Balanced (5-10% APY)** - Medium risk, good for regular savers
+**Growth (10-15% APY)** - Higher risk, for experienced users and long-term goals
+
+To recommend the best one, I'd like to know:
+1. How long do you plan to keep funds deposited?
+2. How comfortable are you with risk?
+3. Is this your first time using DeFi?""",
+    },
+    {
+        "name": "security",
+        "faq": True,
+        "keywords": {"safe": 2, "safety": 2, "secure": 2, "security": 2, "hack": 2, "hacked": 2, "scam": 2, "trust": 1.5, "audit": 1.5, "audited": 1.5},
+        "response": """Attestify is designed with security as the top priority:
+
+✅ **Non-Custodial**: You always control your funds
+✅ **Audited Contracts**: Following OpenZeppelin security standards
+✅ **Battle-Tested**: Uses Aave Market, a proven DeFi protocol
+✅ **Identity Verification**: Required to prevent fraud
+✅ **Emergency Pause**: Can halt operations if issues detected
+
+Remember: All DeFi carries some risk. Only invest what you can afford to lose!""",
+    },
+    {
+        "name": "withdrawal",
+        "faq": True,
+        "keywords": {"withdraw": 2, "withdrawal": 2, "withdrawals": 2, "take out": 2, "cash out": 2, "remove": 1, "access my funds": 1.5, "access": 0.5},
+        "response": """You can withdraw your funds anytime! Here's how:
+
+1. Go to your dashboard
+2. Click "Withdraw"
+3. Enter the amount you want to withdraw
+4. Confirm the transaction
+
+**No lock-ups, no penalties, no waiting.** Your funds are available 24/7. Withdrawals typically complete in under 30 seconds.""",
+    },
+    {
+        "name": "deposit",
+        "faq": True,
+        "keywords": {"deposit": 2, "deposits": 2, "add funds": 2, "invest": 1.5, "minimum": 1.5, "maximum": 1, "get started": 1.5, "getting started": 1.5, "add": 0.5},
+        "response": """Getting started is simple:
+
+**Minimum**: 1 cUSD (we recommend at least 10 cUSD)
+**Maximum**: 10,000 cUSD per user
+
+Steps:
+1. Verify your identity (2 minutes)
+2. Choose your strategy
+3. Enter deposit amount
+4. Confirm transaction
+
+Your funds start earning immediately!""",
+    },
+    {
+        "name": "yield",
+        "faq": True,
+        "keywords": {"apy": 2, "yield": 2, "yields": 2, "earn": 1.5, "earnings": 1.5, "return": 1.5, "returns": 1.5, "interest": 1.5},
+        "response": """Attestify offers three yield tiers:
+
+🛡️ **Conservative**: 3-5% APY (Low risk)
+⚖️ **Balanced**: 5-10% APY (Medium risk)
+📈 **Growth**: 10-15% APY (Higher risk)
+
+Yields come from Aave Market lending. They fluctuate based on market demand but have been stable historically.
+
+**Important**: Past performance doesn't guarantee future returns. Yields can vary.""",
+    },
+    {
+        "name": "education",
+        "faq": False,
+        "keywords": {"what is": 0.5, "what are": 0.5, "explain": 1, "how does": 0.5, "understand": 1, "defi": 1},
+        "response": """I'm here to help you understand DeFi! Some key concepts:
+
+**DeFi**: Decentralized Finance - earning interest without traditional banks
+**APY**: Annual Percentage Yield - your yearly earning rate
+**Smart Contracts**: Automated programs that handle your funds safely
+**Stablecoins**: Cryptocurrencies pegged to $1 USD (like cUSD)
+
+What specific concept would you like me to explain?""",
+    },
+    {
+        "name": "greeting",
+        "faq": True,
+        "keywords": {"hello": 1, "hi": 1, "hey": 1, "help": 0.5, "start": 0.5, "good morning": 1},
+        "response": """Hello! I'm your Attestify AI assistant . I can help you with:
+
+ -Choosing the right investment strategy
+ -Understanding platform security
+ -Tracking your earnings
+ -Learning about DeFi concepts
+ -Answering any questions about Attestify
+
+What would you like to know?""",
+    },
+]
+
+FALLBACK_DEFAULT_RESPONSE = """I'm here to help you with Attestify! I can answer questions about:
+
+- Investment strategies (Conservative, Balanced, Growth)
+- Security and how your funds are protected
+- Deposits and withdrawals
+- Expected yields and returns
+- How DeFi and Attestify work
+- General DeFi concepts and education
+
+What specific question can I help you with?"""
+
+
 # Conversation starters for different user personas
 PERSONA_PROMPTS = {
     "beginner": "I see you're new to DeFi! I'm here to help you understand everything. Think of Attestify as a high-yield savings account that uses blockchain technology. Would you like me to explain how it works?",
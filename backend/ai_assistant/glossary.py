@@ -0,0 +1,205 @@
+"""
+In-memory search index over the DeFi glossary.
+
+``GlossaryIndex`` loads every ``DeFiTerm`` (plus the built-in
+``DEFI_GLOSSARY`` entries that have no row yet) and builds an inverted index
+from tokens of the term name, its search keywords and its short definition.
+Queries match tokens exactly, by prefix (a sorted vocabulary and bisect) or
+fuzzily (a symmetric-delete map verified with edit distance), and results
+are ranked by field weight, match quality and popularity. Lookups never
+touch the database; saving or deleting a term marks the index stale through
+``signals.py`` and it is rebuilt on next use.
+"""
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.core.cache import cache
+
+from .cache import normalize_prompt
+from .context import DEFI_GLOSSARY
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'ai_assistant:glossary_version'
+
+FIELD_WEIGHTS = {'term': 3.0, 'keyword': 2.0, 'definition': 0.5}
+MATCH_QUALITY = {'exact': 1.0, 'prefix': 0.7, 'fuzzy': 0.5}
+EXACT_TERM_BONUS = 5.0
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance, or ``limit + 1`` once it is known to exceed ``limit``"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _deletes(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+class GlossaryIndex:
+    """Inverted index with prefix, fuzzy and ranked lookups over glossary entries"""
+
+    MIN_PREFIX = 2
+    # Another process may have changed a term; check the shared version this often
+    VERSION_CHECK_INTERVAL = 5
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.by_term = {normalize_prompt(entry['term']): entry for entry in entries}
+        self.postings = defaultdict(dict)
+        for doc, entry in enumerate(entries):
+            fields = [('term', entry['term'])]
+            fields += [('keyword', keyword) for keyword in entry['keywords']]
+            fields.append(('definition', entry['short_definition']))
+            for field, text in fields:
+                for token in normalize_prompt(text).split():
+                    weight = FIELD_WEIGHTS[field]
+                    if weight > self.postings[token].get(doc, 0):
+                        self.postings[token][doc] = weight
+            for keyword in entry['keywords']:
+                self.by_term.setdefault(normalize_prompt(keyword), entry)
+
+        self.vocabulary = sorted(self.postings)
+        self.delete_map = defaultdict(set)
+        for token in self.vocabulary:
+            self.delete_map[token].add(token)
+            for deleted in _deletes(token):
+                self.delete_map[deleted].add(token)
+
+    @classmethod
+    def build(cls):
+        """Load the glossary from the database in two queries"""
+        from .models import DeFiTerm
+
+        entries = []
+        for term in DeFiTerm.objects.prefetch_related('related_terms'):
+            entries.append({
+                'id': term.id,
+                'term': term.term,
+                'short_definition': term.short_definition,
+                'category': term.category,
+                'keywords': term.get_keywords_list(),
+                'related_terms': sorted(related.term for related in term.related_terms.all()),
+                'popularity_score': term.popularity_score,
+            })
+        known = {normalize_prompt(entry['term']) for entry in entries}
+        for term, definition in DEFI_GLOSSARY.items():
+            if normalize_prompt(term) not in known:
+                entries.append({
+                    'id': None,
+                    'term': term,
+                    'short_definition': definition,
+                    'category': 'basic',
+                    'keywords': [],
+                    'related_terms': [],
+                    'popularity_score': 0,
+                })
+        logger.info(f"Built glossary index with {len(entries)} terms")
+        return cls(entries)
+
+    def _expand(self, token):
+        """Vocabulary tokens matching a query token, with their match quality"""
+        matches = {}
+        if token in self.postings:
+            matches[token] = MATCH_QUALITY['exact']
+        if len(token) >= self.MIN_PREFIX:
+            start = bisect_left(self.vocabulary, token)
+            for candidate in self.vocabulary[start:]:
+                if not candidate.startswith(token):
+                    break
+                matches.setdefault(candidate, MATCH_QUALITY['prefix'])
+        if not matches and len(token) >= 4:
+            limit = 1 if len(token) < 7 else 2
+            candidates = set(self.delete_map.get(token, ()))
+            for deleted in _deletes(token):
+                candidates |= self.delete_map.get(deleted, set())
+            for candidate in candidates:
+                if edit_distance(token, candidate, limit) <= limit:
+                    matches[candidate] = MATCH_QUALITY['fuzzy']
+        return matches
+
+    def search(self, query, limit=10):
+        """Ranked glossary entries for a free-text query"""
+        normalized = normalize_prompt(query)
+        scores = defaultdict(float)
+        for token in normalized.split():
+            best = {}
+            for candidate, quality in self._expand(token).items():
+                for doc, weight in self.postings[candidate].items():
+                    best[doc] = max(best.get(doc, 0), weight * quality)
+            for doc, score in best.items():
+                scores[doc] += score
+
+        for doc in scores:
+            entry = self.entries[doc]
+            if normalize_prompt(entry['term']) == normalized:
+                scores[doc] += EXACT_TERM_BONUS
+            scores[doc] += math.log1p(max(entry['popularity_score'], 0)) * 0.1
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], self.entries[item[0]]['term'].lower()))
+        return [dict(self.entries[doc], score=round(score, 3)) for doc, score in ranked[:limit]]
+
+    def autocomplete(self, prefix, limit=8):
+        """Term names starting with (or containing a word starting with) the prefix"""
+        prefix = normalize_prompt(prefix)
+        if not prefix:
+            return []
+        matches = []
+        for entry in self.entries:
+            name = normalize_prompt(entry['term'])
+            if name.startswith(prefix):
+                matches.append((0, entry))
+            elif any(word.startswith(prefix) for word in name.split()):
+                matches.append((1, entry))
+        matches.sort(key=lambda item: (item[0], -item[1]['popularity_score'], item[1]['term'].lower()))
+        return [entry['term'] for _, entry in matches[:limit]]
+
+    def lookup(self, term):
+        """Exact (case- and punctuation-insensitive) match on a term name or keyword"""
+        return self.by_term.get(normalize_prompt(term))
+
+
+_index = None
+_index_version = None
+_checked_at = 0
+_lock = threading.Lock()
+
+
+def get_glossary_index():
+    """Process-wide ``GlossaryIndex``, rebuilt when the glossary changes"""
+    global _index, _index_version, _checked_at
+    now = time.monotonic()
+    if _index is not None and now - _checked_at < GlossaryIndex.VERSION_CHECK_INTERVAL:
+        return _index
+
+    with _lock:
+        version = cache.get(VERSION_KEY, 0)
+        if _index is None or version != _index_version:
+            _index = GlossaryIndex.build()
+            _index_version = version
+        _checked_at = now
+        return _index
+
+
+def invalidate_glossary_index():
+    """Mark the index stale here and, through the shared cache, in other processes"""
+    global _index
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+    _index = None
@@ -0,0 +1,102 @@
+"""
+Token-budgeted conversation history for prompts.
+
+``HistoryManager.window`` packs the newest messages of a session into a token
+budget (estimated locally, see ``prompts.estimate_tokens``) instead of a
+fixed message count. Turns that fall out of the window are folded into a
+running extractive summary on ``ConversationSession``, so the prompt stays
+bounded however long the session runs while the model still sees what was
+discussed earlier.
+"""
+import logging
+import re
+
+from django.conf import settings
+
+from .models import Conversation
+from .prompts import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s')
+
+
+class HistoryManager:
+    """Builds the message window for a session and maintains its running summary"""
+
+    TOKEN_BUDGET = getattr(settings, 'AI_HISTORY_TOKEN_BUDGET', 2000)
+    SUMMARY_TOKEN_BUDGET = getattr(settings, 'AI_HISTORY_SUMMARY_TOKEN_BUDGET', 300)
+    # Upper bound on rows read per turn; older unsummarized rows are skipped
+    MAX_SCAN = 50
+    MESSAGE_OVERHEAD_TOKENS = 4
+    SNIPPET_CHARS = 160
+
+    def __init__(self, token_budget=None, summary_token_budget=None):
+        self.token_budget = token_budget or self.TOKEN_BUDGET
+        self.summary_token_budget = summary_token_budget or self.SUMMARY_TOKEN_BUDGET
+
+    def cost(self, text):
+        return estimate_tokens(text) + self.MESSAGE_OVERHEAD_TOKENS
+
+    def window(self, session):
+        """
+        Return ``(messages, summary)``: the newest messages that fit the token
+        budget, oldest first, and the session's summary of everything before.
+        """
+        rows = list(
+            Conversation.objects.filter(
+                session_id=session.session_id,
+                id__gt=session.summary_until_id
+            ).order_by('-id').values_list('id', 'role', 'message')[:self.MAX_SCAN]
+        )
+        if not rows:
+            return [], session.summary
+
+        # The newest message always goes in, trimmed if it alone is too long
+        newest_id, newest_role, newest_text = rows[0]
+        max_chars = (self.token_budget - self.MESSAGE_OVERHEAD_TOKENS) * 4
+        if len(newest_text) > max_chars:
+            newest_text = newest_text[:max_chars].rstrip() + '…'
+        window = [(newest_id, newest_role, newest_text)]
+        used = self.cost(newest_text)
+
+        for row in rows[1:]:
+            cost = self.cost(row[2])
+            if used + cost > self.token_budget:
+                break
+            window.append(row)
+            used += cost
+
+        # Gemini expects the conversation to open with a user turn
+        while len(window) > 1 and window[-1][1] != 'user':
+            window.pop()
+
+        overflow = rows[len(window):]
+        if overflow:
+            self._fold(session, list(reversed(overflow)))
+
+        messages = [{'role': role, 'content': text} for _, role, text in reversed(window)]
+        return messages, session.summary
+
+    def _snippet(self, text):
+        first = _SENTENCE_END_RE.split(text.strip(), maxsplit=1)[0]
+        first = ' '.join(first.split())
+        if len(first) > self.SNIPPET_CHARS:
+            first = first[:self.SNIPPET_CHARS].rstrip() + '…'
+        return first
+
+    def _fold(self, session, rows):
+        """Append the given turns (oldest first) to the summary and advance the watermark"""
+        lines = session.summary.splitlines() if session.summary else []
+        for _, role, text in rows:
+            speaker = 'User' if role == 'user' else 'Assistant'
+            lines.append(f"- {speaker}: {self._snippet(text)}")
+
+        # Keep the most recent context when the summary outgrows its budget
+        while len(lines) > 1 and estimate_tokens('\n'.join(lines)) > self.summary_token_budget:
+            lines.pop(0)
+
+        session.summary = '\n'.join(lines)
+        session.summary_until_id = rows[-1][0]
+        session.save(update_fields=['summary', 'summary_until_id'])
+        logger.debug(f"Folded {len(rows)} message(s) into summary for session {session.session_id}")
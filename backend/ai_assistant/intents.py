@@ -0,0 +1,155 @@
+"""
+Keyword intent classifier for the offline responder and FAQ router.
+
+The intent table (``context.FALLBACK_INTENTS``) is compiled once into an
+Aho-Corasick automaton over space-padded keywords, so a message is
+classified in a single pass over its normalized text regardless of how many
+intents or keywords there are, and keywords only match whole words ("hi"
+doesn't fire on "this"). Every intent scores the total weight of its
+distinct matched keywords and the best score wins, rather than the first
+entry in a chain that happens to contain a substring.
+"""
+import threading
+from collections import deque
+
+from django.conf import settings
+
+from .cache import normalize_prompt
+from .context import FALLBACK_DEFAULT_RESPONSE, FALLBACK_INTENTS
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton yielding the payload of every pattern found in a text"""
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for pattern, payload in patterns:
+            self._add(pattern, payload)
+        self._link()
+
+    def _add(self, pattern, payload):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(payload)
+
+    def _link(self):
+        """Breadth-first pass setting failure links and merging outputs"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text):
+        state = 0
+        for char in text:
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            yield from self._output[state]
+
+
+class IntentMatch:
+    """The winning intent for a message and how confidently it won"""
+
+    def __init__(self, intent, score, runner_up, keywords):
+        self.intent = intent
+        self.score = score
+        self.runner_up = runner_up
+        self.keywords = keywords
+
+    def __repr__(self):
+        return f"<IntentMatch {self.name} score={self.score}>"
+
+    @property
+    def name(self):
+        return self.intent['name']
+
+    @property
+    def response(self):
+        return self.intent['response']
+
+
+class IntentClassifier:
+    """Classifies messages against the intent table and serves canned answers"""
+
+    # FAQ routing only answers short, unambiguous questions on its own
+    FAQ_MIN_SCORE = getattr(settings, 'AI_FAQ_MIN_SCORE', 2)
+    FAQ_MIN_MARGIN = 1
+    FAQ_MAX_WORDS = 12
+
+    def __init__(self, intents=None, default_response=None):
+        self.intents = list(intents or FALLBACK_INTENTS)
+        self.default_response = default_response or FALLBACK_DEFAULT_RESPONSE
+        self.automaton = KeywordAutomaton(
+            (f" {normalize_prompt(keyword)} ", (index, keyword, weight))
+            for index, intent in enumerate(self.intents)
+            for keyword, weight in intent['keywords'].items()
+        )
+
+    def classify(self, message):
+        """Best matching intent for a message, or None if nothing matched"""
+        matched = {}
+        for index, keyword, weight in self.automaton.find(f" {normalize_prompt(message)} "):
+            matched.setdefault(index, {})[keyword] = weight
+        if not matched:
+            return None
+
+        scores = sorted(
+            ((sum(keywords.values()), -index) for index, keywords in matched.items()),
+            reverse=True
+        )
+        score, negative_index = scores[0]
+        runner_up = scores[1][0] if len(scores) > 1 else 0
+        return IntentMatch(self.intents[-negative_index], score, runner_up, sorted(matched[-negative_index]))
+
+    def respond(self, message):
+        """Canned answer for a message, used when the LLM is unavailable"""
+        match = self.classify(message)
+        return match.response if match else self.default_response
+
+    def route(self, message):
+        """
+        Return an ``IntentMatch`` when a message is a plain FAQ the canned
+        answer fully covers, so it can be answered without calling the LLM.
+        """
+        if len(normalize_prompt(message).split()) > self.FAQ_MAX_WORDS:
+            return None
+        match = self.classify(message)
+        if (
+            match
+            and match.intent.get('faq')
+            and match.score >= self.FAQ_MIN_SCORE
+            and match.score - match.runner_up >= self.FAQ_MIN_MARGIN
+        ):
+            return match
+        return None
+
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def get_intent_classifier():
+    """Process-wide ``IntentClassifier`` compiled from the intent table"""
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                _classifier = IntentClassifier()
+    return _classifier
@@ -0,0 +1,83 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_assistant.benchmark import ChatBenchmark, load_corpus
+
+
+class Command(BaseCommand):
+    help = "Replay chat sessions against a local mock Gemini server and report latency, tokens and cache/fallback rates"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--corpus',
+            help='JSONL file of {"wallet", "messages"} sessions (default: built-in sample corpus)'
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=50,
+            help='Mock upstream latency in milliseconds'
+        )
+        parser.add_argument(
+            '--jitter',
+            type=float,
+            default=0,
+            help='Extra random upstream latency of up to this many milliseconds'
+        )
+        parser.add_argument(
+            '--failure-rate',
+            type=float,
+            default=0,
+            help='Share of upstream requests that fail with a 503 (0-1)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=1,
+            help='Replay the corpus this many times'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Random seed for repeatable jitter and failures'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the report as JSON'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            corpus = load_corpus(options['corpus']) if options['corpus'] else None
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not load corpus: {e}")
+
+        report = ChatBenchmark(
+            corpus=corpus,
+            latency=options['latency'] / 1000,
+            jitter=options['jitter'] / 1000,
+            failure_rate=options['failure_rate'],
+            seed=options['seed'],
+            repeat=options['repeat'],
+        ).run()
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        latency = report['latency_ms']
+        self.stdout.write(f"Replayed {report['turns']} turn(s) in {report['sessions']} session(s)")
+        self.stdout.write(
+            f"Latency ms: p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  max {latency['max']}"
+        )
+        self.stdout.write(
+            f"Upstream: {report['upstream_requests']} request(s), {report['tokens_sent']} prompt tokens "
+            f"(~{report['tokens_per_upstream_request']} per request)"
+        )
+        self.stdout.write(
+            f"Cache hits: {report['cache_hits']} ({report['cache_hit_rate']:.1%})  "
+            f"Fallback rate: {report['fallback_rate']:.1%}"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Sources: {report['sources']}"))
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+
+from ai_assistant.storage import ConversationArchiver, compact_stored_metadata
+
+
+class Command(BaseCommand):
+    help = "Archive idle AI assistant sessions to compressed JSONL and delete them from the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=ConversationArchiver.RETENTION_DAYS,
+            help='Prune sessions with no activity for this many days'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=ConversationArchiver.BATCH_SIZE,
+            help='Number of sessions to archive and delete per transaction'
+        )
+        parser.add_argument(
+            '--archive-dir',
+            default=ConversationArchiver.ARCHIVE_DIR,
+            help='Directory for the .jsonl.gz archive files'
+        )
+        parser.add_argument(
+            '--no-archive',
+            action='store_true',
+            help='Delete idle sessions without writing an archive'
+        )
+        parser.add_argument(
+            '--compact-metadata',
+            action='store_true',
+            help='Also trim metadata on the messages that are kept'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be pruned without writing'
+        )
+
+    def handle(self, *args, **options):
+        archiver = ConversationArchiver(
+            retention_days=options['days'],
+            archive_dir=options['archive_dir'],
+            batch_size=options['batch_size'],
+            archive=not options['no_archive']
+        )
+        if options['dry_run']:
+            sessions, messages = archiver.preview()
+            self.stdout.write(f"Would prune {sessions} session(s) with {messages} message(s)")
+        else:
+            sessions, messages, files = archiver.run()
+            for path in files:
+                self.stdout.write(f"Wrote {path}")
+            self.stdout.write(self.style.SUCCESS(f"Pruned {sessions} session(s) with {messages} message(s)"))
+
+        if options['compact_metadata']:
+            compacted = compact_stored_metadata(batch_size=options['batch_size'], dry_run=options['dry_run'])
+            verb = 'Would compact' if options['dry_run'] else 'Compacted'
+            self.stdout.write(self.style.SUCCESS(f"{verb} metadata on {compacted} message(s)"))
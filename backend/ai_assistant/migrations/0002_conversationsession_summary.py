@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_assistant', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversationsession',
+            name='summary',
+            field=models.TextField(blank=True, help_text='Running summary of turns that no longer fit the prompt window'),
+        ),
+        migrations.AddField(
+            model_name='conversationsession',
+            name='summary_until_id',
+            field=models.BigIntegerField(default=0, help_text='Messages with an id up to this one are folded into the summary'),
+        ),
+        migrations.AlterField(
+            model_name='conversation',
+            name='model_used',
+            field=models.CharField(default='gemini-2.0-flash', max_length=50),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_assistant', '0002_conversationsession_summary'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='conversation',
+            name='response_source',
+            field=models.CharField(choices=[('api', 'API Response'), ('fallback', 'Fallback Response'), ('cached', 'Cached Response'), ('faq', 'FAQ Router Response')], default='api', max_length=20),
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:25
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_assistant', '0003_conversation_faq_response_source'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='Message',
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_assistant', '0004_delete_message'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conversationsession',
+            index=models.Index(fields=['user', 'updated_at'], name='ai_assistan_user_id_1101b1_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_assistant', '0005_conversationsession_user_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('caller', models.CharField(help_text='user:<id>, wallet:<address> or ip:<address>', max_length=100)),
+                ('day', models.DateField()),
+                ('requests', models.IntegerField(default=0)),
+                ('prompt_tokens', models.IntegerField(default=0)),
+                ('output_tokens', models.IntegerField(default=0)),
+                ('total_tokens', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-day', 'caller'],
+                'indexes': [models.Index(fields=['day'], name='ai_assistan_day_9aff97_idx')],
+                'unique_together': {('caller', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_assistant', '0006_tokenusage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tokenusage',
+            name='caller',
+            field=models.CharField(help_text='user:<id> or ip:<address>', max_length=100),
+        ),
+    ]
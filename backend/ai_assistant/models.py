@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 import json
+from .storage import compact_metadata
 
 class Conversation(models.Model):
     """Model to store AI assistant conversations"""
@@ -39,7 +40,8 @@ class Conversation(models.Model):
         choices=[
             ('api', 'API Response'),
             ('fallback', 'Fallback Response'),
-            ('cached', 'Cached Response')
+            ('cached', 'Cached Response'),
+            ('faq', 'FAQ Router Response')
         ],
         default='api'
     )
@@ -94,12 +96,23 @@ class ConversationSession(models.Model):
     )
     total_tokens = models.IntegerField(default=0)
     message_count = models.IntegerField(default=0)
+    summary = models.TextField(
+        blank=True,
+        help_text="Running summary of turns that no longer fit the prompt window"
+    )
+    summary_until_id = models.BigIntegerField(
+        default=0,
+        help_text="Messages with an id up to this one are folded into the summary"
+    )
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['user', 'updated_at']),
+        ]
     
     def __str__(self):
         return f"Session: {self.title or self.session_id[:20]}"
@@ -115,12 +128,15 @@ class ConversationSession(models.Model):
             session_id=self.session_id,
             role=role,
             message=message,
-            metadata=metadata or {},
+            metadata=compact_metadata(metadata),
             model_used=model_used or 'gemini-2.0-flash',
             response_source=source
         )
+        ConversationSession.objects.filter(pk=self.pk).update(
+            message_count=models.F('message_count') + 1,
+            updated_at=timezone.now()
+        )
         self.message_count += 1
-        self.save()
         return conv
 
 class AIFeedback(models.Model):
@@ -211,9 +227,10 @@ class DeFiTerm(models.Model):
     def __str__(self):
         return self.term
     
-    def increment_popularity(self):
-        self.popularity_score += 1
-        self.save()
+    def increment_popularity(self, hits=1):
+        # Atomic increment so concurrent lookups don't overwrite each other
+        DeFiTerm.objects.filter(pk=self.pk).update(popularity_score=models.F('popularity_score') + hits)
+        self.popularity_score += hits
     
     def get_usage_examples(self):
         """Parse usage examples JSON"""
@@ -331,29 +348,27 @@ class AIConfiguration(models.Model):
                 return {}
         else:
             return self.value
-        
 
-class Message(models.Model):
-    """Individual message in a conversation"""
-    
-    ROLE_CHOICES = [
-        ('user', 'User'),
-        ('assistant', 'Assistant'),
-    ]
+class TokenUsage(models.Model):
+    """Daily LLM usage per caller (user or client address)"""
     
-    conversation = models.ForeignKey(
-        ConversationSession,
-        on_delete=models.CASCADE,
-        related_name='messages'
+    caller = models.CharField(
+        max_length=100,
+        help_text="user:<id> or ip:<address>"
     )
-    role = models.CharField(max_length=20, choices=ROLE_CHOICES)
-    content = models.TextField()
-    metadata = models.JSONField(default=dict, blank=True)
-    model_used = models.CharField(max_length=50, default='gemini-2.0-flash-exp')
-    created_at = models.DateTimeField(default=timezone.now)
+    day = models.DateField()
+    requests = models.IntegerField(default=0)
+    prompt_tokens = models.IntegerField(default=0)
+    output_tokens = models.IntegerField(default=0)
+    total_tokens = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
-        ordering = ['created_at']
+        ordering = ['-day', 'caller']
+        unique_together = ['caller', 'day']
+        indexes = [
+            models.Index(fields=['day']),
+        ]
     
     def __str__(self):
-        return f"{self.role}: {self.content[:50]}..."
\ No newline at end of file
+        return f"{self.caller} on {self.day}: {self.total_tokens} tokens"
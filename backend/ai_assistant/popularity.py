@@ -0,0 +1,118 @@
+"""
+Buffered glossary popularity counters and trending terms.
+
+Term lookups are counted in memory and written to ``DeFiTerm.popularity_score``
+in batches: at most once per ``FLUSH_INTERVAL`` (or once ``FLUSH_THRESHOLD``
+hits are pending), and at process exit. Each flush issues one
+``UPDATE ... SET popularity_score = popularity_score + n`` per distinct
+increment, so concurrent workers never overwrite each other's counts.
+
+Trending terms come from per-minute hit buckets kept alongside the buffer.
+They reflect the lookups this process served, which is a fair sample when
+requests are spread across workers.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from django.conf import settings
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+
+class PopularityBuffer:
+    """Aggregates glossary hits in memory and flushes them as batched F() updates"""
+
+    FLUSH_INTERVAL = getattr(settings, 'GLOSSARY_POPULARITY_FLUSH_INTERVAL', 30)
+    FLUSH_THRESHOLD = 1000
+    TRENDING_WINDOW_MINUTES = 60
+
+    def __init__(self, flush_interval=None, clock=time.time):
+        self.flush_interval = self.FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._pending_total = 0
+        self._last_flush = clock()
+        # (minute, Counter of term name -> hits), oldest first
+        self._buckets = deque()
+
+    def record(self, entry):
+        """Count one lookup of a glossary entry (as returned by the glossary index)"""
+        minute = int(self.clock() // 60)
+        with self._lock:
+            if not self._buckets or self._buckets[-1][0] != minute:
+                self._buckets.append((minute, Counter()))
+                while self._buckets[0][0] <= minute - self.TRENDING_WINDOW_MINUTES:
+                    self._buckets.popleft()
+            self._buckets[-1][1][entry['term']] += 1
+
+            # Built-in glossary entries have no row to update
+            if entry.get('id') is None:
+                return
+            self._pending[entry['id']] += 1
+            self._pending_total += 1
+            due = (
+                self._pending_total >= self.FLUSH_THRESHOLD
+                or self.clock() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write pending hits to the database; returns the number of terms updated"""
+        from .models import DeFiTerm
+
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._pending_total = 0
+            self._last_flush = self.clock()
+        if not pending:
+            return 0
+
+        by_increment = defaultdict(list)
+        for term_id, hits in pending.items():
+            by_increment[hits].append(term_id)
+        try:
+            for hits, term_ids in by_increment.items():
+                DeFiTerm.objects.filter(id__in=term_ids).update(
+                    popularity_score=F('popularity_score') + hits
+                )
+        except Exception:
+            logger.exception("Failed to flush glossary popularity counters")
+            # Put the hits back so the next flush retries them
+            with self._lock:
+                self._pending.update(pending)
+                self._pending_total += sum(pending.values())
+            return 0
+        logger.debug(f"Flushed popularity for {len(pending)} glossary term(s)")
+        return len(pending)
+
+    def trending(self, limit=10, window_minutes=None):
+        """``[(term, hits), ...]`` for the most looked-up terms in the recent window"""
+        window_minutes = min(window_minutes or self.TRENDING_WINDOW_MINUTES, self.TRENDING_WINDOW_MINUTES)
+        since = int(self.clock() // 60) - window_minutes
+        totals = Counter()
+        with self._lock:
+            for minute, hits in self._buckets:
+                if minute > since:
+                    totals.update(hits)
+        return sorted(totals.items(), key=lambda item: (-item[1], item[0].lower()))[:limit]
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_popularity_buffer():
+    """Process-wide ``PopularityBuffer``, flushed at interpreter exit"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = PopularityBuffer()
+                atexit.register(_buffer.flush)
+    return _buffer
@@ -0,0 +1,149 @@
+"""
+Prompt assembly for Gemini requests.
+
+The static assistant instructions are compacted and hashed once per process
+into a versioned ``SystemPrompt`` and sent through Gemini's
+``systemInstruction`` field, instead of being replayed as a fake user/model
+exchange on every call. When provider-side context caching is enabled,
+``ContextCache`` uploads that prompt once as a ``cachedContents`` resource and
+requests reference it by name, so the instructions aren't resent at all.
+
+Token counts here are local estimates (about four characters per token),
+good enough to compare prompt layouts without calling the tokenizer API.
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .context import SYSTEM_CONTEXT
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+
+# The old layout wrapped the instructions in a user turn and a canned reply
+LEGACY_PREAMBLE = "SYSTEM INSTRUCTIONS:\n{context}\n\nPlease acknowledge you understand these instructions."
+LEGACY_ACKNOWLEDGEMENT = (
+    "I understand. I'm the Attestify AI assistant ready to help with DeFi questions, "
+    "strategy recommendations, and platform guidance."
+)
+
+
+def estimate_tokens(text):
+    """Rough token count for a piece of text"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def compact(text):
+    """Strip trailing spaces and collapse runs of blank lines"""
+    text = re.sub(r'[ \t]+\n', '\n', text)
+    return re.sub(r'\n{3,}', '\n\n', text).strip()
+
+
+class SystemPrompt:
+    """The static system instructions, compacted and versioned by content hash"""
+
+    def __init__(self, text):
+        self.text = compact(text)
+        self.version = hashlib.sha256(self.text.encode()).hexdigest()[:12]
+        self.tokens = estimate_tokens(self.text)
+        self.instruction = {'parts': [{'text': self.text}]}
+
+    def __repr__(self):
+        return f"<SystemPrompt {self.version} ~{self.tokens} tokens>"
+
+    def tokens_saved(self, user_context='', cached=False):
+        """
+        Estimated input tokens saved per request compared with the legacy
+        preamble. With a context cache handle the instructions aren't sent.
+        """
+        legacy = estimate_tokens(LEGACY_PREAMBLE.format(context=SYSTEM_CONTEXT + user_context))
+        legacy += estimate_tokens(LEGACY_ACKNOWLEDGEMENT)
+        current = estimate_tokens(user_context) + (0 if cached else self.tokens)
+        return legacy - current
+
+
+_system_prompt = None
+_system_prompt_lock = threading.Lock()
+
+
+def get_system_prompt():
+    """The process-wide ``SystemPrompt``, built on first use (warmed in AppConfig.ready)"""
+    global _system_prompt
+    if _system_prompt is None:
+        with _system_prompt_lock:
+            if _system_prompt is None:
+                _system_prompt = SystemPrompt(SYSTEM_CONTEXT)
+                logger.info(f"Built system prompt {_system_prompt.version} (~{_system_prompt.tokens} tokens)")
+    return _system_prompt
+
+
+class ContextCache:
+    """
+    Keeps a Gemini ``cachedContents`` handle for the current system prompt.
+
+    The handle is shared between workers through Django's cache, keyed by
+    model and prompt version, and refreshed shortly before it expires. If
+    creating one fails, requests fall back to an inline ``systemInstruction``
+    and creation isn't retried for ``RETRY_AFTER`` seconds.
+    """
+
+    TTL = getattr(settings, 'GEMINI_CONTEXT_CACHE_TTL', 3600)
+    REFRESH_MARGIN = 60
+    RETRY_AFTER = 300
+
+    def __init__(self, client, api_base, api_key, prompt=None):
+        self.client = client
+        self.url = f"{api_base}/cachedContents?key={api_key}"
+        self.prompt = prompt or get_system_prompt()
+        self._disabled_until = 0
+
+    def _cache_key(self, model_name):
+        return f"ai_assistant:context_cache:{model_name}:{self.prompt.version}"
+
+    def _request_body(self, model_name):
+        return {
+            'model': f"models/{model_name}",
+            'displayName': f"attestify-system-{self.prompt.version}",
+            'systemInstruction': self.prompt.instruction,
+            'ttl': f"{self.TTL}s",
+        }
+
+    def _store(self, model_name, response):
+        if response.status_code != 200:
+            raise RuntimeError(f"cachedContents returned {response.status_code}: {response.text[:200]}")
+        name = response.json()['name']
+        cache.set(self._cache_key(model_name), name, self.TTL - self.REFRESH_MARGIN)
+        logger.info(f"Created Gemini context cache {name} for prompt {self.prompt.version}")
+        return name
+
+    def _failed(self, error):
+        logger.warning(f"Context cache unavailable, sending instructions inline: {error}")
+        self._disabled_until = time.monotonic() + self.RETRY_AFTER
+
+    def handle(self, model_name):
+        """Name of a live cached content resource, or None to send the prompt inline"""
+        name = cache.get(self._cache_key(model_name))
+        if name or time.monotonic() < self._disabled_until:
+            return name
+        try:
+            return self._store(model_name, self.client.post(self.url, json=self._request_body(model_name)))
+        except Exception as e:
+            self._failed(e)
+            return None
+
+    async def ahandle(self, model_name):
+        """Async variant of ``handle``"""
+        name = cache.get(self._cache_key(model_name))
+        if name or time.monotonic() < self._disabled_until:
+            return name
+        try:
+            return self._store(model_name, await self.client.apost(self.url, json=self._request_body(model_name)))
+        except Exception as e:
+            self._failed(e)
+            return None
@@ -0,0 +1,206 @@
+"""
+Per-caller rate limits, daily token quotas and usage accounting.
+
+Callers are identified by user id or, for anonymous requests, client address
+(see ``caller_key``). The ``X-Wallet-Address`` header is not authenticated,
+so it never earns a budget of its own. Behind a reverse proxy set DRF's
+``NUM_PROXIES`` so ``client_ip`` reads the address the proxy forwarded. Two
+checks run before a chat turn reaches Gemini:
+
+* a token-bucket rate limiter: each caller may burst up to
+  ``AI_RATE_LIMIT_BURST`` requests, refilled at ``AI_RATE_LIMIT_PER_MINUTE``.
+  ``MemoryRateLimiter`` keeps buckets in this process; ``CacheRateLimiter``
+  keeps them in the Django cache so every worker sees the same budget
+  (``AI_RATE_LIMIT_BACKEND`` picks one). That only holds if ``CACHES`` is
+  shared between workers (e.g. Redis via ``REDIS_URL``); the
+  ``ai_assistant.W001`` system check warns when it isn't.
+* a daily token quota (``AI_DAILY_TOKEN_QUOTA``) checked against the
+  caller's ``TokenUsage`` row for today.
+
+After the turn, ``UsageTracker.record`` adds Gemini's reported token counts
+to that row with F() increments, which also feeds the per-day usage report.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+from rest_framework.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+
+def client_ip(request):
+    """
+    Address of the client. Behind ``NUM_PROXIES`` trusted proxies it is the
+    X-Forwarded-For entry the outermost proxy added; entries before it are
+    whatever the client chose to send and are ignored.
+    """
+    remote_addr = request.META.get('REMOTE_ADDR', '')
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    proxies = api_settings.NUM_PROXIES
+    if not proxies or not forwarded:
+        return remote_addr
+    addresses = [address.strip() for address in forwarded.split(',') if address.strip()]
+    return addresses[-min(proxies, len(addresses))] if addresses else remote_addr
+
+
+def caller_key(user=None, remote_addr=''):
+    """Stable identity a request is rate limited and billed under"""
+    if user is not None:
+        return f"user:{user.id}"
+    return f"ip:{remote_addr or 'unknown'}"
+
+
+class MemoryRateLimiter:
+    """Token buckets held in this process"""
+
+    def __init__(self, per_minute, burst, clock=time.monotonic):
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def _take(self, state, now):
+        """Refill a ``(tokens, updated)`` bucket and try to take one token"""
+        tokens, updated = state or (self.burst, now)
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            return (tokens - 1, now), 0
+        return (tokens, now), (1 - tokens) / self.rate
+
+    def allow(self, key):
+        """``(allowed, retry_after_seconds)`` for one request by ``key``"""
+        if self.rate <= 0:
+            return True, 0
+        with self._lock:
+            self._buckets[key], retry_after = self._take(self._buckets.get(key), self.clock())
+        return retry_after == 0, retry_after
+
+
+class CacheRateLimiter(MemoryRateLimiter):
+    """Token buckets in the shared cache, so all workers share one budget per caller"""
+
+    KEY_PREFIX = 'ai_assistant:ratelimit:'
+    LOCK_TIMEOUT = 1
+    LOCK_ATTEMPTS = 5
+
+    def __init__(self, per_minute, burst, clock=time.time):
+        super().__init__(per_minute, burst, clock)
+
+    def allow(self, key):
+        if self.rate <= 0:
+            return True, 0
+        bucket_key = self.KEY_PREFIX + key
+        lock_key = bucket_key + ':lock'
+        for attempt in range(self.LOCK_ATTEMPTS):
+            # cache.add is atomic on every backend, so it doubles as a short lock
+            if cache.add(lock_key, 1, self.LOCK_TIMEOUT):
+                break
+            time.sleep(0.005 * (attempt + 1))
+        else:
+            # Fail open: a contended lock shouldn't turn into an outage
+            logger.warning(f"Rate limit bucket for {key} is contended, allowing request")
+            return True, 0
+        try:
+            state, retry_after = self._take(cache.get(bucket_key), self.clock())
+            # An idle bucket is full again after burst / rate seconds
+            cache.set(bucket_key, state, int(self.burst / self.rate) + 1)
+        finally:
+            cache.delete(lock_key)
+        return retry_after == 0, retry_after
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Process-wide rate limiter configured from settings"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                backend = getattr(settings, 'AI_RATE_LIMIT_BACKEND', 'cache')
+                limiter_class = MemoryRateLimiter if backend == 'memory' else CacheRateLimiter
+                _limiter = limiter_class(
+                    per_minute=getattr(settings, 'AI_RATE_LIMIT_PER_MINUTE', 20),
+                    burst=getattr(settings, 'AI_RATE_LIMIT_BURST', 10),
+                )
+    return _limiter
+
+
+class UsageTracker:
+    """Daily token accounting backed by ``TokenUsage``"""
+
+    DAILY_TOKEN_QUOTA = getattr(settings, 'AI_DAILY_TOKEN_QUOTA', 100000)
+    REPORT_MAX_DAYS = 90
+
+    def __init__(self, daily_quota=None):
+        self.daily_quota = self.DAILY_TOKEN_QUOTA if daily_quota is None else daily_quota
+
+    def used_today(self, caller):
+        from .models import TokenUsage
+
+        used = TokenUsage.objects.filter(caller=caller, day=timezone.localdate()).values_list(
+            'total_tokens', flat=True
+        ).first()
+        return used or 0
+
+    def over_quota(self, caller):
+        """True once the caller has spent today's token quota (0 disables the quota)"""
+        return bool(self.daily_quota) and self.used_today(caller) >= self.daily_quota
+
+    def record(self, caller, ai_response):
+        """Add one request and its reported token counts to today's row"""
+        from .models import TokenUsage
+
+        increments = {
+            'requests': F('requests') + 1,
+            'prompt_tokens': F('prompt_tokens') + ai_response.get('prompt_tokens', 0),
+            'output_tokens': F('output_tokens') + ai_response.get('output_tokens', 0),
+            'total_tokens': F('total_tokens') + ai_response.get('tokens_used', 0),
+            'updated_at': timezone.now(),
+        }
+        rows = TokenUsage.objects.filter(caller=caller, day=timezone.localdate())
+        if rows.update(**increments):
+            return
+        try:
+            with transaction.atomic():
+                TokenUsage.objects.create(
+                    caller=caller,
+                    day=timezone.localdate(),
+                    requests=1,
+                    prompt_tokens=ai_response.get('prompt_tokens', 0),
+                    output_tokens=ai_response.get('output_tokens', 0),
+                    total_tokens=ai_response.get('tokens_used', 0),
+                )
+        except IntegrityError:
+            # Another worker created today's row first
+            rows.update(**increments)
+
+    def daily_report(self, days=7, caller=None):
+        """Usage totals per day, newest first"""
+        from .models import TokenUsage
+
+        days = max(1, min(days, self.REPORT_MAX_DAYS))
+        rows = TokenUsage.objects.filter(day__gt=timezone.localdate() - timedelta(days=days))
+        if caller:
+            rows = rows.filter(caller=caller)
+        return list(
+            rows.values('day')
+            .annotate(
+                callers=Count('caller'),
+                requests=Sum('requests'),
+                prompt_tokens=Sum('prompt_tokens'),
+                output_tokens=Sum('output_tokens'),
+                total_tokens=Sum('total_tokens'),
+            )
+            .order_by('-day')
+        )
@@ -0,0 +1,263 @@
+"""
+Keeping Gemini incidents from stalling the chat endpoint.
+
+``CircuitBreaker`` watches upstream calls. After ``FAILURE_THRESHOLD``
+consecutive failures (errors, 429/5xx responses, or calls slower than
+``SLOW_CALL_SECONDS``) it opens, and the assistant answers with the fallback
+straight away instead of waiting on a struggling upstream. After
+``RESET_TIMEOUT`` seconds a single trial call is let through (half-open): it
+closes the breaker on success and reopens it on failure. State is per
+process, like the connection pool.
+
+``LatencyTracker`` keeps recent successful call latencies. When hedging is
+on, ``hedged_call``/``ahedged_call`` start a second identical request if the
+first hasn't answered by the tracked p95 after it was sent, and use the
+first good answer, so a single slow upstream replica doesn't set the tail
+latency. ``HedgeBudget`` bounds how many hedges may be sent.
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a half-open trial call"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    FAILURE_THRESHOLD = getattr(settings, 'AI_BREAKER_FAILURE_THRESHOLD', 5)
+    RESET_TIMEOUT = getattr(settings, 'AI_BREAKER_RESET_TIMEOUT', 30)
+    SLOW_CALL_SECONDS = getattr(settings, 'AI_BREAKER_SLOW_CALL_SECONDS', 10)
+
+    def __init__(self, failure_threshold=None, reset_timeout=None, slow_call_seconds=None, clock=time.monotonic):
+        self.failure_threshold = failure_threshold or self.FAILURE_THRESHOLD
+        self.reset_timeout = self.RESET_TIMEOUT if reset_timeout is None else reset_timeout
+        self.slow_call_seconds = slow_call_seconds or self.SLOW_CALL_SECONDS
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0
+        self._trial_in_flight = False
+        self._stats = {'rejected': 0, 'opened': 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self):
+        """Whether a call may go upstream now"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self._stats['rejected'] += 1
+            return False
+
+    def record(self, ok, elapsed=0):
+        """Report how an allowed call went; slow successes count as failures"""
+        failed = not ok or elapsed >= self.slow_call_seconds
+        with self._lock:
+            self._trial_in_flight = False
+            if not failed:
+                self._state = self.CLOSED
+                self._failures = 0
+                return
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._stats['opened'] += 1
+                    logger.warning(f"Gemini circuit opened after {self._failures} failed or slow call(s)")
+                self._state = self.OPEN
+                self._opened_at = self.clock()
+
+    def stats(self):
+        state = self.state
+        with self._lock:
+            return {'state': state, 'consecutive_failures': self._failures, **self._stats}
+
+
+class LatencyTracker:
+    """Percentiles over the most recent successful call latencies"""
+
+    SAMPLES = 200
+    MIN_SAMPLES = 20
+    DEFAULT_DELAY = getattr(settings, 'AI_HEDGE_DEFAULT_DELAY', 2.0)
+    MIN_DELAY = 0.05
+
+    def __init__(self, default_delay=None):
+        self.default_delay = self.DEFAULT_DELAY if default_delay is None else default_delay
+        self._samples = deque(maxlen=self.SAMPLES)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct):
+        with self._lock:
+            ordered = sorted(self._samples)
+        if len(ordered) < self.MIN_SAMPLES:
+            return None
+        return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+    def hedge_delay(self):
+        """Seconds to wait before hedging: the recent p95, or the default until there's history"""
+        p95 = self.percentile(95)
+        return self.default_delay if p95 is None else max(p95, self.MIN_DELAY)
+
+
+class HedgeBudget:
+    """
+    Caps extra requests sent as hedges: each primary call earns ``RATIO`` of
+    a hedge, and at most ``MAX_IN_FLIGHT`` hedges run at once, so hedging
+    can't multiply upstream load when everything is slow.
+    """
+
+    RATIO = getattr(settings, 'AI_HEDGE_RATIO', 0.1)
+    MAX_IN_FLIGHT = getattr(settings, 'AI_HEDGE_MAX_IN_FLIGHT', 4)
+
+    def __init__(self, ratio=None, max_in_flight=None):
+        self.ratio = self.RATIO if ratio is None else ratio
+        self.max_in_flight = max_in_flight or self.MAX_IN_FLIGHT
+        self._lock = threading.Lock()
+        self._tokens = float(self.max_in_flight)
+        self._in_flight = 0
+        self._stats = {'hedged': 0, 'denied': 0}
+
+    def earn(self):
+        """Credit one primary call"""
+        with self._lock:
+            self._tokens = min(float(self.max_in_flight), self._tokens + self.ratio)
+
+    def acquire(self):
+        """Take budget for one hedge; False if none is left"""
+        with self._lock:
+            if self._tokens < 1 or self._in_flight >= self.max_in_flight:
+                self._stats['denied'] += 1
+                return False
+            self._tokens -= 1
+            self._in_flight += 1
+            self._stats['hedged'] += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            return {'in_flight': self._in_flight, **self._stats}
+
+
+_budget = None
+_budget_lock = threading.Lock()
+
+
+def get_hedge_budget():
+    """Process-wide ``HedgeBudget``"""
+    global _budget
+    if _budget is None:
+        with _budget_lock:
+            if _budget is None:
+                _budget = HedgeBudget()
+    return _budget
+
+
+async def ahedged_call(fn, delay, accept=None, budget=None):
+    """
+    Await ``fn(sent)``; if it hasn't answered ``delay`` seconds after calling
+    ``sent()``, and the budget allows, start ``fn`` again and use the first
+    answer ``accept`` approves (a rejected answer only wins if nothing better
+    arrives). The other attempt is cancelled.
+
+    Returns ``(result, losers)``: ``losers`` has the result of every other
+    attempt that finished, and ``None`` for one cancelled after it was sent,
+    so the caller can account for what it cost.
+    """
+    accept = accept or (lambda result: True)
+    budget = budget or get_hedge_budget()
+    budget.earn()
+    attempts = []
+
+    def start():
+        sent = asyncio.Event()
+        attempts.append((asyncio.ensure_future(fn(sent.set)), sent))
+        return attempts[-1]
+
+    first, first_sent = start()
+    hedging = False
+    try:
+        # Time queued for a connection slot doesn't count towards the delay
+        waiter = asyncio.ensure_future(first_sent.wait())
+        await asyncio.wait({first, waiter}, return_when=asyncio.FIRST_COMPLETED)
+        waiter.cancel()
+        if not first.done():
+            await asyncio.wait({first}, timeout=delay)
+        if not first.done() and budget.acquire():
+            hedging = True
+            logger.info(f"Gemini call still pending after {delay:.2f}s, sending a hedged request")
+            start()
+
+        pending = {task for task, _ in attempts}
+        winner = rejected = error = None
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                elif accept(task.result()):
+                    winner = winner or task
+                else:
+                    rejected = rejected or task
+        winner = winner or rejected
+        if winner is None:
+            raise error
+
+        losers = []
+        for task, sent in attempts:
+            if task is winner:
+                continue
+            if not task.done():
+                task.cancel()
+                if sent.is_set():
+                    losers.append(None)
+            elif not task.cancelled() and task.exception() is None:
+                losers.append(task.result())
+        return winner.result(), losers
+    finally:
+        for task, _ in attempts:
+            task.cancel()
+        if hedging:
+            budget.release()
+
+
+_thread_loops = threading.local()
+
+
+def hedged_call(fn, delay, accept=None, budget=None):
+    """
+    Blocking ``ahedged_call`` for sync callers. Both attempts run on this
+    thread's own event loop, the first straight away, so hedging needs no
+    worker pool and the loop's connection pool is reused between calls.
+    """
+    loop = getattr(_thread_loops, 'loop', None)
+    if loop is None:
+        loop = _thread_loops.loop = asyncio.new_event_loop()
+    return loop.run_until_complete(ahedged_call(fn, delay, accept, budget))
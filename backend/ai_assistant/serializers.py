@@ -1,7 +1,9 @@
 from rest_framework import serializers
-from .models import Conversation, Message
+from .models import Conversation, ConversationSession
 
 class MessageSerializer(serializers.ModelSerializer):
+    content = serializers.CharField(source='message', read_only=True)
+    
     class Meta:
         model = Conversation
         fields = ['id', 'role', 'content', 'metadata', 'created_at']
@@ -9,25 +11,23 @@ class MessageSerializer(serializers.ModelSerializer):
 
 
 class ConversationSerializer(serializers.ModelSerializer):
-    message_count = serializers.SerializerMethodField()
+    """
+    One entry in the session list. Expects the ``message_total`` and
+    ``last_message_*`` annotations added by ``views.user_conversations``.
+    """
+    message_count = serializers.IntegerField(source='message_total', read_only=True)
     last_message = serializers.SerializerMethodField()
     
     class Meta:
-        model = Conversation
-        fields = ['id', 'session_id', 'message_count', 'last_message', 'created_at', 'updated_at']
+        model = ConversationSession
+        fields = ['id', 'session_id', 'title', 'message_count', 'last_message', 'created_at', 'updated_at']
         read_only_fields = ['id', 'session_id', 'created_at', 'updated_at']
     
-    def get_message_count(self, obj):
-        return obj.messages.count()
-    
     def get_last_message(self, obj):
-        last_msg = obj.messages.last()
-        if last_msg:
-            return {
-                'content': last_msg.content[:100],
-                'role': last_msg.role,
-                'created_at': last_msg.created_at
-            }
-        return None
-
-
+        if obj.last_message_at is None:
+            return None
+        return {
+            'content': obj.last_message_content,
+            'role': obj.last_message_role,
+            'created_at': obj.last_message_at
+        }
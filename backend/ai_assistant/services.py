@@ -1,22 +1,95 @@
 import os
+import json
+import hashlib
 import logging
-import requests
-from typing import List, Dict, Optional
-from .context import SYSTEM_CONTEXT, DEFI_GLOSSARY, STRATEGY_COMPARISON
+import time
+import httpx
+from typing import AsyncIterator, List, Dict, Optional
+from .cache import ResponseCache, get_response_cache, normalize_prompt
+from .client import LLMClient, get_client
+from .coalesce import SingleFlight
+from .config import _in_event_loop, aget_ai_config, get_ai_config
+from .intents import IntentClassifier, get_intent_classifier
+from .context import STRATEGY_COMPARISON
+from .glossary import get_glossary_index
+from .popularity import get_popularity_buffer
+from .prompts import ContextCache, get_system_prompt
+from .resilience import CircuitBreaker, LatencyTracker, ahedged_call, hedged_call
 
 logger = logging.getLogger(__name__)
 
+# Minimum search score for explain_term to answer with a non-exact match
+GLOSSARY_MATCH_SCORE = 1.5
+
+
+def token_usage(metadata: Optional[Dict]) -> Dict[str, int]:
+    """Token counts from a Gemini ``usageMetadata`` block"""
+    metadata = metadata or {}
+    return {
+        'prompt_tokens': metadata.get('promptTokenCount', 0),
+        'output_tokens': metadata.get('candidatesTokenCount', 0),
+        'tokens_used': metadata.get('totalTokenCount', 0),
+    }
+
 class AIAssistantService:
     """Service for interacting with Google Gemini API"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        client: Optional[LLMClient] = None,
+        cache: Optional[ResponseCache] = None,
+        intents: Optional[IntentClassifier] = None,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.client = client or get_client()
+        self.cache = cache if cache is not None else get_response_cache()
+        self.inflight = SingleFlight()
+        self.intents = intents or get_intent_classifier()
+        self.popularity = get_popularity_buffer()
+        # Serve the fallback at once while Gemini is failing or too slow
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+        # Send a second request when the first outlives the recent p95
+        self.hedging = os.environ.get('AI_HEDGED_REQUESTS', '').lower() in ('1', 'true', 'yes')
+        # Answer plain FAQ openers from the intent table without calling Gemini
+        self.faq_router = os.environ.get('AI_FAQ_ROUTER', '').lower() in ('1', 'true', 'yes')
         self.api_key = os.environ.get('GOOGLE_API_KEY')
-        self.api_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash-exp:generateContent"
-        self.model = "gemini-2.0-flash" 
+        self.api_base = os.environ.get('GEMINI_API_BASE', 'https://generativelanguage.googleapis.com/v1beta')
+        self.system_prompt = get_system_prompt()
+        # Provider-side caching of the system prompt is opt-in: Gemini only
+        # accepts cachedContents above a minimum size and bills storage time
+        self.context_cache = None
+        if os.environ.get('GEMINI_CONTEXT_CACHE', '').lower() in ('1', 'true', 'yes'):
+            self.context_cache = ContextCache(self.client, self.api_base, self.api_key, self.system_prompt)
+    
+    # Model, sampling and timeout are tunable at runtime through AIConfiguration
+    
+    @property
+    def config(self):
+        return get_ai_config()
+    
+    @property
+    def model_name(self) -> str:
+        return self.config.get('model')
+    
+    @property
+    def api_url(self) -> str:
+        return f"{self.api_base}/models/{self.model_name}:generateContent"
+    
+    @property
+    def stream_url(self) -> str:
+        return f"{self.api_base}/models/{self.model_name}:streamGenerateContent"
+    
+    @property
+    def timeout(self) -> float:
+        return self.config.get('request_timeout')
         
     def _build_context(self, user_data: Optional[Dict] = None) -> str:
-        """Build enhanced context with user-specific data"""
-        context = SYSTEM_CONTEXT
+        """
+        Build the user-specific context section. The static instructions are
+        sent separately as the system prompt.
+        """
+        context = ""
         
         if user_data:
             user_context = "\n\n## Current User Information\n"
@@ -35,130 +108,29 @@ class AIAssistantService:
                 user_context += f"- Current Strategy: {strategy.title()}\n"
                 user_context += f"- Expected APY: {STRATEGY_COMPARISON[strategy]['apy_range']}\n"
             
+            if user_data.get('active_goals'):
+                goals = user_data['active_goals']
+                user_context += f"- Active Savings Goals: {goals['count']} ({goals['saved']} of {goals['target']} cUSD saved)\n"
+            
             if user_data.get('is_new_user'):
                 user_context += "- Note: This user is new to the platform\n"
             
+            if user_data.get('conversation_summary'):
+                user_context += "\n## Earlier In This Conversation\n"
+                user_context += f"{user_data['conversation_summary']}\n"
+            
             context += user_context
         
         return context
     
     def _create_fallback_response(self, user_message: str) -> str:
         """Generate a helpful fallback response when API fails"""
-        message_lower = user_message.lower()
-        
-        # Strategy questions
-        if any(word in message_lower for word in ['strategy', 'conservative', 'balanced', 'growth', 'which']):
-            return """I can help you choose a strategy! Here are the three options:
-
-**Conservative (3-5% APY)** - Low risk, best for beginners and short-term savings
-**Balanced (5-10% APY)** - Medium risk, good for regular savers
-**Growth (10-15% APY)** - Higher risk, for experienced users and long-term goals
-
-To recommend the best one, I'd like to know:
-1. How long do you plan to keep funds deposited?
-2. How comfortable are you with risk?
-3. Is this your first time using DeFi?"""
-        
-        # Security questions
-        elif any(word in message_lower for word in ['safe', 'secure', 'hack', 'scam', 'trust']):
-            return """Attestify is designed with security as the top priority:
-
-✅ **Non-Custodial**: You always control your funds
-✅ **Audited Contracts**: Following OpenZeppelin security standards
-✅ **Battle-Tested**: Uses Aave Market, a proven DeFi protocol
-✅ **Identity Verification**: Required to prevent fraud
-✅ **Emergency Pause**: Can halt operations if issues detected
-
-Remember: All DeFi carries some risk. Only invest what you can afford to lose!"""
-        
-        # Withdrawal questions
-        elif any(word in message_lower for word in ['withdraw', 'take out', 'remove', 'access']):
-            return """You can withdraw your funds anytime! Here's how:
-
-1. Go to your dashboard
-2. Click "Withdraw"
-3. Enter the amount you want to withdraw
-4. Confirm the transaction
-
-**No lock-ups, no penalties, no waiting.** Your funds are available 24/7. Withdrawals typically complete in under 30 seconds."""
-        
-        # Deposit questions
-        elif any(word in message_lower for word in ['deposit', 'add', 'invest', 'start', 'minimum']):
-            return """Getting started is simple:
-
-**Minimum**: 1 cUSD (we recommend at least 10 cUSD)
-**Maximum**: 10,000 cUSD per user
-
-Steps:
-1. Verify your identity (2 minutes)
-2. Choose your strategy
-3. Enter deposit amount
-4. Confirm transaction
-
-Your funds start earning immediately!"""
-        
-        # APY/Yield questions
-        elif any(word in message_lower for word in ['apy', 'yield', 'earn', 'return', 'interest']):
-            return """Attestify offers three yield tiers:
-
-🛡️ **Conservative**: 3-5% APY (Low risk)
-⚖️ **Balanced**: 5-10% APY (Medium risk)
-📈 **Growth**: 10-15% APY (Higher risk)
-
-Yields come from Aave Market lending. They fluctuate based on market demand but have been stable historically.
-
-**Important**: Past performance doesn't guarantee future returns. Yields can vary."""
-        
-        # DeFi education
-        elif any(word in message_lower for word in ['what is', 'explain', 'how does', 'understand']):
-            return """I'm here to help you understand DeFi! Some key concepts:
-
-**DeFi**: Decentralized Finance - earning interest without traditional banks
-**APY**: Annual Percentage Yield - your yearly earning rate
-**Smart Contracts**: Automated programs that handle your funds safely
-**Stablecoins**: Cryptocurrencies pegged to $1 USD (like cUSD)
-
-What specific concept would you like me to explain?"""
-        
-        # General greeting/help
-        elif any(word in message_lower for word in ['hello', 'hi', 'hey', 'help', 'start']):
-            return """Hello! I'm your Attestify AI assistant . I can help you with:
-
- -Choosing the right investment strategy
- -Understanding platform security
- -Tracking your earnings
- -Learning about DeFi concepts
- -Answering any questions about Attestify
-
-What would you like to know?"""
-        
-        # Default response
-        else:
-            return """I'm here to help you with Attestify! I can answer questions about:
-
-- Investment strategies (Conservative, Balanced, Growth)
-- Security and how your funds are protected
-- Deposits and withdrawals
-- Expected yields and returns
-- How DeFi and Attestify work
-- General DeFi concepts and education
-
-What specific question can I help you with?"""
+        return self.intents.respond(user_message)
     
-    def _format_messages_for_gemini(self, messages: List[Dict[str, str]], system_context: str) -> List[Dict]:
+    def _format_messages_for_gemini(self, messages: List[Dict[str, str]], user_context: str = "") -> List[Dict]:
         """Convert messages to Gemini format"""
         gemini_messages = []
         
-        # Add system context as first user message
-        gemini_messages.append({
-            "role": "user",
-            "parts": [{"text": f"SYSTEM INSTRUCTIONS:\n{system_context}\n\nPlease acknowledge you understand these instructions."}]
-        })
-        gemini_messages.append({
-            "role": "model",
-            "parts": [{"text": "I understand. I'm the Attestify AI assistant ready to help with DeFi questions, strategy recommendations, and platform guidance."}]
-        })
-        
         # Add conversation history
         for msg in messages:
             role = "model" if msg["role"] == "assistant" else "user"
@@ -167,8 +139,108 @@ What specific question can I help you with?"""
                 "parts": [{"text": msg["content"]}]
             })
         
+        # User-specific context rides along with the latest question so the
+        # system prompt stays identical (and cacheable) across users
+        if user_context and gemini_messages and gemini_messages[-1]["role"] == "user":
+            gemini_messages[-1]["parts"].insert(0, {"text": user_context.strip()})
+        
         return gemini_messages
     
+    def _build_payload(
+        self,
+        messages: List[Dict[str, str]],
+        user_data: Optional[Dict] = None,
+        cached_content: Optional[str] = None
+    ) -> Dict:
+        """Build the Gemini request body for a conversation"""
+        user_context = self._build_context(user_data)
+        
+        payload = {
+            "contents": self._format_messages_for_gemini(messages, user_context),
+            "generationConfig": self.config.generation_config()
+        }
+        if cached_content:
+            payload["cachedContent"] = cached_content
+        else:
+            payload["systemInstruction"] = self.system_prompt.instruction
+        return payload
+    
+    def _with_prompt_metrics(self, result: Dict, payload: Dict, user_data: Optional[Dict]) -> Dict:
+        """Record the prompt version and estimated input tokens saved by this request"""
+        if result.get('source') == 'api':
+            result['prompt_version'] = self.system_prompt.version
+            result['prompt_tokens_saved'] = self.system_prompt.tokens_saved(
+                self._build_context(user_data),
+                cached='cachedContent' in payload
+            )
+            logger.debug(f"Prompt {result['prompt_version']}: ~{result['prompt_tokens_saved']} input tokens saved")
+        return result
+    
+    def _fallback(self, messages: List[Dict[str, str]], error: str) -> Dict:
+        """Canned response used whenever the API can't answer"""
+        user_message = messages[-1]['content'] if messages else ""
+        fallback = self._create_fallback_response(user_message)
+        
+        return {
+            'success': True,
+            'message': fallback,
+            'source': 'fallback',
+            'error': error
+        }
+    
+    def _cached_response(self, messages: List[Dict[str, str]], user_data: Optional[Dict]) -> Optional[Dict]:
+        """Serve a repeated opening question from the response cache"""
+        if not self.cache.is_cacheable(messages):
+            return None
+        hit = self.cache.get(messages[-1]['content'], user_data)
+        if hit is None:
+            return None
+        logger.info("Serving AI response from cache")
+        return {'success': True, 'source': 'cached', **hit}
+    
+    def _routed_response(self, messages: List[Dict[str, str]]) -> Optional[Dict]:
+        """Answer an FAQ-class opening question straight from the intent table"""
+        if not self.faq_router or not self.cache.is_cacheable(messages):
+            return None
+        match = self.intents.route(messages[-1]['content'])
+        if match is None:
+            return None
+        logger.info(f"Routed AI question to FAQ intent '{match.name}'")
+        return {'success': True, 'message': match.response, 'source': 'faq', 'intent': match.name}
+    
+    def _remember(self, messages: List[Dict[str, str]], user_data: Optional[Dict], result: Dict) -> Dict:
+        if self.cache.is_cacheable(messages):
+            self.cache.set(messages[-1]['content'], user_data, result)
+        return result
+    
+    def _handle_response(self, response: httpx.Response, messages: List[Dict[str, str]]) -> Dict:
+        """Turn a generateContent response into the assistant result dict"""
+        logger.info(f"API response status: {response.status_code}")
+        
+        if response.status_code == 200:
+            data = response.json()
+            
+            # Extract response from Gemini format
+            if 'candidates' in data and len(data['candidates']) > 0:
+                assistant_message = data['candidates'][0]['content']['parts'][0]['text']
+                logger.info("Successfully received API response from Gemini")
+                
+                return {
+                    'success': True,
+                    'message': assistant_message,
+                    'source': 'api',
+                    'model': self.model_name,
+                    **token_usage(data.get('usageMetadata'))
+                }
+            else:
+                # No valid response - use fallback
+                logger.warning("No candidates in API response, using fallback")
+                return self._fallback(messages, 'No candidates in response')
+        else:
+            # API error - use fallback
+            logger.error(f"API error: {response.status_code} - {response.text[:200]}")
+            return self._fallback(messages, f"API returned {response.status_code}: {response.text}")
+    
     def get_response(
         self,
         messages: List[Dict[str, str]],
@@ -180,106 +252,267 @@ What specific question can I help you with?"""
         if user_data:
             logger.debug(f"User data provided: {list(user_data.keys())}")
         
+        cached = self._routed_response(messages) or self._cached_response(messages, user_data)
+        if cached:
+            return cached
+        
+        result, shared = self.inflight.do(
+            self._flight_key(messages, user_data),
+            lambda: self._fetch_response(messages, user_data)
+        )
+        return self._shared_result(result, shared)
+    
+    def _flight_key(self, messages: List[Dict[str, str]], user_data: Optional[Dict]) -> str:
+        """Identity of a request for coalescing: normalized messages plus user context"""
+        identity = json.dumps({
+            'prompt': self.system_prompt.version,
+            'context': self._build_context(user_data),
+            'messages': [(msg['role'], normalize_prompt(msg['content'])) for msg in messages],
+        })
+        return hashlib.sha256(identity.encode()).hexdigest()
+    
+    def _shared_result(self, result: Dict, shared: bool) -> Dict:
+        """Give each waiter its own copy of a coalesced result"""
+        result = dict(result)
+        if shared:
+            logger.info("Reused in-flight AI response for identical prompt")
+            result['coalesced'] = True
+            # Only the leader's request was billed
+            result.update(token_usage(None))
+        return result
+    
+    def _circuit_open(self, messages: List[Dict[str, str]]) -> Optional[Dict]:
+        """The fallback result if the breaker is refusing upstream calls, else None"""
+        if self.breaker.allow():
+            return None
+        logger.warning("Gemini circuit is open, serving fallback response")
+        return self._fallback(messages, 'Circuit breaker open')
+    
+    @staticmethod
+    def _upstream_ok(response: Optional[httpx.Response]) -> bool:
+        return response is not None and response.status_code not in LLMClient.RETRY_STATUSES
+    
+    def _record_call(self, response: Optional[httpx.Response], started: float) -> None:
+        """Feed an upstream call's outcome to the breaker and the latency tracker"""
+        elapsed = time.monotonic() - started
+        ok = self._upstream_ok(response)
+        self.breaker.record(ok, elapsed)
+        if ok:
+            self.latency.add(elapsed)
+    
+    def _hedge_sender(self, url: str, payload: Dict):
+        timeout = self.timeout
+        return lambda sent: self.client.apost(
+            url, json=payload, headers={"Content-Type": "application/json"}, timeout=timeout, on_send=sent
+        )
+    
+    def _post(self, url: str, payload: Dict):
+        """``(response, losing hedge attempts)`` for a generateContent call"""
+        # Hedging drives both attempts from an event loop on this thread
+        if not self.hedging or _in_event_loop():
+            response = self.client.post(url, json=payload, headers={"Content-Type": "application/json"}, timeout=self.timeout)
+            return response, []
+        return hedged_call(self._hedge_sender(url, payload), self.latency.hedge_delay(), accept=self._upstream_ok)
+    
+    async def _apost(self, url: str, payload: Dict):
+        send = self._hedge_sender(url, payload)
+        if not self.hedging:
+            return await send(None), []
+        return await ahedged_call(send, self.latency.hedge_delay(), accept=self._upstream_ok)
+    
+    def _charge_hedges(self, result: Dict, losers: List[Optional[httpx.Response]]) -> Dict:
+        """Add the tokens spent by hedge attempts that lost the race to the turn's usage"""
+        for loser in losers:
+            if loser is None:
+                # Cancelled after sending: Gemini has read the prompt either way
+                spent = {'prompt_tokens': result.get('prompt_tokens', 0), 'tokens_used': result.get('prompt_tokens', 0)}
+            elif loser.status_code == 200:
+                spent = token_usage(loser.json().get('usageMetadata'))
+            else:
+                continue
+            for name, tokens in spent.items():
+                result[name] = result.get(name, 0) + tokens
+        return result
+    
+    def _fetch_response(self, messages: List[Dict[str, str]], user_data: Optional[Dict]) -> Dict:
+        """Call Gemini, falling back to the canned response on any failure"""
+        rejected = self._circuit_open(messages)
+        if rejected:
+            return rejected
+        
+        started = time.monotonic()
+        response = None
         try:
-            # Build system context with user data
-            system_context = self._build_context(user_data)
-            
-            # Format messages for Gemini
-            gemini_messages = self._format_messages_for_gemini(messages, system_context)
-            
             # Prepare API request
             url = f"{self.api_url}?key={self.api_key}"
+            cached_content = self.context_cache.handle(self.model_name) if self.context_cache else None
+            payload = self._build_payload(messages, user_data, cached_content)
             
-            payload = {
-                "contents": gemini_messages,
-                "generationConfig": {
-                    "temperature": 0.7,
-                    "topK": 40,
-                    "topP": 0.95,
-                    "maxOutputTokens": 1024,
-                }
-            }
-            
-            # Make API call
-            logger.debug(f"Making API request to Gemini: {self.model}")
-            response = requests.post(
-                url,
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=30
-            )
-            
-            logger.info(f"API response status: {response.status_code}")
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Extract response from Gemini format
-                if 'candidates' in data and len(data['candidates']) > 0:
-                    assistant_message = data['candidates'][0]['content']['parts'][0]['text']
-                    logger.info("Successfully received API response from Gemini")
-                    
-                    return {
-                        'success': True,
-                        'message': assistant_message,
-                        'source': 'api',
-                        'model': 'gemini-2.0-flash-exp'
-                    }
-                else:
-                    # No valid response - use fallback
-                    logger.warning("No candidates in API response, using fallback")
-                    user_message = messages[-1]['content'] if messages else ""
-                    fallback = self._create_fallback_response(user_message)
-                    
-                    return {
-                        'success': True,
-                        'message': fallback,
-                        'source': 'fallback',
-                        'error': 'No candidates in response'
-                    }
-            else:
-                # API error - use fallback
-                logger.error(f"API error: {response.status_code} - {response.text[:200]}")
-                user_message = messages[-1]['content'] if messages else ""
-                fallback = self._create_fallback_response(user_message)
-                
-                return {
-                    'success': True,
-                    'message': fallback,
-                    'source': 'fallback',
-                    'error': f"API returned {response.status_code}: {response.text}"
-                }
+            # Make API call over the shared connection pool
+            logger.debug(f"Making API request to Gemini: {self.model_name}")
+            response, losers = self._post(url, payload)
+            result = self._charge_hedges(self._handle_response(response, messages), losers)
+            result = self._with_prompt_metrics(result, payload, user_data)
+            return self._remember(messages, user_data, result)
                 
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             logger.error("API request timeout")
-            user_message = messages[-1]['content'] if messages else ""
-            fallback = self._create_fallback_response(user_message)
-            return {
-                'success': True,
-                'message': fallback,
-                'source': 'fallback',
-                'error': 'Request timeout'
-            }
+            return self._fallback(messages, 'Request timeout')
         except Exception as e:
             # Any error - use fallback
             logger.exception(f"Unexpected error in get_response: {str(e)}")
-            user_message = messages[-1]['content'] if messages else ""
-            fallback = self._create_fallback_response(user_message)
-            
-            return {
-                'success': True,
-                'message': fallback,
-                'source': 'fallback',
-                'error': str(e)
+            return self._fallback(messages, str(e))
+        finally:
+            self._record_call(response, started)
+    
+    async def aget_response(
+        self,
+        messages: List[Dict[str, str]],
+        user_data: Optional[Dict] = None
+    ) -> Dict:
+        """Async variant of get_response for ASGI views and batch jobs"""
+        logger.info(f"Getting AI response for {len(messages)} messages")
+        cached = self._routed_response(messages) or self._cached_response(messages, user_data)
+        if cached:
+            return cached
+        
+        result, shared = await self.inflight.ado(
+            self._flight_key(messages, user_data),
+            lambda: self._afetch_response(messages, user_data)
+        )
+        return self._shared_result(result, shared)
+    
+    async def _afetch_response(self, messages: List[Dict[str, str]], user_data: Optional[Dict]) -> Dict:
+        # Refresh the config off the event loop before the properties read it
+        await aget_ai_config()
+        rejected = self._circuit_open(messages)
+        if rejected:
+            return rejected
+        
+        started = time.monotonic()
+        response = None
+        try:
+            cached_content = await self.context_cache.ahandle(self.model_name) if self.context_cache else None
+            payload = self._build_payload(messages, user_data, cached_content)
+            response, losers = await self._apost(f"{self.api_url}?key={self.api_key}", payload)
+            result = self._charge_hedges(self._handle_response(response, messages), losers)
+            result = self._with_prompt_metrics(result, payload, user_data)
+            return self._remember(messages, user_data, result)
+        except httpx.TimeoutException:
+            logger.error("API request timeout")
+            return self._fallback(messages, 'Request timeout')
+        except Exception as e:
+            logger.exception(f"Unexpected error in aget_response: {str(e)}")
+            return self._fallback(messages, str(e))
+        finally:
+            self._record_call(response, started)
+    
+    async def stream_response(
+        self,
+        messages: List[Dict[str, str]],
+        user_data: Optional[Dict] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Stream an AI response using Gemini's streamGenerateContent SSE output.
+        
+        Yields ``{'type': 'delta', 'text': ...}`` for each chunk as it arrives,
+        then a single ``{'type': 'done', 'message', 'source', 'error'}`` with the
+        full text. Falls back to the canned response if nothing was streamed.
+        """
+        logger.info(f"Streaming AI response for {len(messages)} messages")
+        cached = self._routed_response(messages) or self._cached_response(messages, user_data)
+        if cached:
+            yield {'type': 'delta', 'text': cached['message']}
+            yield {'type': 'done', 'message': cached['message'], 'source': cached['source'], 'error': None}
+            return
+        
+        # Refresh the config off the event loop before the properties read it
+        await aget_ai_config()
+        rejected = self._circuit_open(messages)
+        if rejected:
+            yield {'type': 'delta', 'text': rejected['message']}
+            yield {'type': 'done', 'message': rejected['message'], 'source': 'fallback', 'error': rejected['error']}
+            return
+        
+        parts = []
+        error = None
+        payload = {}
+        usage = {}
+        started = time.monotonic()
+        recorded = False
+        
+        try:
+            cached_content = await self.context_cache.ahandle(self.model_name) if self.context_cache else None
+            payload = self._build_payload(messages, user_data, cached_content)
+            async with self.client.astream(
+                f"{self.stream_url}?alt=sse&key={self.api_key}",
+                json=payload,
+                headers={"Content-Type": "application/json"},
+                timeout=self.timeout,
+            ) as response:
+                # Time to first byte is what the breaker judges a stream by
+                self._record_call(response, started)
+                recorded = True
+                if response.status_code != 200:
+                    body = (await response.aread()).decode(errors='replace')
+                    raise RuntimeError(f"API returned {response.status_code}: {body[:200]}")
+                
+                async for line in response.aiter_lines():
+                    if not line.startswith('data:'):
+                        continue
+                    chunk = json.loads(line[len('data:'):])
+                    # Gemini sends cumulative usage; the last chunk carries the totals
+                    usage = chunk.get('usageMetadata', usage)
+                    for candidate in chunk.get('candidates', [])[:1]:
+                        for part in candidate.get('content', {}).get('parts', []):
+                            if part.get('text'):
+                                parts.append(part['text'])
+                                yield {'type': 'delta', 'text': part['text']}
+        except httpx.TimeoutException:
+            logger.error("API stream timeout")
+            error = 'Request timeout'
+        except Exception as e:
+            logger.exception(f"Unexpected error in stream_response: {str(e)}")
+            error = str(e)
+        finally:
+            # Also on cancellation, or a half-open trial would stay in flight forever
+            if not recorded:
+                self._record_call(None, started)
+        
+        if parts:
+            result = {
+                'message': ''.join(parts),
+                'source': 'api',
+                'model': self.model_name,
+                **token_usage(usage)
             }
+            self._with_prompt_metrics(result, payload, user_data)
+            if error is None:
+                self._remember(messages, user_data, result)
+            yield {'type': 'done', 'error': error, **result}
+            return
+        
+        user_message = messages[-1]['content'] if messages else ""
+        fallback = self._create_fallback_response(user_message)
+        yield {'type': 'delta', 'text': fallback}
+        yield {
+            'type': 'done',
+            'message': fallback,
+            'source': 'fallback',
+            'error': error or 'No candidates in response'
+        }
     
     def explain_term(self, term: str) -> str:
         """Explain a DeFi term"""
-        term_lower = term.lower()
-        
-        for key, definition in DEFI_GLOSSARY.items():
-            if key.lower() == term_lower:
-                return f"**{key}**: {definition}"
+        index = get_glossary_index()
+        entry = index.lookup(term)
+        if entry is None:
+            # Close misspellings ("stablecion") still get an answer
+            results = index.search(term, limit=1)
+            entry = results[0] if results and results[0]['score'] >= GLOSSARY_MATCH_SCORE else None
+        if entry:
+            self.popularity.record(entry)
+            return f"**{entry['term']}**: {entry['short_definition']}"
         
         return f"I don't have a specific definition for '{term}', but I can help explain it in context. What would you like to know about it?"
     
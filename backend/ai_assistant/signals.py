@@ -0,0 +1,50 @@
+"""
+Model signal receivers, connected when the app is ready.
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from attestify.models import SavingsGoal, UserProfile
+from attestify.signals import profile_stats_changed
+
+from .config import invalidate_ai_config
+from .glossary import invalidate_glossary_index
+from .models import AIConfiguration, DeFiTerm
+from .user_context import invalidate_user_context
+
+
+@receiver(post_save, sender=DeFiTerm)
+@receiver(post_delete, sender=DeFiTerm)
+def glossary_changed(sender, **kwargs):
+    invalidate_glossary_index()
+
+
+@receiver(m2m_changed, sender=DeFiTerm.related_terms.through)
+def glossary_relations_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate_glossary_index()
+
+
+@receiver(post_save, sender=AIConfiguration)
+@receiver(post_delete, sender=AIConfiguration)
+def ai_configuration_changed(sender, **kwargs):
+    invalidate_ai_config()
+
+
+@receiver(post_save, sender=SavingsGoal)
+@receiver(post_delete, sender=SavingsGoal)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def user_finances_changed(sender, instance, **kwargs):
+    invalidate_user_context(user_id=instance.user_id, wallet_address=instance.wallet_address)
+
+
+@receiver(profile_stats_changed)
+def user_stats_changed(sender, user_ids, **kwargs):
+    # Context is also cached under every wallet the user's profile or goals use
+    wallets = set(UserProfile.objects.filter(user_id__in=user_ids).values_list('wallet_address', flat=True))
+    wallets.update(SavingsGoal.objects.filter(user_id__in=user_ids).values_list('wallet_address', flat=True))
+    for user_id in user_ids:
+        invalidate_user_context(user_id=user_id)
+    for wallet_address in wallets:
+        invalidate_user_context(wallet_address=wallet_address)
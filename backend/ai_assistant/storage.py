@@ -0,0 +1,190 @@
+"""
+Conversation storage upkeep.
+
+Every chat turn writes two ``Conversation`` rows, so this module keeps them
+small and keeps the table from growing forever:
+
+* ``compact_metadata`` trims per-message metadata before it is written: empty
+  values and the wallet address (already stored on the session) are dropped,
+  and long strings such as upstream error bodies are truncated.
+* ``ConversationArchiver`` moves sessions that have been idle longer than the
+  retention period out of the hot tables. Each chunk of sessions is written
+  to a gzip-compressed JSONL file (one line per session, with its messages
+  and feedback) and then deleted in one transaction. Run it from the
+  ``prune_conversations`` management command.
+"""
+import gzip
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+METADATA_MAX_CHARS = getattr(settings, 'AI_METADATA_MAX_CHARS', 300)
+# Stored on ConversationSession.user_context; repeating it per message is waste
+REDUNDANT_METADATA_KEYS = frozenset({'wallet_address'})
+
+
+def _truncate(value, limit):
+    if isinstance(value, str) and len(value) > limit:
+        return value[:limit - 1] + '…'
+    return value
+
+
+def compact_metadata(metadata, max_chars=METADATA_MAX_CHARS):
+    """Copy of a message's metadata without empty or redundant values and with long strings cut"""
+    return {
+        key: _truncate(value, max_chars)
+        for key, value in (metadata or {}).items()
+        if key not in REDUNDANT_METADATA_KEYS and value not in (None, '', [], {})
+    }
+
+
+def compact_stored_metadata(batch_size=500, dry_run=False):
+    """Rewrite existing message metadata in compact form; returns the number of rows changed"""
+    from .models import Conversation
+
+    changed = []
+    total = 0
+    rows = Conversation.objects.exclude(metadata={}).only('id', 'metadata').order_by('id')
+    for row in rows.iterator(chunk_size=batch_size):
+        compacted = compact_metadata(row.metadata)
+        if compacted == row.metadata:
+            continue
+        total += 1
+        if dry_run:
+            continue
+        row.metadata = compacted
+        changed.append(row)
+        if len(changed) >= batch_size:
+            Conversation.objects.bulk_update(changed, ['metadata'])
+            changed = []
+    if changed:
+        Conversation.objects.bulk_update(changed, ['metadata'])
+    return total
+
+
+class ConversationArchiver:
+    """Archives sessions idle past the retention period to JSONL.gz and deletes them"""
+
+    RETENTION_DAYS = getattr(settings, 'AI_CONVERSATION_RETENTION_DAYS', 90)
+    ARCHIVE_DIR = getattr(
+        settings, 'AI_CONVERSATION_ARCHIVE_DIR',
+        os.path.join(settings.BASE_DIR, 'archive', 'conversations')
+    )
+    BATCH_SIZE = 200
+
+    def __init__(self, retention_days=None, archive_dir=None, batch_size=None, archive=True):
+        self.retention_days = self.RETENTION_DAYS if retention_days is None else retention_days
+        self.archive_dir = archive_dir or self.ARCHIVE_DIR
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.archive = archive
+        self.cutoff = timezone.now() - timedelta(days=self.retention_days)
+        self.stamp = timezone.now().strftime('%Y%m%dT%H%M%S')
+
+    def stale_sessions(self):
+        from .models import ConversationSession
+
+        return ConversationSession.objects.filter(updated_at__lt=self.cutoff)
+
+    def preview(self):
+        """``(sessions, messages)`` that a run would remove"""
+        from .models import Conversation
+
+        sessions = self.stale_sessions()
+        messages = Conversation.objects.filter(session_id__in=sessions.values('session_id'))
+        return sessions.count(), messages.count()
+
+    def run(self):
+        """Process stale sessions chunk by chunk; returns ``(sessions, messages, files)``"""
+        sessions_done = messages_done = 0
+        files = []
+        last_id = 0
+        chunk = 0
+        while True:
+            ids = list(
+                self.stale_sessions().filter(id__gt=last_id).order_by('id')
+                .values_list('id', flat=True)[:self.batch_size]
+            )
+            if not ids:
+                break
+            last_id = ids[-1]
+            chunk += 1
+            sessions, messages, path = self._process_chunk(ids, chunk)
+            sessions_done += sessions
+            messages_done += messages
+            if path:
+                files.append(path)
+        return sessions_done, messages_done, files
+
+    def _process_chunk(self, ids, chunk):
+        from .models import Conversation
+
+        with transaction.atomic():
+            # Re-check staleness so a session resumed since the scan is kept
+            stale = self.stale_sessions().filter(id__in=ids)
+            sessions = list(stale.select_for_update().order_by('id'))
+            if not sessions:
+                return 0, 0, None
+            messages = Conversation.objects.filter(session_id__in=[session.session_id for session in sessions])
+
+            path = self._write(sessions, messages, chunk) if self.archive else None
+            # Feedback rows cascade with their message or session
+            message_count = messages.count()
+            messages.delete()
+            stale.delete()
+        logger.info(f"Pruned {len(sessions)} idle conversation session(s) with {message_count} message(s)")
+        return len(sessions), message_count, path
+
+    def _records(self, sessions, messages):
+        from .models import AIFeedback
+
+        by_session = defaultdict(list)
+        message_fields = ('id', 'session_id', 'user_id', 'role', 'message', 'metadata',
+                          'model_used', 'response_source', 'tokens_used', 'created_at')
+        for row in messages.order_by('session_id', 'created_at', 'id').values(*message_fields):
+            by_session[row.pop('session_id')].append(row)
+
+        feedback = defaultdict(list)
+        feedback_rows = AIFeedback.objects.filter(
+            Q(session__in=sessions) | Q(conversation__session_id__in=list(by_session))
+        ).values('session_id', 'conversation_id', 'rating', 'feedback_text', 'response_helpful',
+                 'suggested_improvement', 'created_at')
+        message_sessions = {row['id']: key for key, rows in by_session.items() for row in rows}
+        session_keys = {session.id: session.session_id for session in sessions}
+        for row in feedback_rows:
+            key = session_keys.get(row['session_id']) or message_sessions.get(row['conversation_id'])
+            feedback[key].append(row)
+
+        for session in sessions:
+            yield {
+                'session_id': session.session_id,
+                'user_id': session.user_id,
+                'title': session.title,
+                'user_context': session.user_context,
+                'summary': session.summary,
+                'total_tokens': session.total_tokens,
+                'created_at': session.created_at,
+                'updated_at': session.updated_at,
+                'messages': by_session.get(session.session_id, []),
+                'feedback': feedback.get(session.session_id, []),
+            }
+
+    def _write(self, sessions, messages, chunk):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(self.archive_dir, f"conversations-{self.stamp}-{chunk:04d}.jsonl.gz")
+        partial = path + '.partial'
+        with gzip.open(partial, 'wt', encoding='utf-8') as archive:
+            for record in self._records(sessions, messages):
+                archive.write(json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False))
+                archive.write('\n')
+        os.replace(partial, path)
+        return path
@@ -0,0 +1,170 @@
+"""
+A local stand-in for the Gemini REST API, for tests and offline runs.
+
+``MockGeminiServer`` listens on 127.0.0.1 in a background thread and answers
+``:generateContent`` with a single JSON body and ``:streamGenerateContent``
+with server-sent events, one chunk per entry in ``chunks``. Point the
+assistant at it with ``GEMINI_API_BASE=server.base_url``.
+
+``fail_with`` queues error statuses to return before answering normally and
+``delay`` holds every response, for exercising retries and concurrency limits.
+For benchmarks, ``jitter`` adds a random extra delay of up to that many
+seconds and ``failure_rate`` fails that share of requests with
+``failure_status``; pass ``seed`` to make both repeatable.
+Connections are HTTP/1.1 keep-alive, and each request records the client port
+so tests can tell whether connections were reused. ``POST /cachedContents``
+creates context cache handles that later requests can reference; usage
+metadata then reports the cached tokens separately.
+"""
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # A client dropping an idle keep-alive connection isn't worth a traceback
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class MockGeminiServer:
+    """Serves canned Gemini responses and records the payloads it receives"""
+
+    def __init__(self, chunks=('Hello', ' from', ' Gemini'), status=200, fail_with=(), delay=0,
+                 jitter=0, failure_rate=0, failure_status=503, seed=None):
+        self.chunks = list(chunks)
+        self.status = status
+        self.fail_with = list(fail_with)
+        self.delay = delay
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self._random = random.Random(seed)
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.cached_contents = {}
+        self._counter_lock = threading.Lock()
+        self._server = _Server(('127.0.0.1', 0), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1beta"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @staticmethod
+    def _count_tokens(contents):
+        return sum(len(part.get('text', '').split()) for content in contents for part in content.get('parts', []))
+
+    def usage(self, payload):
+        prompt_tokens = self._count_tokens(payload.get('contents', []))
+        prompt_tokens += self._count_tokens([payload.get('systemInstruction', {})])
+        cached_tokens = 0
+        if payload.get('cachedContent') in self.cached_contents:
+            cached_tokens = self._count_tokens([self.cached_contents[payload['cachedContent']]['systemInstruction']])
+            prompt_tokens += cached_tokens
+        output_tokens = len(''.join(self.chunks).split())
+        usage = {
+            'promptTokenCount': prompt_tokens,
+            'candidatesTokenCount': output_tokens,
+            'totalTokenCount': prompt_tokens + output_tokens,
+        }
+        if cached_tokens:
+            usage['cachedContentTokenCount'] = cached_tokens
+        return usage
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                with server._counter_lock:
+                    server.requests.append({'path': self.path, 'payload': payload, 'port': self.client_address[1]})
+                    status = server.fail_with.pop(0) if server.fail_with else server.status
+                    if status == 200 and server.failure_rate and server._random.random() < server.failure_rate:
+                        status = server.failure_status
+                    delay = server.delay + (server._random.uniform(0, server.jitter) if server.jitter else 0)
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    if delay:
+                        time.sleep(delay)
+                    self._respond(status, payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up, e.g. a cancelled hedge or stream
+                    self.close_connection = True
+                finally:
+                    with server._counter_lock:
+                        server.in_flight -= 1
+
+            def _respond(self, status, payload):
+                if status != 200:
+                    self._send_json(status, {'error': {'code': status, 'message': 'mock error'}}, {'Retry-After': '0'})
+                elif self.path.split('?')[0].endswith('/cachedContents'):
+                    name = f"cachedContents/mock-{len(server.cached_contents) + 1}"
+                    server.cached_contents[name] = payload
+                    self._send_json(200, {'name': name, 'model': payload.get('model'), 'ttl': payload.get('ttl')})
+                elif ':streamGenerateContent' in self.path:
+                    self._stream(payload)
+                else:
+                    self._send_json(200, {
+                        'candidates': [{
+                            'content': {'role': 'model', 'parts': [{'text': ''.join(server.chunks)}]},
+                            'finishReason': 'STOP',
+                        }],
+                        'usageMetadata': server.usage(payload),
+                    })
+
+            def _send_json(self, status, body, headers=None):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, payload):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                for index, text in enumerate(server.chunks):
+                    chunk = {'candidates': [{'content': {'role': 'model', 'parts': [{'text': text}]}}]}
+                    if index == len(server.chunks) - 1:
+                        chunk['candidates'][0]['finishReason'] = 'STOP'
+                        chunk['usageMetadata'] = server.usage(payload)
+                    self.wfile.write(f"data: {json.dumps(chunk)}\r\n\r\n".encode())
+                    self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
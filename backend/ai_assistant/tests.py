@@ -1,3 +1,1420 @@
-from django.test import TestCase
+import asyncio
+import base64
+import gzip
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from attestify.models import SavingsGoal, UserProfile
+from attestify.services import ProfileStatsMaterializer
+
+from . import views
+from .benchmark import ChatBenchmark, percentile
+from .cache import ResponseCache, context_bucket, normalize_prompt
+from .checks import check_shared_cache
+from .client import LLMClient
+from .coalesce import SingleFlight
+from .config import get_ai_config, invalidate_ai_config
+from .glossary import edit_distance, get_glossary_index
+from .history import HistoryManager
+from .intents import IntentClassifier, KeywordAutomaton
+from .popularity import PopularityBuffer
+from .prompts import SystemPrompt, estimate_tokens, get_system_prompt
+from .quotas import CacheRateLimiter, MemoryRateLimiter, UsageTracker, client_ip
+from .resilience import CircuitBreaker, HedgeBudget, LatencyTracker, hedged_call
+from .models import AIConfiguration, AIFeedback, Conversation, ConversationSession, DeFiTerm, TokenUsage
+from .services import AIAssistantService
+from .storage import ConversationArchiver, compact_metadata
+from .user_context import UserContextProvider
+from .testing import MockGeminiServer
+
+
+class MockGeminiTestCase(TestCase):
+    """Points the assistant at a local mock Gemini server for each test"""
+
+    chunks = ('Hello', ' from', ' Gemini')
+
+    def setUp(self):
+        self.server = MockGeminiServer(chunks=self.chunks).start()
+        self.addCleanup(self.server.stop)
+        env = mock.patch.dict(os.environ, {
+            'GOOGLE_API_KEY': 'test-key',
+            'GEMINI_API_BASE': self.server.base_url,
+        })
+        env.start()
+        self.addCleanup(env.stop)
+        self.client_pool = LLMClient(backoff_base=0)
+        self.addCleanup(self.client_pool.close)
+        self.response_cache = ResponseCache()
+        self.service = AIAssistantService(client=self.client_pool, cache=self.response_cache)
+        patcher = mock.patch.object(views, 'ai_service', self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.rate_limiter = MemoryRateLimiter(per_minute=60, burst=20)
+        patcher = mock.patch.object(views, 'get_rate_limiter', return_value=self.rate_limiter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+def parse_sse(body):
+    events = []
+    for block in body.strip().split('\n\n'):
+        event = {'event': 'message'}
+        for line in block.splitlines():
+            field, _, value = line.partition(': ')
+            event[field] = json.loads(value) if field == 'data' else value
+        events.append(event)
+    return events
+
+
+class ChatStreamTests(MockGeminiTestCase):
+
+    async def stream(self, body, **headers):
+        response = await self.async_client.post(
+            '/api/ai_assistant/chat/stream/',
+            data=json.dumps(body),
+            content_type='application/json',
+            headers=headers,
+        )
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        return response, parse_sse(content.decode())
+
+    async def test_streams_deltas_and_persists_reply(self):
+        response, events = await self.stream(
+            {'message': 'What is APY?'},
+            x_wallet_address='0xabc',
+        )
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(events[0]['event'], 'session')
+        self.assertEqual([e['data']['delta'] for e in events[1:-1]], ['Hello', ' from', ' Gemini'])
+        self.assertEqual(events[-1]['event'], 'done')
+        self.assertEqual(events[-1]['data']['source'], 'api')
+
+        session_id = events[0]['data']['session_id']
+        reply = await Conversation.objects.aget(session_id=session_id, role='assistant')
+        self.assertEqual(reply.message, 'Hello from Gemini')
+        self.assertEqual(reply.response_source, 'api')
+        session = await ConversationSession.objects.aget(session_id=session_id)
+        self.assertEqual(session.message_count, 2)
+        self.assertGreater(reply.tokens_used, 0)
+        self.assertEqual(session.total_tokens, reply.tokens_used)
+        self.assertIn(':streamGenerateContent?alt=sse', self.server.requests[0]['path'])
+
+    async def test_upstream_error_streams_fallback(self):
+        self.server.status = 503
+        with self.assertLogs('ai_assistant', level='WARNING'):
+            _, events = await self.stream({'message': 'hello'}, x_wallet_address='0xabc')
+
+        self.assertEqual(events[-1]['data']['source'], 'fallback')
+        reply = await Conversation.objects.aget(role='assistant')
+        self.assertEqual(reply.response_source, 'fallback')
+        self.assertIn('503', reply.metadata['error'])
+
+    async def test_signed_in_callers_need_the_csrf_token(self):
+        client = AsyncClient(enforce_csrf_checks=True)
+        await client.aforce_login(await sync_to_async(User.objects.create_user)('saver'))
+        body = json.dumps({'message': 'What is APY?'})
+
+        with self.assertLogs('ai_assistant.views', level='WARNING'):
+            forged = await client.post('/api/ai_assistant/chat/stream/', data=body, content_type='application/json')
+        self.assertEqual(forged.status_code, 403)
+        self.assertEqual(self.server.requests, [])
+
+        token = 'a' * 32
+        client.cookies['csrftoken'] = token
+        response = await client.post('/api/ai_assistant/chat/stream/', data=body, content_type='application/json',
+                                     headers={'x-csrftoken': token})
+        self.assertEqual(response.status_code, 200)
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(parse_sse(content.decode())[-1]['data']['source'], 'api')
+
+    async def test_basic_auth_callers_are_signed_in(self):
+        user = await sync_to_async(User.objects.create_user)('saver', password='pass-1234')
+        credentials = base64.b64encode(b'saver:pass-1234').decode()
+
+        _, events = await self.stream({'message': 'What is APY?'}, authorization=f'Basic {credentials}')
+
+        self.assertEqual(events[-1]['event'], 'done')
+        session = await ConversationSession.objects.aget(session_id=events[0]['data']['session_id'])
+        self.assertEqual(session.user_id, user.id)
+        self.assertTrue(await TokenUsage.objects.filter(caller=f'user:{user.id}').aexists())
+
+        wrong = base64.b64encode(b'saver:nope').decode()
+        with self.assertLogs('ai_assistant.views', level='WARNING'):
+            response = await self.async_client.post(
+                '/api/ai_assistant/chat/stream/',
+                data=json.dumps({'message': 'hi'}),
+                content_type='application/json',
+                headers={'authorization': f'Basic {wrong}'},
+            )
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(len(self.server.requests), 1)
+
+    async def test_disconnect_still_saves_and_bills_the_turn(self):
+        self.server.delay = 1
+        response = await self.async_client.post(
+            '/api/ai_assistant/chat/stream/',
+            data=json.dumps({'message': 'What is APY?'}),
+            content_type='application/json',
+            headers={'x-wallet-address': '0xabc'},
+        )
+
+        async def consume():
+            async for _ in response.streaming_content:
+                pass
+
+        task = asyncio.ensure_future(consume())
+        while not self.server.requests:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        reply = await Conversation.objects.aget(role='assistant')
+        self.assertEqual(reply.metadata['error'], 'Client disconnected')
+        session = await ConversationSession.objects.aget(session_id=reply.session_id)
+        self.assertEqual(session.message_count, 2)
+        usage = await TokenUsage.objects.aget(caller='ip:127.0.0.1')
+        self.assertEqual(usage.requests, 1)
+        self.assertGreater(usage.prompt_tokens, 0)
+
+    async def test_unknown_session_is_rejected(self):
+        with self.assertLogs('ai_assistant.views', level='WARNING'):
+            response = await self.async_client.post(
+                '/api/ai_assistant/chat/stream/',
+                data=json.dumps({'message': 'hi', 'session_id': 'missing'}),
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 404)
+
+    def test_blocking_chat_uses_generate_content(self):
+        response = self.client.post(
+            '/api/ai_assistant/chat/',
+            data={'message': 'What is APY?'},
+            content_type='application/json',
+            headers={'x-wallet-address': '0xabc'},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['message'], 'Hello from Gemini')
+        self.assertIn(':generateContent?key=test-key', self.server.requests[0]['path'])
+
+
+class LLMClientTests(SimpleTestCase):
+
+    def setUp(self):
+        self.server = MockGeminiServer().start()
+        self.addCleanup(self.server.stop)
+        self.url = f"{self.server.base_url}/models/test:generateContent"
+        self.client = LLMClient(backoff_base=0, max_retries=2)
+        self.addCleanup(self.client.close)
+
+    def test_reuses_pooled_connection(self):
+        self.client.post(self.url, json={})
+        self.client.post(self.url, json={})
+
+        ports = {request['port'] for request in self.server.requests}
+        self.assertEqual(len(ports), 1)
+
+    def test_retries_throttling_and_server_errors(self):
+        self.server.fail_with = [429, 503]
+        with self.assertLogs('ai_assistant.client', level='WARNING'):
+            response = self.client.post(self.url, json={})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_gives_up_after_max_retries(self):
+        self.server.status = 503
+        with self.assertLogs('ai_assistant.client', level='WARNING'):
+            response = self.client.post(self.url, json={})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_client_errors_are_not_retried(self):
+        self.server.status = 400
+        response = self.client.post(self.url, json={})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_bounds_concurrent_requests(self):
+        self.server.delay = 0.1
+        client = LLMClient(max_concurrency=2)
+        self.addCleanup(client.close)
+
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            list(pool.map(lambda _: client.post(self.url, json={}), range(6)))
+
+        self.assertEqual(len(self.server.requests), 6)
+        self.assertEqual(self.server.max_in_flight, 2)
+
+    def test_async_bounds_concurrency_and_retries(self):
+        self.server.delay = 0.1
+        self.server.fail_with = [502]
+        client = LLMClient(max_concurrency=2, backoff_base=0)
+
+        async def burst():
+            return await asyncio.gather(*(client.apost(self.url, json={}) for _ in range(5)))
+
+        with self.assertLogs('ai_assistant.client', level='WARNING'):
+            responses = asyncio.run(burst())
+
+        self.assertEqual([r.status_code for r in responses], [200] * 5)
+        self.assertEqual(len(self.server.requests), 6)
+        self.assertLessEqual(self.server.max_in_flight, 2)
+
+
+class ResponseCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.cache = ResponseCache(ttl=60, max_entries=3)
+        self.answer = {'message': 'Balanced is a good start.', 'source': 'api', 'model': 'test'}
+
+    def test_normalizes_prompts(self):
+        self.assertEqual(normalize_prompt("  Which STRATEGY's best?! "), 'which strategys best')
+
+    def test_exact_hit_after_normalization(self):
+        self.cache.set('Which strategy is best?', {'is_new_user': True}, self.answer)
+
+        hit = self.cache.get('which strategy is BEST', {'is_new_user': True})
+        self.assertEqual(hit['message'], 'Balanced is a good start.')
+        self.assertEqual(self.cache.stats()['exact_hits'], 1)
+
+    def test_context_buckets_are_isolated(self):
+        self.cache.set('Which strategy is best?', {'is_new_user': True}, self.answer)
+
+        self.assertIsNone(self.cache.get('Which strategy is best?', {'current_strategy': 'growth'}))
+        self.assertNotEqual(context_bucket({'is_new_user': True}), context_bucket({'current_strategy': 'growth'}))
+
+    def test_answers_built_from_personal_figures_are_never_shared(self):
+        mine = {'balance': 5000, 'total_deposited': 4800, 'current_strategy': 'balanced'}
+        self.cache.set("What's my balance?", mine, {**self.answer, 'message': 'You have 5000 cUSD.'})
+        self.cache.set('Which strategy is best?', {'current_strategy': 'balanced'}, self.answer)
+
+        self.assertIsNone(self.cache.get("What's my balance?", {'balance': 50, 'current_strategy': 'balanced'}))
+        self.assertIsNone(self.cache.get("What's my balance?", mine))
+        self.assertIsNone(self.cache.get('Which strategy is best?', {'active_goals': {'count': 1}}))
+        self.assertEqual(self.cache.stats()['stores'], 1)
+        self.assertEqual(self.cache.stats()['personal'], 3)
+
+    def test_near_duplicate_question_hits(self):
+        self.cache.set('Is Attestify safe?', None, self.answer)
+        self.cache.set('How do I withdraw my savings?', None, {**self.answer, 'message': 'Withdraw'})
+
+        hit = self.cache.get('is attestify safe to use', None)
+        self.assertEqual(hit['message'], 'Balanced is a good start.')
+        self.assertIsNone(self.cache.get('How much yield will I earn?', None))
+        self.assertEqual(self.cache.stats()['semantic_hits'], 1)
+
+    def test_semantic_matching_can_be_disabled(self):
+        cache = ResponseCache(semantic=False)
+        cache.set('Is Attestify safe?', None, self.answer)
+        self.assertIsNone(cache.get('is attestify safe to use', None))
+
+    def test_only_api_answers_are_stored(self):
+        self.cache.set('hello', None, {'message': 'Hi', 'source': 'fallback'})
+        self.assertIsNone(self.cache.get('hello', None))
+
+    def test_expired_entries_are_dropped(self):
+        self.cache.set('hello', None, self.answer)
+        with mock.patch('ai_assistant.cache.time.monotonic', return_value=10 ** 9):
+            self.assertIsNone(self.cache.get('hello', None))
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_least_recently_used_is_evicted(self):
+        for prompt in ('apy', 'tvl', 'yield'):
+            self.cache.set(prompt, None, self.answer)
+        self.cache.get('apy', None)
+        self.cache.set('gas fees', None, self.answer)
+
+        self.assertIsNone(self.cache.get('tvl', None))
+        self.assertIsNotNone(self.cache.get('apy', None))
+        stats = self.cache.stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['hit_rate'], 0.6667)
+
+
+class CachedChatTests(MockGeminiTestCase):
+
+    def ask(self, message):
+        return self.client.post(
+            '/api/ai_assistant/chat/',
+            data={'message': message},
+            content_type='application/json',
+            headers={'x-wallet-address': '0xabc'},
+        ).json()
+
+    def test_repeated_opening_question_skips_gemini(self):
+        first = self.ask('Which strategy should I choose?')
+        second = self.ask('which strategy should I choose')
+
+        self.assertEqual(first['source'], 'api')
+        self.assertEqual(second['source'], 'cached')
+        self.assertEqual(second['message'], 'Hello from Gemini')
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertTrue(Conversation.objects.filter(
+            session_id=second['session_id'], response_source='cached'
+        ).exists())
+
+    def test_follow_up_turns_are_not_cached(self):
+        session_id = self.ask('Which strategy should I choose?')['session_id']
+        self.client.post(
+            '/api/ai_assistant/chat/',
+            data={'message': 'Which strategy should I choose?', 'session_id': session_id},
+            content_type='application/json',
+            headers={'x-wallet-address': '0xabc'},
+        )
+
+        self.assertEqual(len(self.server.requests), 2)
+
+
+class PromptTests(MockGeminiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.messages = [
+            {'role': 'user', 'content': 'Hi'},
+            {'role': 'assistant', 'content': 'Hello!'},
+            {'role': 'user', 'content': 'Which strategy suits me?'},
+        ]
+        self.user_data = {'balance': 250.0, 'current_strategy': 'balanced'}
+
+    def enable_context_cache(self):
+        with mock.patch.dict(os.environ, {'GEMINI_CONTEXT_CACHE': '1'}):
+            return AIAssistantService(client=self.client_pool, cache=ResponseCache())
+
+    def test_system_prompt_is_compacted_and_versioned(self):
+        prompt = SystemPrompt("Be helpful.   \n\n\n\nBe honest.\n")
+
+        self.assertEqual(prompt.text, "Be helpful.\n\nBe honest.")
+        self.assertEqual(prompt.version, SystemPrompt("Be helpful.\n\nBe honest.").version)
+        self.assertNotEqual(prompt.version, SystemPrompt("Be brief.").version)
+        self.assertIs(get_system_prompt(), get_system_prompt())
+
+    def test_payload_uses_system_instruction(self):
+        payload = self.service._build_payload(self.messages, self.user_data)
+
+        self.assertEqual(payload['systemInstruction'], get_system_prompt().instruction)
+        self.assertEqual([c['role'] for c in payload['contents']], ['user', 'model', 'user'])
+        self.assertEqual(payload['contents'][0]['parts'], [{'text': 'Hi'}])
+        context, question = payload['contents'][-1]['parts']
+        self.assertIn('Current Strategy: Balanced', context['text'])
+        self.assertEqual(question['text'], 'Which strategy suits me?')
+
+    def test_reports_token_savings(self):
+        result = self.service.get_response(self.messages, self.user_data)
+
+        self.assertEqual(result['prompt_version'], get_system_prompt().version)
+        self.assertGreater(result['prompt_tokens_saved'], estimate_tokens('I understand.'))
+        prompt = get_system_prompt()
+        self.assertEqual(prompt.tokens_saved(cached=True) - prompt.tokens_saved(), prompt.tokens)
+
+    def test_context_cache_handle_replaces_inline_prompt(self):
+        service = self.enable_context_cache()
+        service.get_response(self.messages, self.user_data)
+        result = service.get_response(self.messages[:1], None)
+
+        self.assertEqual(len(self.server.cached_contents), 1)
+        created = next(iter(self.server.cached_contents.values()))
+        self.assertEqual(created['systemInstruction'], get_system_prompt().instruction)
+        calls = [r['payload'] for r in self.server.requests if ':generateContent' in r['path']]
+        self.assertEqual(len(calls), 2)
+        for payload in calls:
+            self.assertEqual(payload['cachedContent'], 'cachedContents/mock-1')
+            self.assertNotIn('systemInstruction', payload)
+        self.assertEqual(result['prompt_tokens_saved'], get_system_prompt().tokens_saved(cached=True))
+
+    def test_context_cache_failure_falls_back_to_inline_prompt(self):
+        self.server.fail_with = [400]
+        service = self.enable_context_cache()
+        with self.assertLogs('ai_assistant.prompts', level='WARNING'):
+            result = service.get_response(self.messages, self.user_data)
+
+        self.assertEqual(result['source'], 'api')
+        payload = self.server.requests[-1]['payload']
+        self.assertIn('systemInstruction', payload)
+        self.assertNotIn('cachedContent', payload)
+
+
+class HistoryManagerTests(TestCase):
+
+    def setUp(self):
+        self.session = ConversationSession.objects.create(session_id='history')
+
+    def add(self, role, message):
+        return Conversation.objects.create(session_id='history', role=role, message=message)
+
+    def test_short_history_fits_entirely(self):
+        self.add('user', 'Hi')
+        self.add('assistant', 'Hello!')
+        self.add('user', 'What is APY?')
+
+        messages, summary = HistoryManager(token_budget=100).window(self.session)
+
+        self.assertEqual([m['content'] for m in messages], ['Hi', 'Hello!', 'What is APY?'])
+        self.assertEqual(summary, '')
+
+    def test_overflow_is_folded_into_summary(self):
+        self.add('user', 'How do I deposit? ' + 'detail ' * 40)
+        self.add('assistant', 'Connect your wallet first. ' + 'words ' * 40)
+        self.add('user', 'And withdraw?')
+        self.add('assistant', 'Use the withdraw tab.')
+        latest = self.add('user', 'Thanks')
+
+        manager = HistoryManager(token_budget=40)
+        messages, summary = manager.window(self.session)
+
+        self.assertEqual(messages[0], {'role': 'user', 'content': 'And withdraw?'})
+        self.assertEqual(messages[-1]['content'], 'Thanks')
+        self.assertIn('- User: How do I deposit?', summary)
+        self.assertIn('- Assistant: Connect your wallet first.', summary)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.summary, summary)
+        self.assertLess(self.session.summary_until_id, latest.id)
+
+        # Folded rows aren't read again on the next turn
+        with self.assertNumQueries(1):
+            manager.window(self.session)
+
+    def test_window_opens_with_a_user_turn(self):
+        self.add('user', 'x ' * 200)
+        self.add('assistant', 'Short answer.')
+        self.add('user', 'Next question')
+
+        messages, summary = HistoryManager(token_budget=40).window(self.session)
+
+        self.assertEqual(messages, [{'role': 'user', 'content': 'Next question'}])
+        self.assertIn('- Assistant: Short answer.', summary)
+
+    def test_oversized_message_is_trimmed(self):
+        self.add('user', 'a' * 1000)
+
+        messages, _ = HistoryManager(token_budget=50).window(self.session)
+
+        self.assertLessEqual(len(messages[0]['content']), 50 * 4)
+
+    def test_summary_stays_within_budget(self):
+        for i in range(30):
+            self.add('user', f"Question number {i} about savings goals and yields?")
+            self.add('assistant', f"Answer number {i} with plenty of explanation.")
+
+        manager = HistoryManager(token_budget=60, summary_token_budget=50)
+        _, summary = manager.window(self.session)
+
+        self.assertLessEqual(len(summary) // 4, 50)
+        self.assertIn('Answer number 28', summary)
+        self.assertNotIn('number 0 ', summary)
+
+
+class ChatHistoryTests(MockGeminiTestCase):
+
+    def test_summary_reaches_the_prompt(self):
+        session = ConversationSession.objects.create(
+            session_id='long',
+            user_context={'wallet_address': '0xabc'},
+            summary='- User: How do I deposit?',
+            summary_until_id=0,
+        )
+        response = self.client.post(
+            '/api/ai_assistant/chat/',
+            data={'message': 'And then?', 'session_id': session.session_id},
+            content_type='application/json',
+            headers={'x-wallet-address': '0xabc'},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        context = self.server.requests[0]['payload']['contents'][-1]['parts'][0]['text']
+        self.assertIn('Earlier In This Conversation', context)
+        self.assertIn('How do I deposit?', context)
+
+    def test_turns_update_session_counters_without_counting(self):
+        def ask(message, session_id=None):
+            return self.client.post(
+                '/api/ai_assistant/chat/',
+                data={'message': message, 'session_id': session_id},
+                content_type='application/json',
+                headers={'x-wallet-address': '0xabc'},
+            ).json()
+
+        session_id = ask('What is APY?')['session_id']
+        with CaptureQueriesContext(connection) as queries:
+            ask('And TVL?', session_id)
+
+        session = ConversationSession.objects.get(session_id=session_id)
+        replies = Conversation.objects.filter(session_id=session_id, role='assistant')
+        self.assertEqual(session.message_count, 4)
+        self.assertEqual(session.total_tokens, sum(reply.tokens_used for reply in replies))
+        self.assertGreater(session.total_tokens, 0)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+
+
+class CoalescingTests(MockGeminiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.server.delay = 0.2
+        self.messages = [{'role': 'user', 'content': 'Is it safe?'}]
+
+    def test_concurrent_identical_prompts_share_one_call(self):
+        prompts = [self.messages, [{'role': 'user', 'content': 'is it SAFE'}]] * 3
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            results = list(pool.map(lambda messages: self.service.get_response(messages, {}), prompts))
+
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual({r['message'] for r in results}, {'Hello from Gemini'})
+        self.assertEqual(sum(1 for r in results if r.get('coalesced')), 5)
+        self.assertEqual(self.service.inflight.stats(), {'leaders': 1, 'coalesced': 5})
+
+    def test_different_context_is_not_coalesced(self):
+        contexts = [{'current_strategy': 'balanced'}, {'current_strategy': 'growth'}]
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            list(pool.map(lambda user_data: self.service.get_response(self.messages, user_data), contexts))
+
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_async_identical_prompts_share_one_call(self):
+        async def burst():
+            return await asyncio.gather(*(self.service.aget_response(self.messages, {}) for _ in range(4)))
+
+        results = asyncio.run(burst())
+
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual([r['message'] for r in results], ['Hello from Gemini'] * 4)
+
+
+class SingleFlightTests(SimpleTestCase):
+
+    def test_errors_reach_every_waiter(self):
+        flight = SingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.05)
+            raise RuntimeError('upstream down')
+
+        async def burst():
+            return await asyncio.gather(*(flight.ado('k', failing) for _ in range(3)), return_exceptions=True)
+
+        errors = asyncio.run(burst())
+        self.assertTrue(all(isinstance(e, RuntimeError) for e in errors))
+        self.assertEqual(flight.stats(), {'leaders': 1, 'coalesced': 2})
+
+    def test_sequential_calls_are_not_coalesced(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do('k', lambda: 1), (1, False))
+        self.assertEqual(flight.do('k', lambda: 2), (2, False))
+
+
+class IntentClassifierTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.classifier = IntentClassifier()
+
+    def test_automaton_finds_overlapping_patterns(self):
+        automaton = KeywordAutomaton([(' he ', 'he'), (' hers ', 'hers'), ('she', 'she'), ('he', 'he-part')])
+
+        self.assertEqual(
+            sorted(automaton.find(' she hers he ')),
+            ['he', 'he-part', 'he-part', 'he-part', 'hers', 'she']
+        )
+
+    def test_greeting_wins_over_start(self):
+        self.assertEqual(self.classifier.classify('Hi! Where do I start?').name, 'greeting')
+
+    def test_keywords_match_whole_words_only(self):
+        self.assertIsNone(self.classifier.classify('this address'))
+
+    def test_highest_score_wins(self):
+        self.assertEqual(self.classifier.classify('What is the APY?').name, 'yield')
+        self.assertEqual(self.classifier.classify('Explain DeFi to me').name, 'education')
+        self.assertEqual(self.classifier.classify("What's the minimum deposit?").name, 'deposit')
+
+    def test_ties_go_to_the_earlier_intent(self):
+        self.assertEqual(self.classifier.classify('is it safe to withdraw').name, 'security')
+
+    def test_unmatched_messages_get_the_default_answer(self):
+        response = self.classifier.respond('blorp')
+        self.assertIn("I'm here to help you with Attestify!", response)
+
+    def test_routes_only_confident_faq_questions(self):
+        self.assertEqual(self.classifier.route('How do I withdraw?').name, 'withdrawal')
+        # Strategy advice depends on the user, so it always goes to the model
+        self.assertIsNone(self.classifier.route('Which strategy is best?'))
+        self.assertIsNone(self.classifier.route('Is it safe to withdraw?'))
+        self.assertIsNone(self.classifier.route(
+            'I deposited last week and want to know how withdrawals interact with my savings goal progress'
+        ))
+
+
+class FaqRouterTests(MockGeminiTestCase):
+
+    def test_faq_questions_skip_gemini_when_enabled(self):
+        with mock.patch.dict(os.environ, {'AI_FAQ_ROUTER': '1'}):
+            service = AIAssistantService(client=self.client_pool, cache=ResponseCache())
+
+        result = service.get_response([{'role': 'user', 'content': 'Is Attestify safe?'}], {})
+
+        self.assertEqual(result['source'], 'faq')
+        self.assertEqual(result['intent'], 'security')
+        self.assertEqual(self.server.requests, [])
+
+    def test_router_is_off_by_default(self):
+        result = self.service.get_response([{'role': 'user', 'content': 'Is Attestify safe?'}], {})
+
+        self.assertEqual(result['source'], 'api')
+
+
+class GlossaryIndexTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.liquidity = DeFiTerm.objects.create(
+            term='Liquidity Pool',
+            short_definition='A pool of tokens locked in a smart contract',
+            detailed_explanation='...',
+            search_keywords='amm, lp, pool',
+            popularity_score=10,
+        )
+        self.impermanent = DeFiTerm.objects.create(
+            term='Impermanent Loss',
+            short_definition='Loss from price divergence in a liquidity pool',
+            detailed_explanation='...',
+        )
+        self.impermanent.related_terms.add(self.liquidity)
+
+    def test_edit_distance(self):
+        self.assertEqual(edit_distance('stablecion', 'stablecoin', 2), 2)
+        self.assertEqual(edit_distance('apy', 'tvl', 1), 2)
+
+    def test_search_ranks_term_matches_first(self):
+        results = get_glossary_index().search('liquidity')
+
+        # The built-in "Liquidity" entry is an exact term match
+        self.assertEqual([r['term'] for r in results], ['Liquidity', 'Liquidity Pool', 'Impermanent Loss'])
+        self.assertEqual(results[2]['related_terms'], ['Liquidity Pool'])
+
+    def test_prefix_fuzzy_and_keyword_matches(self):
+        index = get_glossary_index()
+
+        self.assertEqual(index.search('imperm')[0]['term'], 'Impermanent Loss')
+        self.assertEqual(index.search('stablecion')[0]['term'], 'Stablecoin')
+        self.assertEqual(index.search('amm')[0]['term'], 'Liquidity Pool')
+        self.assertEqual(index.lookup('LP')['term'], 'Liquidity Pool')
+
+    def test_autocomplete(self):
+        index = get_glossary_index()
+
+        self.assertEqual(index.autocomplete('li'), ['Liquidity Pool', 'Liquidity'])
+        self.assertIn('Impermanent Loss', index.autocomplete('loss'))
+
+    def test_lookups_do_not_query_the_database(self):
+        index = get_glossary_index()
+        with self.assertNumQueries(0):
+            get_glossary_index().search('pool')
+            index.autocomplete('st')
+
+    def test_index_rebuilds_after_changes(self):
+        get_glossary_index()
+        DeFiTerm.objects.create(term='Slippage', short_definition='Price movement during a trade', detailed_explanation='...')
+
+        self.assertEqual(get_glossary_index().lookup('slippage')['term'], 'Slippage')
+
+        self.liquidity.delete()
+        self.assertIsNone(get_glossary_index().lookup('liquidity pool'))
+
+    def test_explain_term_uses_the_index(self):
+        service = AIAssistantService(client=LLMClient(), cache=ResponseCache())
+
+        self.assertEqual(service.explain_term('apy'), f"**APY**: {get_glossary_index().lookup('apy')['short_definition']}")
+        self.assertTrue(service.explain_term('Liquidty Pool').startswith('**Liquidity Pool**'))
+        self.assertIn("I don't have a specific definition", service.explain_term('zzzz'))
+
+    def test_search_endpoints(self):
+        response = self.client.get('/api/ai_assistant/glossary/search/', {'q': 'pool', 'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['term'] for r in response.json()['results']], ['Liquidity Pool'])
+
+        response = self.client.get('/api/ai_assistant/glossary/autocomplete/', {'q': 'imp'})
+        self.assertEqual(response.json()['suggestions'], ['Impermanent Loss'])
+
+        self.assertEqual(self.client.get('/api/ai_assistant/glossary/search/').status_code, 400)
+
+
+class PopularityBufferTests(TestCase):
+
+    def setUp(self):
+        self.now = 1_000_000.0
+        self.buffer = PopularityBuffer(flush_interval=30, clock=lambda: self.now)
+        self.apy = DeFiTerm.objects.create(term='APY', short_definition='Yearly yield', detailed_explanation='...')
+        self.tvl = DeFiTerm.objects.create(term='TVL', short_definition='Total value locked', detailed_explanation='...')
+
+    def entry(self, term):
+        return {'id': term.id, 'term': term.term}
+
+    def test_hits_are_buffered_until_the_interval(self):
+        with self.assertNumQueries(0):
+            for _ in range(3):
+                self.buffer.record(self.entry(self.apy))
+
+        self.now += 31
+        # The overdue hit flushes APY (+4); the explicit flush writes TVL (+1)
+        with self.assertNumQueries(2):
+            self.buffer.record(self.entry(self.apy))
+            self.buffer.record(self.entry(self.tvl))
+            self.buffer.flush()
+
+        self.apy.refresh_from_db()
+        self.tvl.refresh_from_db()
+        self.assertEqual((self.apy.popularity_score, self.tvl.popularity_score), (4, 1))
+
+    def test_flush_batches_equal_increments(self):
+        self.buffer.record(self.entry(self.apy))
+        self.buffer.record(self.entry(self.tvl))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.buffer.flush(), 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.buffer.flush(), 0)
+
+    def test_trending_uses_the_recent_window(self):
+        self.buffer.record(self.entry(self.tvl))
+        self.now += 45 * 60
+        for _ in range(2):
+            self.buffer.record(self.entry(self.apy))
+        self.buffer.record({'id': None, 'term': 'Gas Fees'})
+
+        self.assertEqual(self.buffer.trending(), [('APY', 2), ('Gas Fees', 1), ('TVL', 1)])
+        self.assertEqual(self.buffer.trending(window_minutes=10), [('APY', 2), ('Gas Fees', 1)])
+
+    def test_increment_popularity_is_atomic(self):
+        stale = DeFiTerm.objects.get(pk=self.apy.pk)
+        self.apy.increment_popularity()
+        stale.increment_popularity()
+
+        self.apy.refresh_from_db()
+        self.assertEqual(self.apy.popularity_score, 2)
+
+    def test_trending_endpoint(self):
+        cache.clear()
+        buffer = PopularityBuffer()
+        DeFiTerm.objects.filter(pk=self.tvl.pk).update(popularity_score=7)
+        with mock.patch.object(views.ai_service, 'popularity', buffer), \
+                mock.patch('ai_assistant.views.get_popularity_buffer', return_value=buffer):
+            self.client.get('/api/ai_assistant/explain/', {'term': 'apy'})
+            response = self.client.get('/api/ai_assistant/glossary/trending/', {'limit': 2})
+
+        self.assertEqual(response.json()['terms'], [
+            {'term': 'APY', 'recent_hits': 1},
+            {'term': 'TVL', 'recent_hits': 0},
+        ])
+
+
+class AIConfigTests(MockGeminiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        invalidate_ai_config()
+        # Rolled-back rows don't fire post_delete, so drop whatever this test loaded
+        self.addCleanup(invalidate_ai_config)
+
+    def configure(self, key, value, data_type):
+        AIConfiguration.objects.create(key=key, value=value, data_type=data_type)
+
+    def test_registry_is_loaded_once(self):
+        with self.assertNumQueries(1):
+            get_ai_config()
+        with self.assertNumQueries(0):
+            for _ in range(5):
+                get_ai_config()
+            self.service._build_payload([{'role': 'user', 'content': 'Hi'}], {})
+
+    def test_defaults_and_invalid_values(self):
+        self.configure('temperature', 'warm', 'float')
+        self.configure('top_k', '20', 'integer')
+
+        with self.assertLogs('ai_assistant.config', level='WARNING'):
+            config = get_ai_config()
+
+        self.assertEqual(config.generation_config(), {
+            'temperature': 0.7, 'topK': 20, 'topP': 0.95, 'maxOutputTokens': 1024,
+        })
+
+    def test_saving_a_row_invalidates_the_registry(self):
+        self.assertEqual(get_ai_config().get('max_output_tokens'), 1024)
+
+        self.configure('max_output_tokens', '256', 'integer')
+        self.assertEqual(get_ai_config().get('max_output_tokens'), 256)
+
+        AIConfiguration.objects.filter(key='max_output_tokens').delete()
+        self.assertEqual(get_ai_config().get('max_output_tokens'), 1024)
+
+    def test_requests_use_the_configured_model_and_sampling(self):
+        self.configure('model', 'gemini-test', 'string')
+        self.configure('temperature', '0.2', 'float')
+
+        result = self.service.get_response([{'role': 'user', 'content': 'What is APY?'}], {})
+
+        request = self.server.requests[0]
+        self.assertEqual(result['source'], 'api')
+        self.assertIn('/models/gemini-test:generateContent', request['path'])
+        self.assertEqual(request['payload']['generationConfig']['temperature'], 0.2)
+
+    async def test_async_paths_reload_config_off_the_event_loop(self):
+        await sync_to_async(self.configure)('model', 'gemini-async', 'string')
+
+        result = await self.service.aget_response([{'role': 'user', 'content': 'What is APY?'}], {})
+        chunks = [chunk async for chunk in self.service.stream_response([{'role': 'user', 'content': 'And TVL?'}], {})]
+
+        self.assertEqual(result['source'], 'api')
+        self.assertEqual(chunks[-1]['source'], 'api')
+        self.assertTrue(all('/models/gemini-async:' in request['path'] for request in self.server.requests))
+
+
+class ConversationStorageTests(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.archive_dir = tmp.name
+
+    def make_session(self, session_id, idle_days):
+        session = ConversationSession.objects.create(session_id=session_id, user_context={'wallet_address': '0xabc'})
+        session.add_message('user', 'What is APY?')
+        reply = session.add_message('assistant', 'Annual percentage yield.', {'error': None, 'source': 'api'})
+        ConversationSession.objects.filter(pk=session.pk).update(updated_at=timezone.now() - timedelta(days=idle_days))
+        return session, reply
+
+    def test_compact_metadata(self):
+        compacted = compact_metadata({
+            'source': 'fallback',
+            'error': 'x' * 1000,
+            'wallet_address': '0xabc',
+            'prompt_version': None,
+        }, max_chars=50)
+
+        self.assertEqual(set(compacted), {'source', 'error'})
+        self.assertEqual(len(compacted['error']), 50)
+
+    def test_idle_sessions_are_archived_and_deleted(self):
+        old, reply = self.make_session('old', idle_days=120)
+        AIFeedback.objects.create(conversation=reply, rating=5)
+        self.make_session('recent', idle_days=5)
+
+        archiver = ConversationArchiver(retention_days=90, archive_dir=self.archive_dir, batch_size=1)
+        self.assertEqual(archiver.preview(), (1, 2))
+        sessions, messages, files = archiver.run()
+
+        self.assertEqual((sessions, messages, len(files)), (1, 2, 1))
+        with gzip.open(files[0], 'rt') as archive:
+            records = [json.loads(line) for line in archive]
+        self.assertEqual([record['session_id'] for record in records], ['old'])
+        self.assertEqual([m['message'] for m in records[0]['messages']], ['What is APY?', 'Annual percentage yield.'])
+        self.assertEqual(records[0]['messages'][1]['metadata'], {'source': 'api'})
+        self.assertEqual(records[0]['feedback'][0]['rating'], 5)
+
+        self.assertEqual(list(ConversationSession.objects.values_list('session_id', flat=True)), ['recent'])
+        self.assertEqual(set(Conversation.objects.values_list('session_id', flat=True)), {'recent'})
+        self.assertFalse(AIFeedback.objects.exists())
+
+    def test_command_dry_run_keeps_everything(self):
+        self.make_session('old', idle_days=120)
+        Conversation.objects.update(metadata={'wallet_address': '0xabc'})
+        out = StringIO()
+
+        call_command('prune_conversations', '--dry-run', '--compact-metadata',
+                     archive_dir=self.archive_dir, stdout=out)
+
+        self.assertIn('Would prune 1 session(s) with 2 message(s)', out.getvalue())
+        self.assertIn('Would compact metadata on 2 message(s)', out.getvalue())
+        self.assertEqual(Conversation.objects.count(), 2)
+        self.assertEqual(os.listdir(self.archive_dir), [])
+
+
+class UserConversationsTests(TestCase):
+
+    def setUp(self):
+        base = timezone.now() - timedelta(hours=1)
+        for index in range(3):
+            session = ConversationSession.objects.create(
+                session_id=f'session-{index}', user_context={'wallet_address': '0xabc'}
+            )
+            for turn in range(index + 1):
+                session.add_message('user', f'Question {turn} in session {index}')
+            ConversationSession.objects.filter(pk=session.pk).update(updated_at=base + timedelta(minutes=index))
+        ConversationSession.objects.create(session_id='other-wallet', user_context={'wallet_address': '0xdef'})
+
+    def fetch(self, **params):
+        return self.client.get('/api/ai_assistant/conversations/', params, headers={'x-wallet-address': '0xabc'})
+
+    def test_sessions_are_listed_with_previews_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.fetch(limit=2)
+
+        body = response.json()
+        self.assertEqual([c['session_id'] for c in body['conversations']], ['session-2', 'session-1'])
+        self.assertEqual(body['conversations'][0]['message_count'], 3)
+        self.assertEqual(body['conversations'][0]['last_message']['content'], 'Question 2 in session 2')
+
+        rest = self.fetch(limit=2, cursor=body['next_cursor']).json()
+        self.assertEqual([c['session_id'] for c in rest['conversations']], ['session-0'])
+        self.assertIsNone(rest['next_cursor'])
+
+    def test_history_returns_the_session_messages(self):
+        user = User.objects.create_user('saver')
+        ConversationSession.objects.filter(session_id='session-1').update(user=user)
+        self.client.force_login(user)
+
+        response = self.client.get('/api/ai_assistant/conversations/session-1/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(m['role'], m['content']) for m in response.json()['messages']],
+            [('user', 'Question 0 in session 1'), ('user', 'Question 1 in session 1')]
+        )
+
+    def test_requires_a_caller(self):
+        self.assertEqual(self.client.get('/api/ai_assistant/conversations/').status_code, 401)
+        self.assertEqual(self.fetch(cursor='not a cursor').status_code, 400)
+
+
+class RateLimiterTests(SimpleTestCase):
+
+    def test_bucket_allows_a_burst_then_refills(self):
+        now = [0.0]
+        limiter = MemoryRateLimiter(per_minute=6, burst=2, clock=lambda: now[0])
+
+        self.assertEqual([limiter.allow('wallet:0xabc')[0] for _ in range(3)], [True, True, False])
+        self.assertAlmostEqual(limiter.allow('wallet:0xabc')[1], 10)
+        self.assertTrue(limiter.allow('wallet:0xdef')[0])
+
+        now[0] += 10
+        self.assertTrue(limiter.allow('wallet:0xabc')[0])
+
+    def test_cache_backend_is_shared_between_instances(self):
+        cache.clear()
+        first = CacheRateLimiter(per_minute=1, burst=1)
+        second = CacheRateLimiter(per_minute=1, burst=1)
+
+        self.assertTrue(first.allow('user:1')[0])
+        self.assertFalse(second.allow('user:1')[0])
+
+
+class UsageQuotaTests(MockGeminiTestCase):
+
+    def ask(self, message='What is APY?', wallet='0xABC', **extra):
+        return self.client.post(
+            '/api/ai_assistant/chat/',
+            data={'message': message},
+            content_type='application/json',
+            headers={'x-wallet-address': wallet},
+            **extra
+        )
+
+    def test_usage_is_recorded_per_caller_and_day(self):
+        self.ask()
+        self.ask('What is TVL?')
+
+        usage = TokenUsage.objects.get(caller='ip:127.0.0.1')
+        self.assertEqual(usage.requests, 2)
+        self.assertGreater(usage.prompt_tokens, 0)
+        self.assertEqual(usage.total_tokens, usage.prompt_tokens + usage.output_tokens)
+
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(admin)
+        report = self.client.get('/api/ai_assistant/usage/daily/').json()
+        self.assertEqual(report['days'][0]['requests'], 2)
+        self.assertEqual(report['days'][0]['total_tokens'], usage.total_tokens)
+
+    def test_rate_limited_caller_gets_429(self):
+        with mock.patch.object(views, 'get_rate_limiter', return_value=MemoryRateLimiter(per_minute=1, burst=1)):
+            self.assertEqual(self.ask().status_code, 200)
+            response = self.ask()
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_daily_quota_is_enforced_before_gemini(self):
+        TokenUsage.objects.create(caller='ip:127.0.0.1', day=timezone.localdate(), total_tokens=500)
+
+        with mock.patch.object(views, 'usage_tracker', UsageTracker(daily_quota=500)):
+            response = self.ask()
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.server.requests, [])
+        self.assertFalse(Conversation.objects.exists())
+
+    def test_rotating_the_wallet_header_does_not_reset_the_budget(self):
+        with mock.patch.object(views, 'get_rate_limiter', return_value=MemoryRateLimiter(per_minute=1, burst=1)):
+            self.assertEqual(self.ask(wallet='0x01').status_code, 200)
+            self.assertEqual(self.ask(wallet='0x02').status_code, 429)
+
+    @override_settings(REST_FRAMEWORK={'NUM_PROXIES': 1})
+    def test_anonymous_callers_are_told_apart_by_forwarded_address(self):
+        with mock.patch.object(views, 'get_rate_limiter', return_value=MemoryRateLimiter(per_minute=1, burst=1)):
+            self.assertEqual(self.ask(HTTP_X_FORWARDED_FOR='203.0.113.7').status_code, 200)
+            self.assertEqual(self.ask(HTTP_X_FORWARDED_FOR='198.51.100.2').status_code, 200)
+            # A spoofed leading entry is ignored; the proxy's entry is what counts
+            self.assertEqual(self.ask(HTTP_X_FORWARDED_FOR='10.0.0.1, 203.0.113.7').status_code, 429)
+
+        self.assertEqual(set(TokenUsage.objects.values_list('caller', flat=True)),
+                         {'ip:203.0.113.7', 'ip:198.51.100.2'})
+
+    def test_forwarded_header_is_ignored_without_trusted_proxies(self):
+        request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='203.0.113.7', REMOTE_ADDR='10.0.0.9')
+        self.assertEqual(client_ip(request), '10.0.0.9')
+
+    def test_deploy_check_flags_process_local_cache(self):
+        self.assertEqual([w.id for w in check_shared_cache(None)], ['ai_assistant.W001'])
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache'}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class UserContextTests(MockGeminiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user('saver')
+        UserProfile.objects.create(user=self.user, wallet_address='0xabc', total_deposited=400, total_earned=12.5)
+        self.goal = SavingsGoal.objects.create(
+            user=self.user, wallet_address='0xabc', title='Laptop', target_amount=1000,
+            current_amount=250, strategy='growth'
+        )
+        SavingsGoal.objects.create(user=self.user, wallet_address='0xabc', title='Trip', target_amount=500,
+                                   current_amount=100, strategy='balanced', status='completed')
+        self.provider = UserContextProvider()
+
+    def test_context_is_built_in_one_query(self):
+        with self.assertNumQueries(1):
+            data = self.provider.get(wallet_address='0xabc')
+
+        self.assertEqual(data, {
+            'is_new_user': False,
+            'balance': 412.5,
+            'total_deposited': 400.0,
+            'total_earned': 12.5,
+            'current_strategy': 'growth',
+            'active_goals': {'count': 1, 'target': 1000.0, 'saved': 250.0},
+        })
+        self.assertEqual(self.provider.build(user=self.user), data)
+
+    def test_context_is_cached_until_goals_change(self):
+        self.provider.get(wallet_address='0xabc')
+        with self.assertNumQueries(0):
+            self.provider.get(wallet_address='0xabc')
+
+        self.goal.current_amount = 300
+        self.goal.save()
+
+        self.assertEqual(self.provider.get(wallet_address='0xabc')['active_goals']['saved'], 300.0)
+
+    def test_context_is_cached_until_profile_totals_change(self):
+        self.provider.get(user=self.user)
+        self.provider.get(wallet_address='0xabc')
+
+        ProfileStatsMaterializer.record_progress([(self.user.id, 'deposit', '100')])
+
+        self.assertEqual(self.provider.get(user=self.user)['total_deposited'], 500.0)
+        self.assertEqual(self.provider.get(wallet_address='0xabc')['total_deposited'], 500.0)
+
+    def test_wallet_prefers_the_profile_owner(self):
+        # The earlier user only has a goal on the wallet
+        SavingsGoal.objects.create(user=self.user, wallet_address='0xdef', title='Bike', target_amount=50)
+        owner = User.objects.create_user('owner')
+        UserProfile.objects.create(user=owner, wallet_address='0xdef', total_deposited=75)
+
+        self.assertEqual(self.provider.build(wallet_address='0xdef')['total_deposited'], 75.0)
+
+    def test_unknown_wallet_is_a_new_user(self):
+        self.assertEqual(self.provider.get(wallet_address='0xdef'), {'is_new_user': True})
+
+    def test_chat_prompt_includes_financial_context(self):
+        self.client.post(
+            '/api/ai_assistant/chat/',
+            data={'message': 'How am I doing?'},
+            content_type='application/json',
+            headers={'x-wallet-address': '0xabc'},
+        )
+
+        context = self.server.requests[0]['payload']['contents'][-1]['parts'][0]['text']
+        self.assertIn('Current Balance: 412.5 cUSD', context)
+        self.assertIn('Current Strategy: Growth', context)
+        self.assertIn('Active Savings Goals: 1 (250.0 of 1000.0 cUSD saved)', context)
+
+
+class ChatBenchmarkTests(TestCase):
+
+    corpus = [
+        {'wallet': '0x01', 'messages': ['Which strategy should I choose?', 'What are the risks?']},
+        {'wallet': '0x02', 'messages': ['Which strategy should I choose?']},
+    ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_percentile_uses_nearest_rank(self):
+        values = list(range(1, 101))
+
+        self.assertEqual((percentile(values, 50), percentile(values, 95), percentile(values, 99)), (50, 95, 99))
+        self.assertEqual(percentile([], 50), 0)
+
+    def test_replay_reports_latency_tokens_and_cache_hits(self):
+        report = ChatBenchmark(corpus=self.corpus, latency=0).run()
+
+        self.assertEqual(report['turns'], 3)
+        self.assertEqual(report['sources'], {'api': 2, 'cached': 1})
+        self.assertEqual(report['upstream_requests'], 2)
+        self.assertGreater(report['tokens_sent'], 0)
+        self.assertLessEqual(report['latency_ms']['p50'], report['latency_ms']['p99'])
+        self.assertFalse(ConversationSession.objects.exists())
+
+    def test_injected_failures_show_up_as_fallbacks(self):
+        with self.assertLogs('ai_assistant', level='WARNING'):
+            report = ChatBenchmark(corpus=self.corpus[:1], latency=0, failure_rate=1, seed=7).run()
+
+        self.assertEqual(report['fallback_rate'], 1.0)
+        self.assertEqual(report['cache_hits'], 0)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.now = [0.0]
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, slow_call_seconds=5,
+                                      clock=lambda: self.now[0])
+
+    def fail(self, times=1):
+        for _ in range(times):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record(False)
+
+    def test_opens_after_consecutive_failures(self):
+        with self.assertLogs('ai_assistant.resilience', level='WARNING'):
+            self.fail(2)
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.stats()['rejected'], 1)
+
+    def test_success_resets_the_failure_count(self):
+        self.fail()
+        self.breaker.record(True, elapsed=0.1)
+        self.fail()
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_slow_calls_count_as_failures(self):
+        with self.assertLogs('ai_assistant.resilience', level='WARNING'):
+            for _ in range(2):
+                self.breaker.allow()
+                self.breaker.record(True, elapsed=6)
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+    def test_half_open_lets_one_trial_through(self):
+        with self.assertLogs('ai_assistant.resilience', level='WARNING'):
+            self.fail(2)
+            self.now[0] += 30
+
+            self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+            self.assertTrue(self.breaker.allow())
+            self.assertFalse(self.breaker.allow())
+            self.breaker.record(False)
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.now[0] += 30
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record(True, elapsed=0.1)
+        self.assertEqual(self.breaker.stats(), {'state': 'closed', 'consecutive_failures': 0,
+                                                'rejected': 1, 'opened': 2})
+
+
+class HedgedCallTests(SimpleTestCase):
+
+    def attempts(self, *timings):
+        """
+        An ``fn(sent)`` whose n-th call waits ``queued`` seconds before it is
+        sent, then answers ``(n, status)`` after ``latency`` more
+        """
+        calls = []
+
+        async def call(sent):
+            queued, latency, status = timings[len(calls)]
+            calls.append(1)
+            number = len(calls)
+            await asyncio.sleep(queued)
+            if sent:
+                sent()
+            await asyncio.sleep(latency)
+            return number, status
+        return call, calls
+
+    def hedge(self, fn, delay, budget=None):
+        return hedged_call(fn, delay, accept=lambda result: result[1] == 200, budget=budget or HedgeBudget())
+
+    def test_latency_tracker_hedges_at_recent_p95(self):
+        tracker = LatencyTracker(default_delay=2)
+        self.assertEqual(tracker.hedge_delay(), 2)
+
+        for ms in range(1, 101):
+            tracker.add(ms / 1000)
+        self.assertEqual(tracker.hedge_delay(), 0.095)
+
+    def test_fast_call_is_not_hedged(self):
+        call, calls = self.attempts((0, 0, 200))
+
+        self.assertEqual(self.hedge(call, delay=1), ((1, 200), []))
+        self.assertEqual(len(calls), 1)
+
+    def test_slow_call_is_hedged_and_cancelled_loser_is_reported(self):
+        call, calls = self.attempts((0, 1, 200), (0, 0, 200))
+
+        with self.assertLogs('ai_assistant.resilience', level='INFO'):
+            self.assertEqual(self.hedge(call, delay=0.05), ((2, 200), [None]))
+
+    def test_retryable_answer_does_not_win_the_race(self):
+        call, calls = self.attempts((0, 0.3, 200), (0, 0, 503))
+
+        with self.assertLogs('ai_assistant.resilience', level='INFO'):
+            self.assertEqual(self.hedge(call, delay=0.05), ((1, 200), [(2, 503)]))
+
+    def test_delay_starts_once_the_request_is_sent(self):
+        call, calls = self.attempts((0.3, 0.05, 200), (0, 0, 200))
+
+        self.assertEqual(self.hedge(call, delay=0.1), ((1, 200), []))
+        self.assertEqual(len(calls), 1)
+
+    def test_budget_bounds_hedges(self):
+        budget = HedgeBudget(ratio=0, max_in_flight=1)
+        call, calls = self.attempts((0, 0.1, 200), (0, 0, 200), (0, 0.1, 200))
+
+        with self.assertLogs('ai_assistant.resilience', level='INFO'):
+            self.hedge(call, delay=0.01, budget=budget)
+        self.assertEqual(self.hedge(call, delay=0.01, budget=budget), ((3, 200), []))
+        self.assertEqual(budget.stats(), {'in_flight': 0, 'hedged': 1, 'denied': 1})
+
+    def test_concurrent_callers_are_not_queued_behind_each_other(self):
+        def call_once(_):
+            return self.hedge(self.attempts((0, 0.2, 200))[0], delay=0.5)
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=24) as pool:
+            results = list(pool.map(call_once, range(24)))
+
+        self.assertEqual(results, [((1, 200), [])] * 24)
+        self.assertLess(time.monotonic() - started, 0.5)
+
+
+class ResilientServiceTests(MockGeminiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.server.status = 503
+        self.client_pool = LLMClient(backoff_base=0, max_retries=0)
+        self.addCleanup(self.client_pool.close)
+        self.service.client = self.client_pool
+        self.service.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        self.messages = [{'role': 'user', 'content': 'How do I withdraw?'}]
+
+    def test_open_circuit_serves_fallback_without_calling_gemini(self):
+        with self.assertLogs('ai_assistant', level='WARNING'):
+            for _ in range(3):
+                result = self.service.get_response(self.messages, {})
+
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(result['source'], 'fallback')
+        self.assertEqual(result['error'], 'Circuit breaker open')
+        self.assertEqual(self.service.breaker.state, CircuitBreaker.OPEN)
+
+    def test_open_circuit_short_circuits_streams(self):
+        async def collect():
+            return [event async for event in self.service.stream_response(self.messages, {})]
+
+        with self.assertLogs('ai_assistant', level='WARNING'):
+            for _ in range(3):
+                events = asyncio.run(collect())
+
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(events[-1]['error'], 'Circuit breaker open')
+
+    def test_client_errors_do_not_trip_the_breaker(self):
+        self.server.status = 400
+        with self.assertLogs('ai_assistant', level='WARNING'):
+            for _ in range(3):
+                self.service.get_response(self.messages, {})
+
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(self.service.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_cancelled_stream_trial_does_not_wedge_the_breaker(self):
+        breaker = self.service.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        with self.assertLogs('ai_assistant', level='WARNING'):
+            breaker.allow()
+            breaker.record(False)
+        self.server.status = 200
+        self.server.delay = 1
+
+        async def disconnect():
+            stream = self.service.stream_response(self.messages, {})
+            task = asyncio.ensure_future(stream.__anext__())
+            while not self.server.requests:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await stream.aclose()
+
+        with self.assertLogs('ai_assistant', level='WARNING'):
+            asyncio.run(disconnect())
+
+        self.assertTrue(breaker.allow())
+
+    def hedging_service(self):
+        self.server.status = 200
+        self.server.delay = 0.2
+        self.service.hedging = True
+        self.service.latency = LatencyTracker(default_delay=0.05)
+        return self.service
+
+    def test_hedged_requests_answer_slow_calls(self):
+        service = self.hedging_service()
+
+        with self.assertLogs('ai_assistant.resilience', level='INFO'):
+            result = asyncio.run(service.aget_response(self.messages, {}))
+
+        prompt_tokens = self.server.usage(self.server.requests[0]['payload'])['promptTokenCount']
+        self.assertEqual(result['message'], 'Hello from Gemini')
+        self.assertEqual(len(self.server.requests), 2)
+        # The cancelled hedge still read the prompt, so it is billed too
+        self.assertEqual(result['prompt_tokens'], 2 * prompt_tokens)
+
+    def test_sync_calls_hedge_on_the_calling_thread(self):
+        service = self.hedging_service()
+
+        with self.assertLogs('ai_assistant.resilience', level='INFO'):
+            result = service.get_response(self.messages, {})
+
+        self.assertEqual(result['source'], 'api')
+        self.assertEqual(len(self.server.requests), 2)
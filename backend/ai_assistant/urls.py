@@ -5,9 +5,15 @@ app_name = 'ai_assistant'
 
 urlpatterns = [
     path('chat/', views.chat, name='chat'),
+    path('chat/stream/', views.chat_stream, name='chat_stream'),
     path('conversations/', views.user_conversations, name='user_conversations'),
     path('conversations/<str:session_id>/', views.conversation_history, name='conversation_history'),
     path('conversations/<str:session_id>/delete/', views.delete_conversation, name='delete_conversation'),
     path('explain/', views.explain_term, name='explain_term'),
+    path('glossary/search/', views.glossary_search, name='glossary_search'),
+    path('glossary/autocomplete/', views.glossary_autocomplete, name='glossary_autocomplete'),
+    path('glossary/trending/', views.trending_terms, name='trending_terms'),
     path('strategies/', views.strategy_comparison, name='strategy_comparison'),
+    path('cache/stats/', views.response_cache_stats, name='response_cache_stats'),
+    path('usage/daily/', views.token_usage_report, name='token_usage_report'),
 ]
@@ -0,0 +1,112 @@
+"""
+Per-caller financial context for AI prompts.
+
+``UserContextProvider`` assembles what the assistant knows about a caller
+(balance and deposit totals from ``UserProfile``, a summary of active
+``SavingsGoal`` rows and the strategy they use) in one query: the user row
+is selected with the profile joined and the goal aggregates as correlated
+subqueries. Results are cached per user or wallet for ``TTL`` seconds, and
+``signals.py`` drops the cached entry as soon as a goal or profile changes.
+"""
+import logging
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import (
+    Case, Count, DecimalField, Exists, F, IntegerField, OuterRef, Q, Subquery, Sum, When,
+)
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'ai_assistant:user_context:'
+
+
+def _cache_keys(user_id=None, wallet_address=''):
+    keys = []
+    if user_id:
+        keys.append(f"{KEY_PREFIX}user:{user_id}")
+    if wallet_address:
+        keys.append(f"{KEY_PREFIX}wallet:{wallet_address.lower()}")
+    return keys
+
+
+def _money(value):
+    return round(float(value or 0), 2)
+
+
+class UserContextProvider:
+    """Builds and caches the ``user_data`` dict passed to the assistant"""
+
+    TTL = getattr(settings, 'AI_USER_CONTEXT_TTL', 60)
+
+    def get(self, user=None, wallet_address=''):
+        """Context for an authenticated user, or else for the wallet they claim"""
+        # Signed-in users get their own data whatever wallet header they send
+        keys = _cache_keys(user_id=user.id) if user else _cache_keys(wallet_address=wallet_address)
+        if not keys:
+            return {'is_new_user': True}
+        data = cache.get(keys[0])
+        if data is None:
+            data = self.build(user, wallet_address)
+            cache.set(keys[0], data, self.TTL)
+        return dict(data)
+
+    def build(self, user=None, wallet_address=''):
+        """Load the caller's financial summary in a single query"""
+        from attestify.models import SavingsGoal
+
+        if user:
+            owners = User.objects.filter(pk=user.pk)
+        else:
+            # Several users can have goals on one wallet; its profile owner wins
+            owners = User.objects.filter(
+                Q(profile__wallet_address=wallet_address)
+                | Q(pk__in=SavingsGoal.objects.filter(wallet_address=wallet_address).values('user_id'))
+            ).order_by(
+                Case(When(profile__wallet_address=wallet_address, then=0), default=1, output_field=IntegerField()),
+                'pk'
+            )
+
+        active = SavingsGoal.objects.filter(user=OuterRef('pk'), status='active')
+        totals = active.order_by().values('user')
+        row = owners.values(
+            total_deposited=F('profile__total_deposited'),
+            total_earned=F('profile__total_earned'),
+            active_goals=Subquery(totals.annotate(n=Count('id')).values('n'), output_field=IntegerField()),
+            goals_target=Subquery(totals.annotate(total=Sum('target_amount')).values('total'),
+                                  output_field=DecimalField()),
+            goals_saved=Subquery(totals.annotate(total=Sum('current_amount')).values('total'),
+                                 output_field=DecimalField()),
+            strategy=Subquery(active.order_by('-created_at').values('strategy')[:1]),
+            has_goals=Exists(SavingsGoal.objects.filter(user=OuterRef('pk'))),
+        ).first()
+
+        if row is None:
+            return {'is_new_user': True}
+
+        deposited = _money(row['total_deposited'])
+        earned = _money(row['total_earned'])
+        data = {'is_new_user': not (deposited or row['has_goals'])}
+        if deposited or earned:
+            data.update({
+                'balance': round(deposited + earned, 2),
+                'total_deposited': deposited,
+                'total_earned': earned,
+            })
+        if row['strategy']:
+            data['current_strategy'] = row['strategy']
+        if row['active_goals']:
+            data['active_goals'] = {
+                'count': row['active_goals'],
+                'target': _money(row['goals_target']),
+                'saved': _money(row['goals_saved']),
+            }
+        return data
+
+
+def invalidate_user_context(user_id=None, wallet_address=''):
+    """Forget cached context for a user and/or wallet"""
+    keys = _cache_keys(user_id, wallet_address)
+    if keys:
+        cache.delete_many(keys)
@@ -1,19 +1,140 @@
+import asyncio
+import json
 import logging
+import math
 import uuid
 from typing import Optional, Dict, Any
+from asgiref.sync import sync_to_async
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from django.http import HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.contrib.auth.models import User
+from django.utils import timezone
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Substr
+from attestify.pagination import decode_cursor, encode_cursor, keyset_filter, parse_page_size
 from .models import Conversation, ConversationSession
+from .cache import get_response_cache
+from .glossary import get_glossary_index
+from .history import HistoryManager
+from .popularity import PopularityBuffer, get_popularity_buffer
+from .prompts import estimate_tokens
+from .quotas import UsageTracker, caller_key, client_ip, get_rate_limiter
 from .services import AIAssistantService
+from .storage import compact_metadata
+from .user_context import UserContextProvider
 from .serializers import MessageSerializer, ConversationSerializer
 
 logger = logging.getLogger(__name__)
 ai_service = AIAssistantService()
+usage_tracker = UsageTracker()
+user_context_provider = UserContextProvider()
+
+
+def _resolve_session(user, session_id: Optional[str], wallet_address: str) -> Optional[ConversationSession]:
+    """Find the caller's existing session, or start a new one if no id was given"""
+    if not session_id:
+        return ConversationSession.objects.create(
+            user=user,  # Can be None for wallet-based access
+            session_id=str(uuid.uuid4()),
+            user_context={'wallet_address': wallet_address} if wallet_address else {}
+        )
+    
+    try:
+        if user:
+            return ConversationSession.objects.filter(session_id=session_id, user=user).first()
+        # For wallet-based access, find session by session_id and wallet in metadata
+        return ConversationSession.objects.filter(
+            session_id=session_id,
+            user__isnull=True,
+            user_context__wallet_address=wallet_address
+        ).first()
+    except Exception as e:
+        logger.error(f"Error finding session {session_id}: {str(e)}")
+        return None
+
+
+def _build_user_data(user, wallet_address: str) -> Dict[str, Any]:
+    """Get user context data for the system prompt"""
+    return user_context_provider.get(user, wallet_address)
+
+
+def _prepare_turn(user, session: ConversationSession, user_message: str, wallet_address: str):
+    """Save the user's message and return (messages_for_api, user_data)"""
+    Conversation.objects.create(
+        user=user,  # Can be None for wallet-based access
+        session_id=session.session_id,
+        message=user_message,
+        role='user'
+    )
+    
+    messages_for_api, summary = HistoryManager().window(session)
+    user_data = _build_user_data(user, wallet_address)
+    if summary:
+        user_data['conversation_summary'] = summary
+    return messages_for_api, user_data
+
+
+def _check_limits(caller: str) -> Optional[tuple]:
+    """
+    ``(body, status, headers)`` rejecting the turn if the caller is over their
+    request rate or daily token quota, or None to let it through
+    """
+    allowed, retry_after = get_rate_limiter().allow(caller)
+    if not allowed:
+        logger.info(f"Rate limited AI chat for {caller}")
+        return (
+            {'error': 'Too many requests, please slow down'},
+            status.HTTP_429_TOO_MANY_REQUESTS,
+            {'Retry-After': str(math.ceil(retry_after))}
+        )
+    if usage_tracker.over_quota(caller):
+        logger.info(f"Daily AI token quota reached for {caller}")
+        return (
+            {'error': 'Daily AI usage limit reached, please try again tomorrow'},
+            status.HTTP_429_TOO_MANY_REQUESTS,
+            {}
+        )
+    return None
+
+
+def _finish_turn(user, session: ConversationSession, ai_response: Dict[str, Any], caller: str) -> Conversation:
+    """Save the assistant's reply, update the session and bill the caller"""
+    assistant_message = Conversation.objects.create(
+        user=user,  # Can be None for wallet-based access
+        session_id=session.session_id,
+        message=ai_response['message'],
+        role='assistant',
+        # The wallet lives on the session and long upstream errors are cut
+        metadata=compact_metadata({
+            'source': ai_response.get('source', 'api'),
+            'error': ai_response.get('error'),
+            **{
+                key: ai_response[key]
+                for key in ('prompt_version', 'prompt_tokens_saved')
+                if key in ai_response
+            }
+        }),
+        response_source=ai_response.get('source', 'api'),
+        tokens_used=ai_response.get('tokens_used', 0)
+    )
+    
+    # Update session counters in place: this turn added the user's message and the reply
+    ConversationSession.objects.filter(pk=session.pk).update(
+        message_count=F('message_count') + 2,
+        total_tokens=F('total_tokens') + assistant_message.tokens_used,
+        updated_at=timezone.now()
+    )
+    usage_tracker.record(caller, ai_response)
+    return assistant_message
 
 
 @api_view(['POST'])
@@ -43,118 +164,159 @@ def chat(request: Request) -> Response:
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    if session_id:
-        try:
-            if user:
-                session = get_object_or_404(
-                    ConversationSession, 
-                    session_id=session_id, 
-                    user=user
-                )
-            else:
-                # For wallet-based access, find session by session_id and wallet in metadata
-                session = ConversationSession.objects.filter(
-                    session_id=session_id,
-                    user__isnull=True,
-                    user_context__wallet_address=wallet_address
-                ).first()
-                if not session:
-                    logger.warning(f"Session not found: {session_id}")
-                    return Response(
-                        {'error': 'Session not found'},
-                        status=status.HTTP_404_NOT_FOUND
-                    )
-        except Exception as e:
-            logger.error(f"Error finding session {session_id}: {str(e)}")
-            return Response(
-                {'error': 'Session not found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-    else:
-        session_id = str(uuid.uuid4())
-        session = ConversationSession.objects.create(
-            user=user,  # Can be None for wallet-based access
-            session_id=session_id,
-            user_context={'wallet_address': wallet_address} if wallet_address else {}
-        )
+    caller = caller_key(user, client_ip(request))
+    rejection = _check_limits(caller)
+    if rejection:
+        body, code, headers = rejection
+        return Response(body, status=code, headers=headers)
     
-    Conversation.objects.create(
-        user=user,  # Can be None for wallet-based access
-        session_id=session_id,
-        message=user_message,
-        role='user',
-        metadata={'wallet_address': wallet_address} if wallet_address else {}
-    )
+    session = _resolve_session(user, session_id, wallet_address)
+    if not session:
+        logger.warning(f"Session not found: {session_id}")
+        return Response(
+            {'error': 'Session not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
     
-    recent_messages = Conversation.objects.filter(
-        session_id=session_id
-    ).order_by('-created_at')[:10]
-    
-    messages_for_api = []
-    for msg in reversed(recent_messages):
-        messages_for_api.append({
-            'role': msg.role,
-            'content': msg.message
-        })
-    
-    # Get user context data
-    # For wallet-based access, we'll use data from request if provided
-    user_data = {
-        'is_new_user': True,  # Default for wallet-based access
-    }
-    
-    # If authenticated user, get data from user model
-    if user:
-        user_data['is_new_user'] = not hasattr(user, 'deposits') or not user.deposits.exists()
-        
-        if hasattr(user, 'balances'):
-            latest_balance = user.balances.first()
-            if latest_balance:
-                user_data.update({
-                    'balance': float(latest_balance.current_balance),
-                    'total_deposited': float(latest_balance.total_deposited),
-                    'total_earned': float(latest_balance.total_earned),
-                })
-        
-        if hasattr(user, 'deposits'):
-            latest_deposit = user.deposits.filter(
-                transaction_type='deposit',
-                strategy__isnull=False
-            ).first()
-            if latest_deposit:
-                user_data['current_strategy'] = latest_deposit.strategy.name
+    messages_for_api, user_data = _prepare_turn(user, session, user_message, wallet_address)
     
     # Get AI response
-    logger.debug(f"Getting AI response for session {session_id}")
+    logger.debug(f"Getting AI response for session {session.session_id}")
     ai_response = ai_service.get_response(messages_for_api, user_data)
     logger.info(f"AI response source: {ai_response.get('source', 'unknown')}")
     
-    # Save assistant message
-    assistant_message = Conversation.objects.create(
-        user=user,  # Can be None for wallet-based access
-        session_id=session_id,
-        message=ai_response['message'],
-        role='assistant',
-        metadata={
-            'source': ai_response.get('source', 'api'),
-            'error': ai_response.get('error'),
-            'wallet_address': wallet_address
-        },
-        response_source=ai_response.get('source', 'api')
-    )
-    
-    # Update session
-    session.message_count = Conversation.objects.filter(session_id=session_id).count()
-    session.save()
+    assistant_message = _finish_turn(user, session, ai_response, caller)
     
     return Response({
-        'session_id': session_id,
+        'session_id': session.session_id,
         'message': ai_response['message'],
         'source': ai_response.get('source', 'api'),
         'timestamp': assistant_message.created_at.isoformat()
     })
 
 
+def _sse(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """Format one server-sent event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+def _authenticate(request: HttpRequest):
+    """
+    Authenticate with DRF's configured authenticators, as chat/ does. Session
+    callers must carry the CSRF token; bad credentials raise an APIException.
+    """
+    drf_request = Request(
+        request,
+        # The CSRF check reads request.POST, which needs the parsers
+        parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES],
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+    user = drf_request.user
+    return user if user.is_authenticated else None
+
+
+def _interrupted_response(parts, messages_for_api) -> Dict[str, Any]:
+    """
+    Stand-in for the ``done`` chunk when the client goes away mid-stream. The
+    prompt was already sent, so usage is estimated rather than left unbilled.
+    """
+    prompt_tokens = sum(estimate_tokens(message['content']) for message in messages_for_api)
+    output_tokens = estimate_tokens(''.join(parts))
+    return {
+        # Gemini rejects empty turns, so an unanswered prompt keeps a marker
+        'message': ''.join(parts) or '…',
+        'source': 'api' if parts else 'fallback',
+        'error': 'Client disconnected',
+        'prompt_tokens': prompt_tokens,
+        'output_tokens': output_tokens,
+        'tokens_used': prompt_tokens + output_tokens,
+    }
+
+
+# Anonymous and Basic auth callers have no session to forge, so the
+# middleware's check is skipped and SessionAuthentication applies it instead
+@csrf_exempt
+@require_POST
+async def chat_stream(request: HttpRequest) -> HttpResponse:
+    """
+    Streaming variant of the chat endpoint (requires ASGI)
+    
+    POST /api/ai_assistant/chat/stream/
+    Same body as chat/. Responds with text/event-stream:
+        event: session   data: {"session_id": ...}
+        data: {"delta": "..."}            (repeated as text arrives)
+        event: done      data: {"session_id", "source", "timestamp"}
+    The full reply is saved as a Conversation once the stream completes, or
+    whatever arrived if the client disconnects first.
+    Accepts the same authentication as chat/; session callers must send the
+    X-CSRFToken header.
+    """
+    try:
+        body = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON body'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        user = await sync_to_async(_authenticate)(request)
+    except APIException as e:
+        logger.warning(f"Streaming chat authentication failed: {e.detail}")
+        return JsonResponse({'error': str(e.detail)}, status=e.status_code)
+    user_message = str(body.get('message', '')).strip()
+    session_id = body.get('session_id')
+    wallet_address = request.headers.get('X-Wallet-Address', '').strip()
+    
+    if not user_message:
+        return JsonResponse({'error': 'Message cannot be empty'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    caller = caller_key(user, client_ip(request))
+    rejection = await sync_to_async(_check_limits)(caller)
+    if rejection:
+        body, code, headers = rejection
+        return JsonResponse(body, status=code, headers=headers)
+    
+    session = await sync_to_async(_resolve_session)(user, session_id, wallet_address)
+    if not session:
+        logger.warning(f"Session not found: {session_id}")
+        return JsonResponse({'error': 'Session not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    messages_for_api, user_data = await sync_to_async(_prepare_turn)(
+        user, session, user_message, wallet_address
+    )
+    
+    async def events():
+        parts = []
+        ai_response = None
+        try:
+            yield _sse({'session_id': session.session_id}, event='session')
+            async for chunk in ai_service.stream_response(messages_for_api, user_data):
+                if chunk['type'] == 'delta':
+                    parts.append(chunk['text'])
+                    yield _sse({'delta': chunk['text']})
+                else:
+                    ai_response = chunk
+        finally:
+            if ai_response is None:
+                # Disconnected (cancelled or closed): still save and bill the turn
+                logger.info(f"Client left stream for session {session.session_id} early")
+                await asyncio.shield(sync_to_async(_finish_turn)(
+                    user, session, _interrupted_response(parts, messages_for_api), caller
+                ))
+        
+        logger.info(f"AI stream source: {ai_response.get('source', 'unknown')}")
+        assistant_message = await sync_to_async(_finish_turn)(user, session, ai_response, caller)
+        yield _sse({
+            'session_id': session.session_id,
+            'source': ai_response.get('source', 'api'),
+            'timestamp': assistant_message.created_at.isoformat()
+        }, event='done')
+    
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @api_view(['GET'])
 def conversation_history(request, session_id):
     """
@@ -178,18 +340,59 @@ def conversation_history(request, session_id):
     })
 
 
+def _with_previews(sessions):
+    """Annotate sessions with their message count and latest message, as correlated subqueries"""
+    messages = Conversation.objects.filter(session_id=OuterRef('session_id'))
+    latest = messages.order_by('-created_at', '-id')
+    counts = messages.order_by().values('session_id').annotate(total=Count('id')).values('total')
+    return sessions.annotate(
+        message_total=Coalesce(Subquery(counts, output_field=IntegerField()), Value(0)),
+        last_message_content=Subquery(latest.annotate(preview=Substr('message', 1, 100)).values('preview')[:1]),
+        last_message_role=Subquery(latest.values('role')[:1]),
+        last_message_at=Subquery(latest.values('created_at')[:1]),
+    )
+
+
 @api_view(['GET'])
 def user_conversations(request):
     """
-    Get all user conversations
+    Get the caller's conversations, most recently active first
     
-    GET /api/ai/conversations/
+    GET /api/ai/conversations/?limit=20&cursor=<next_cursor>
     """
-    sessions = ConversationSession.objects.filter(user=request.user)
-    serializer = ConversationSerializer(sessions, many=True)
+    wallet_address = request.headers.get('X-Wallet-Address', '').strip()
+    if request.user.is_authenticated:
+        sessions = ConversationSession.objects.filter(user=request.user)
+    elif wallet_address:
+        sessions = ConversationSession.objects.filter(
+            user__isnull=True,
+            user_context__wallet_address=wallet_address
+        )
+    else:
+        return Response(
+            {'error': 'Wallet address or authentication required'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    
+    try:
+        limit = parse_page_size(request.query_params.get('limit'))
+        position = decode_cursor(request.query_params.get('cursor'))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    page = list(
+        _with_previews(keyset_filter(sessions, position, time_field='updated_at'))
+        .order_by('-updated_at', '-id')[:limit + 1]
+    )
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_cursor(page[-1].updated_at, page[-1].id)
     
+    serializer = ConversationSerializer(page, many=True)
     return Response({
-        'conversations': serializer.data
+        'conversations': serializer.data,
+        'next_cursor': next_cursor
     })
 
 
@@ -238,6 +441,123 @@ def explain_term(request):
     })
 
 
+def _glossary_limit(request: Request, default: int) -> int:
+    try:
+        return max(1, min(int(request.query_params.get('limit', default)), 25))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def glossary_search(request: Request) -> Response:
+    """
+    Ranked glossary search with prefix and typo-tolerant matching
+    
+    GET /api/ai_assistant/glossary/search/?q=stable&limit=10
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response(
+            {'error': 'q parameter is required'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        limit = _glossary_limit(request, 10)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'query': query,
+        'results': get_glossary_index().search(query, limit=limit)
+    })
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def glossary_autocomplete(request: Request) -> Response:
+    """
+    Glossary term names for a search box
+    
+    GET /api/ai_assistant/glossary/autocomplete/?q=li
+    """
+    try:
+        limit = _glossary_limit(request, 8)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'suggestions': get_glossary_index().autocomplete(request.query_params.get('q', ''), limit=limit)
+    })
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def trending_terms(request: Request) -> Response:
+    """
+    Most looked-up glossary terms recently, topped up with all-time favourites
+    
+    GET /api/ai_assistant/glossary/trending/?limit=10&window=60
+    """
+    try:
+        limit = _glossary_limit(request, 10)
+        window = int(request.query_params.get('window', PopularityBuffer.TRENDING_WINDOW_MINUTES))
+    except ValueError:
+        return Response(
+            {'error': 'limit and window must be integers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    terms = [
+        {'term': term, 'recent_hits': hits}
+        for term, hits in get_popularity_buffer().trending(limit=limit, window_minutes=max(window, 1))
+    ]
+    if len(terms) < limit:
+        seen = {item['term'] for item in terms}
+        popular = sorted(get_glossary_index().entries, key=lambda entry: -entry['popularity_score'])
+        terms += [
+            {'term': entry['term'], 'recent_hits': 0}
+            for entry in popular
+            if entry['term'] not in seen and entry['popularity_score'] > 0
+        ][:limit - len(terms)]
+    
+    return Response({
+        'window_minutes': min(max(window, 1), PopularityBuffer.TRENDING_WINDOW_MINUTES),
+        'terms': terms
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def response_cache_stats(request: Request) -> Response:
+    """
+    Hit-rate metrics for the assistant response cache in this process
+    
+    GET /api/ai_assistant/cache/stats/
+    """
+    return Response(get_response_cache().stats())
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def token_usage_report(request: Request) -> Response:
+    """
+    LLM token usage aggregated per day, optionally for one caller
+    
+    GET /api/ai_assistant/usage/daily/?days=7&caller=user:42
+    """
+    try:
+        days = int(request.query_params.get('days', 7))
+    except ValueError:
+        return Response({'error': 'days must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    caller = request.query_params.get('caller', '').strip() or None
+    return Response({
+        'days': usage_tracker.daily_report(days=days, caller=caller),
+        'daily_quota': usage_tracker.daily_quota
+    })
+
+
 @api_view(['GET'])
 def strategy_comparison(request):
     """
@@ -97,6 +97,31 @@ DATABASES = {
     }
 }
 
+# Cache
+# Rate limits, token quotas and config/prompt invalidation in ai_assistant
+# rely on a cache every worker shares. Set REDIS_URL in production; the
+# local-memory fallback is per process and only suits development.
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+REST_FRAMEWORK = {
+    # Reverse proxies in front of the app; client addresses are read from
+    # the X-Forwarded-For entries they add (e.g. NUM_PROXIES=1 behind one)
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+}
+
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
         'Bearer': {
@@ -0,0 +1,207 @@
+"""
+Declarative achievement rules and a set-based evaluator.
+
+Each rule describes who qualifies for an achievement as a queryset condition
+on ``User``. ``AchievementEngine.evaluate`` runs every rule over a batch of
+users in a single query per rule and awards new badges with
+``bulk_create(ignore_conflicts=True)`` against the ``(user, achievement_type)``
+unique constraint, instead of issuing count queries per event.
+"""
+import logging
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db.models import Count, Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import (
+    Achievement,
+    CommunityActivity,
+    GoalMilestone,
+    GoalProgress,
+    SavingsGoal,
+    UserProfile,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AchievementRule:
+    """An achievement and the queryset condition a user must satisfy to earn it"""
+
+    def __init__(self, achievement_type, title, description, condition, icon='trophy', annotations=None):
+        self.achievement_type = achievement_type
+        self.title = title
+        self.description = description
+        self.icon = icon
+        # Callables so time-relative conditions are built at evaluation time
+        self.condition = condition
+        self.annotations = annotations or (lambda: {})
+
+    def __repr__(self):
+        return f"<AchievementRule {self.achievement_type}>"
+
+    def qualifying(self, users):
+        """Narrow a User queryset to those who meet this rule"""
+        return users.annotate(**self.annotations()).filter(self.condition())
+
+
+RULES = [
+    AchievementRule(
+        'first_deposit',
+        'First Steps',
+        'Made your first deposit on Attestify!',
+        condition=lambda: Exists(GoalProgress.objects.filter(
+            goal__user=OuterRef('pk'),
+            source='deposit',
+            amount_added__gt=0
+        )),
+        icon='piggy-bank',
+    ),
+    AchievementRule(
+        'goal_setter',
+        'Goal Setter',
+        'Created your first savings goal.',
+        condition=lambda: Exists(SavingsGoal.objects.filter(user=OuterRef('pk'))),
+        icon='target',
+    ),
+    AchievementRule(
+        'milestone_reached',
+        'Milestone Reached',
+        'Reached a milestone on one of your goals.',
+        condition=lambda: Exists(GoalMilestone.objects.filter(
+            goal__user=OuterRef('pk'),
+            achieved_at__isnull=False
+        )),
+        icon='flag',
+    ),
+    AchievementRule(
+        'goal_completed',
+        'Goal Achiever',
+        'Completed a savings goal.',
+        condition=lambda: Exists(SavingsGoal.objects.filter(user=OuterRef('pk'), status='completed')),
+    ),
+    AchievementRule(
+        'yield_earner',
+        'Yield Earner',
+        'Earned your first yield on Attestify.',
+        condition=lambda: Exists(GoalProgress.objects.filter(
+            goal__user=OuterRef('pk'),
+            source='yield',
+            amount_added__gt=0
+        )),
+        icon='trending-up',
+    ),
+    AchievementRule(
+        'long_term_saver',
+        'Long Term Saver',
+        'Kept saving towards a goal for over 6 months.',
+        condition=lambda: Exists(GoalProgress.objects.filter(
+            goal__user=OuterRef('pk'),
+            goal__status__in=['active', 'completed'],
+            source='deposit',
+            created_at__lte=timezone.now() - timedelta(days=180)
+        )),
+        icon='calendar',
+    ),
+    AchievementRule(
+        'referral_master',
+        'Referral Master',
+        'Referred 10+ users to Attestify!',
+        annotations=lambda: {
+            'activated_referrals': Count(
+                'referrals_made',
+                filter=Q(referrals_made__status__in=['active', 'rewarded'])
+            ),
+        },
+        condition=lambda: Q(activated_referrals__gte=10),
+        icon='users',
+    ),
+]
+
+
+class AchievementEngine:
+    """Evaluates achievement rules for many users at once"""
+
+    BATCH_SIZE = 1000
+
+    def __init__(self, rules=None):
+        self.rules = {rule.achievement_type: rule for rule in (rules or RULES)}
+
+    def evaluate(self, user_ids=None, achievement_types=None, batch_size=None):
+        """
+        Award every achievement the given users (default: everyone) qualify
+        for and don't have yet. Returns ``{achievement_type: [user_id, ...]}``
+        of newly awarded badges.
+        """
+        batch_size = batch_size or self.BATCH_SIZE
+        rules = [self.rules[t] for t in achievement_types] if achievement_types else list(self.rules.values())
+
+        awarded = {rule.achievement_type: [] for rule in rules}
+        for batch in self._user_batches(user_ids, batch_size):
+            for rule in rules:
+                candidates = batch.exclude(achievements__achievement_type=rule.achievement_type)
+                new_user_ids = list(rule.qualifying(candidates).values_list('id', flat=True))
+                if new_user_ids:
+                    self._award(rule, new_user_ids)
+                    awarded[rule.achievement_type].extend(new_user_ids)
+        return awarded
+
+    def _user_batches(self, user_ids, batch_size):
+        """Yield User querysets covering the requested users in pk windows"""
+        if user_ids is not None:
+            user_ids = sorted(set(user_ids))
+            for start in range(0, len(user_ids), batch_size):
+                yield User.objects.filter(id__in=user_ids[start:start + batch_size])
+            return
+
+        last_id = User.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        for start in range(0, last_id, batch_size):
+            yield User.objects.filter(id__gt=start, id__lte=start + batch_size)
+
+    def _award(self, rule, user_ids):
+        Achievement.objects.bulk_create(
+            [
+                Achievement(
+                    user_id=user_id,
+                    achievement_type=rule.achievement_type,
+                    title=rule.title,
+                    description=rule.description,
+                    icon=rule.icon,
+                    is_public=True,
+                )
+                for user_id in user_ids
+            ],
+            ignore_conflicts=True
+        )
+        logger.info(f"Awarded {rule.achievement_type} to {len(user_ids)} user(s)")
+        self._announce(rule, user_ids)
+
+    def _announce(self, rule, user_ids):
+        """Post community activities for users who share their achievements"""
+        from .services import CommunityService
+
+        sharing = UserProfile.objects.filter(
+            user_id__in=user_ids,
+            is_public=True,
+            show_achievements=True
+        ).values_list('user_id', 'user__username')
+        achievement_ids = dict(
+            Achievement.objects.filter(
+                user_id__in=user_ids,
+                achievement_type=rule.achievement_type
+            ).values_list('user_id', 'id')
+        )
+        activities = CommunityActivity.objects.bulk_create([
+            CommunityActivity(
+                user_id=user_id,
+                activity_type='achievement_earned',
+                title=f"{username} earned: {rule.title}",
+                description=rule.description,
+                data={'achievement_id': achievement_ids.get(user_id)},
+                is_public=True,
+            )
+            for user_id, username in sharing
+        ])
+        for activity in activities:
+            CommunityService.publish_activity(activity)
@@ -16,6 +16,12 @@ from .models import (
     Achievement,
     CommunityActivity,
     UserFollow,
+    FeedEntry,
+    ActivityLike,
+    ActivityComment,
+    ActivityCounterShard,
+    LeaderboardEntry,
+    OutboxEvent,
 )
 
 
@@ -54,7 +60,7 @@ class SavingsGoalAdmin(admin.ModelAdmin):
 @admin.register(GoalMilestone)
 class GoalMilestoneAdmin(admin.ModelAdmin):
     list_display = ('id', 'goal', 'title', 'target_amount', 'is_achieved', 'order', 'created_at')
-    list_filter = ('is_achieved', 'created_at')
+    list_filter = ('achieved_at', 'created_at')
     search_fields = ('title', 'goal__title', 'goal__user__username')
     readonly_fields = ('achieved_at', 'is_achieved')
     list_per_page = 50
@@ -219,3 +225,55 @@ class UserFollowAdmin(admin.ModelAdmin):
     search_fields = ('follower__username', 'following__username')
     readonly_fields = ('created_at',)
     list_per_page = 50
+
+
+@admin.register(FeedEntry)
+class FeedEntryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'owner', 'activity', 'created_at')
+    search_fields = ('owner__username',)
+    raw_id_fields = ('owner', 'activity')
+    list_per_page = 50
+
+
+@admin.register(ActivityLike)
+class ActivityLikeAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'activity', 'created_at')
+    search_fields = ('user__username',)
+    raw_id_fields = ('user', 'activity')
+    readonly_fields = ('created_at',)
+    list_per_page = 50
+
+
+@admin.register(ActivityComment)
+class ActivityCommentAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'activity', 'body', 'created_at')
+    list_filter = ('created_at',)
+    search_fields = ('body', 'user__username')
+    raw_id_fields = ('user', 'activity')
+    readonly_fields = ('created_at',)
+    list_per_page = 50
+
+
+@admin.register(ActivityCounterShard)
+class ActivityCounterShardAdmin(admin.ModelAdmin):
+    list_display = ('activity', 'shard', 'likes_delta', 'comments_delta')
+    raw_id_fields = ('activity',)
+    list_per_page = 50
+
+
+@admin.register(LeaderboardEntry)
+class LeaderboardEntryAdmin(admin.ModelAdmin):
+    list_display = ('board', 'rank', 'user', 'score', 'refreshed_at')
+    list_filter = ('board',)
+    search_fields = ('user__username',)
+    raw_id_fields = ('user',)
+    readonly_fields = ('refreshed_at',)
+    list_per_page = 50
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'event_type', 'status', 'attempts', 'created_at', 'processed_at')
+    list_filter = ('status', 'event_type')
+    readonly_fields = ('created_at', 'processed_at')
+    list_per_page = 50
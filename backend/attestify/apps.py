@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class AttestifyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'attestify'
+
+    def ready(self):
+        # Register domain event handlers with the outbox consumer
+        from . import handlers  # noqa: F401
+        from . import signals  # noqa: F401
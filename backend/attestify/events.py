@@ -0,0 +1,164 @@
+"""
+Internal domain-event bus backed by a transactional outbox.
+
+Request handlers ``publish`` events, which only inserts an ``OutboxEvent``
+row inside the caller's transaction. A separate worker
+(``manage.py run_event_worker``) drains the outbox in batches and hands each
+batch to the handlers subscribed to that event type, so notifications,
+achievements, community activity and stats all happen off the request path.
+
+Delivery is at-least-once per handler: each handler's side effects and the
+record that it handled the batch's events (``OutboxEvent.handled_by``)
+commit in one savepoint. If a handler fails, its events are retried later
+and only the handlers that haven't run for them yet are called again.
+"""
+import logging
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+_handlers = defaultdict(list)
+
+
+class DomainEvent:
+    """Base class for events; subclasses declare ``event_type`` and ``fields``"""
+
+    event_type = None
+    fields = ()
+
+    def __init__(self, **payload):
+        missing = set(self.fields) - set(payload)
+        if missing:
+            raise TypeError(f"{type(self).__name__} missing fields: {', '.join(sorted(missing))}")
+        self.payload = payload
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.payload}>"
+
+
+class GoalCreated(DomainEvent):
+    event_type = 'goal_created'
+    fields = ('goal_id', 'user_id')
+
+
+class GoalProgressRecorded(DomainEvent):
+    event_type = 'goal_progress_recorded'
+    fields = ('goal_id', 'user_id', 'progress_id', 'amount_added', 'source', 'transaction_hash')
+
+
+class GoalCompleted(DomainEvent):
+    event_type = 'goal_completed'
+    fields = ('goal_id', 'user_id')
+
+
+class MilestoneReached(DomainEvent):
+    event_type = 'milestone_reached'
+    fields = ('goal_id', 'user_id', 'milestone_id')
+
+
+class ReferralActivated(DomainEvent):
+    event_type = 'referral_activated'
+    fields = ('referral_id', 'referrer_id')
+
+
+def subscribe(event_class):
+    """
+    Register a handler for an event type. Handlers receive a list of
+    payload dicts so they can do their work with set-based queries.
+    """
+    def register(handler):
+        _handlers[event_class.event_type].append(handler)
+        return handler
+    return register
+
+
+def handler_name(handler):
+    return f"{handler.__module__}.{handler.__qualname__}"
+
+
+def publish(*events):
+    """Record events in the outbox as part of the current transaction"""
+    OutboxEvent.objects.bulk_create([
+        OutboxEvent(event_type=event.event_type, payload=event.payload)
+        for event in events
+    ])
+
+
+class OutboxConsumer:
+    """Drains pending outbox events in batches and dispatches them to handlers"""
+
+    BATCH_SIZE = 200
+    MAX_ATTEMPTS = 5
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or self.BATCH_SIZE
+
+    def process_batch(self):
+        """Dispatch one batch of pending events; returns how many were claimed"""
+        with transaction.atomic():
+            events = list(
+                OutboxEvent.objects.select_for_update(skip_locked=True)
+                .filter(status='pending')
+                .order_by('id')[:self.batch_size]
+            )
+            if not events:
+                return 0
+
+            by_type = defaultdict(list)
+            for event in events:
+                by_type[event.event_type].append(event)
+
+            processed, failed = [], []
+            for event_type, batch in by_type.items():
+                errors = self._dispatch(event_type, batch)
+                if not errors:
+                    processed.extend(batch)
+                else:
+                    for event in batch:
+                        event.attempts += 1
+                        event.last_error = '; '.join(errors)
+                        event.status = 'failed' if event.attempts >= self.MAX_ATTEMPTS else 'pending'
+                    failed.extend(batch)
+
+            now = timezone.now()
+            for event in processed:
+                event.status = 'processed'
+                event.processed_at = now
+            OutboxEvent.objects.bulk_update(processed, ['status', 'processed_at'])
+            OutboxEvent.objects.bulk_update(failed, ['status', 'attempts', 'last_error'])
+        return len(events)
+
+    def _dispatch(self, event_type, events):
+        """Run each handler on the events it hasn't handled yet; returns error strings"""
+        errors = []
+        for handler in _handlers.get(event_type, []):
+            name = handler_name(handler)
+            todo = [event for event in events if name not in event.handled_by]
+            if not todo:
+                continue
+            try:
+                # The handler's side effects and the record that it ran share a
+                # savepoint: a failure leaves neither behind, a success both
+                with transaction.atomic():
+                    handler([event.payload for event in todo])
+                    for event in todo:
+                        event.handled_by = event.handled_by + [name]
+                    OutboxEvent.objects.bulk_update(todo, ['handled_by'])
+            except Exception as e:
+                logger.exception(f"Handler {handler.__qualname__} failed for {event_type}")
+                errors.append(f"{handler.__qualname__}: {e}")
+        return errors
+
+    def drain(self):
+        """Process batches until the outbox is empty; returns events handled"""
+        total = 0
+        while True:
+            claimed = self.process_batch()
+            if not claimed:
+                return total
+            total += claimed
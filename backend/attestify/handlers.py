@@ -0,0 +1,113 @@
+"""
+Domain event handlers, registered when the app is ready.
+
+Every handler receives a batch of event payloads from the outbox worker and
+loads what it needs with one query per batch.
+"""
+from decimal import Decimal
+
+from .achievements import AchievementEngine
+from .events import (
+    GoalCompleted,
+    GoalCreated,
+    GoalProgressRecorded,
+    MilestoneReached,
+    ReferralActivated,
+    subscribe,
+)
+from .models import GoalMilestone, Referral, SavingsGoal
+from .services import (
+    CommunityService,
+    NotificationService,
+    ProfileStatsMaterializer,
+)
+
+
+def _user_ids(payloads):
+    return {payload['user_id'] for payload in payloads}
+
+
+def _goals(payloads):
+    return SavingsGoal.objects.select_related('user').in_bulk({p['goal_id'] for p in payloads})
+
+
+@subscribe(GoalCreated)
+def announce_new_goals(payloads):
+    for goal in _goals(payloads).values():
+        CommunityService.create_goal_activity(goal, 'goal_created')
+
+
+@subscribe(GoalCreated)
+def award_goal_setter(payloads):
+    AchievementEngine().evaluate(user_ids=_user_ids(payloads), achievement_types=['goal_setter'])
+
+
+@subscribe(GoalProgressRecorded)
+def notify_deposits(payloads):
+    goals = _goals(payloads)
+    for payload in payloads:
+        goal = goals.get(payload['goal_id'])
+        if goal and payload['source'] == 'deposit':
+            NotificationService.notify_deposit_success(
+                goal.user,
+                goal.wallet_address,
+                Decimal(payload['amount_added']),
+                payload['transaction_hash']
+            )
+
+
+@subscribe(GoalProgressRecorded)
+def award_progress_achievements(payloads):
+    AchievementEngine().evaluate(
+        user_ids=_user_ids(payloads),
+        achievement_types=['first_deposit', 'yield_earner', 'long_term_saver']
+    )
+
+
+@subscribe(GoalProgressRecorded)
+def materialize_progress_stats(payloads):
+    ProfileStatsMaterializer.record_progress(
+        (payload['user_id'], payload['source'], payload['amount_added']) for payload in payloads
+    )
+
+
+@subscribe(GoalCompleted)
+def materialize_completed_goals(payloads):
+    ProfileStatsMaterializer.record_goals_completed(payload['user_id'] for payload in payloads)
+
+
+@subscribe(GoalCompleted)
+def celebrate_completed_goals(payloads):
+    for goal in _goals(payloads).values():
+        NotificationService.notify_goal_completed(goal)
+        CommunityService.create_goal_activity(goal, 'goal_completed')
+    AchievementEngine().evaluate(user_ids=_user_ids(payloads), achievement_types=['goal_completed'])
+
+
+@subscribe(MilestoneReached)
+def celebrate_milestones(payloads):
+    milestones = GoalMilestone.objects.select_related('goal__user').in_bulk(
+        {payload['milestone_id'] for payload in payloads}
+    )
+    for milestone in milestones.values():
+        NotificationService.notify_goal_milestone(milestone.goal, milestone)
+        CommunityService.create_goal_activity(milestone.goal, 'milestone_reached')
+    AchievementEngine().evaluate(user_ids=_user_ids(payloads), achievement_types=['milestone_reached'])
+
+
+@subscribe(ReferralActivated)
+def materialize_referrals(payloads):
+    ProfileStatsMaterializer.record_referrals(payload['referrer_id'] for payload in payloads)
+
+
+@subscribe(ReferralActivated)
+def notify_referrers(payloads):
+    referrals = Referral.objects.select_related('referrer').in_bulk(
+        {payload['referral_id'] for payload in payloads}
+    )
+    for referral in referrals.values():
+        NotificationService.notify_referral_activated(referral)
+    AchievementEngine().evaluate(
+        user_ids={payload['referrer_id'] for payload in payloads},
+        achievement_types=['referral_master']
+    )
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from attestify.achievements import RULES, AchievementEngine
+
+
+class Command(BaseCommand):
+    help = "Evaluate achievement rules for all (or selected) users and award new badges"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rule',
+            action='append',
+            choices=[rule.achievement_type for rule in RULES],
+            help='Achievement type to evaluate (repeatable; default: all rules)'
+        )
+        parser.add_argument(
+            '--user-id',
+            action='append',
+            type=int,
+            help='Restrict the sweep to these user ids (repeatable)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=AchievementEngine.BATCH_SIZE,
+            help='Number of users evaluated per query'
+        )
+
+    def handle(self, *args, **options):
+        awarded = AchievementEngine().evaluate(
+            user_ids=options['user_id'],
+            achievement_types=options['rule'],
+            batch_size=options['batch_size']
+        )
+        for achievement_type, user_ids in awarded.items():
+            self.stdout.write(f"{achievement_type}: {len(user_ids)} awarded")
+        total = sum(len(user_ids) for user_ids in awarded.values())
+        self.stdout.write(self.style.SUCCESS(f"Awarded {total} achievement(s)"))
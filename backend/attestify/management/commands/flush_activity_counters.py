@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from attestify.services import EngagementService
+
+
+class Command(BaseCommand):
+    help = "Fold sharded like/comment counter deltas into CommunityActivity counters"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=EngagementService.FLUSH_BATCH_SIZE,
+            help='Number of shard rows to drain per transaction'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Keep running, flushing every N seconds (default: flush once and exit)'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            flushed = EngagementService.flush_counters(batch_size=options['batch_size'])
+            self.stdout.write(f"Flushed counters for {flushed} activity update(s)")
+            if not interval:
+                break
+            time.sleep(interval)
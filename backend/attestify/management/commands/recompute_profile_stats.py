@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from attestify.services import ProfileStatsMaterializer
+
+
+class Command(BaseCommand):
+    help = "Rebuild UserProfile deposit/earning/referral/goal totals from grouped aggregates"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=ProfileStatsMaterializer.RECOMPUTE_BATCH_SIZE,
+            help='Number of profiles to update per bulk write'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted profiles without writing'
+        )
+
+    def handle(self, *args, **options):
+        fixed = ProfileStatsMaterializer.recompute(
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run']
+        )
+        verb = 'Would fix' if options['dry_run'] else 'Fixed'
+        self.stdout.write(self.style.SUCCESS(f"{verb} stats on {fixed} profile(s)"))
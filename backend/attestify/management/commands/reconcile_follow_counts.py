@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from attestify.models import UserFollow, UserProfile
+
+
+class Command(BaseCommand):
+    help = "Recompute UserProfile followers_count/following_count from the follow table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of profiles to update per bulk write'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted profiles without writing'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        # Two grouped queries replace one COUNT per profile
+        followers = dict(
+            UserFollow.objects.values_list('following_id').annotate(total=Count('id')).order_by()
+        )
+        following = dict(
+            UserFollow.objects.values_list('follower_id').annotate(total=Count('id')).order_by()
+        )
+
+        profiles = UserProfile.objects.only(
+            'id', 'user_id', 'followers_count', 'following_count'
+        ).order_by('pk')
+        fixed = 0
+        last_pk = 0
+        while True:
+            batch = list(profiles.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            drifted = []
+            for profile in batch:
+                expected = (followers.get(profile.user_id, 0), following.get(profile.user_id, 0))
+                if (profile.followers_count, profile.following_count) != expected:
+                    profile.followers_count, profile.following_count = expected
+                    drifted.append(profile)
+            if drifted and not dry_run:
+                UserProfile.objects.bulk_update(drifted, ['followers_count', 'following_count'])
+            fixed += len(drifted)
+
+        verb = 'Would fix' if dry_run else 'Fixed'
+        self.stdout.write(self.style.SUCCESS(f"{verb} follow counters on {fixed} profile(s)"))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from attestify.services import LeaderboardService
+
+
+class Command(BaseCommand):
+    help = "Recompute materialized leaderboard ranks"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--board',
+            action='append',
+            choices=sorted(LeaderboardService.BOARDS),
+            help='Board to refresh (repeatable; default: all boards)'
+        )
+
+    def handle(self, *args, **options):
+        for board in options['board'] or LeaderboardService.BOARDS:
+            ranked = LeaderboardService.refresh(board)
+            self.stdout.write(self.style.SUCCESS(f"Ranked {ranked} user(s) on '{board}'"))
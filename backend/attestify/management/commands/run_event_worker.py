@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from attestify.events import OutboxConsumer
+
+
+class Command(BaseCommand):
+    help = "Consume domain events from the outbox and run their handlers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=OutboxConsumer.BATCH_SIZE,
+            help='Maximum number of events claimed per batch'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait when the outbox is empty'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the outbox once and exit'
+        )
+
+    def handle(self, *args, **options):
+        consumer = OutboxConsumer(batch_size=options['batch_size'])
+        if options['once']:
+            handled = consumer.drain()
+            self.stdout.write(self.style.SUCCESS(f"Handled {handled} event(s)"))
+            return
+
+        self.stdout.write("Event worker started")
+        try:
+            while True:
+                if not consumer.process_batch():
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Event worker stopped")
@@ -0,0 +1,307 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:54
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferralProgram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_active', models.BooleanField(default=True)),
+                ('referrer_reward_percentage', models.DecimalField(decimal_places=2, default=5.0, help_text="Percentage of referred user's first deposit", max_digits=5, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)])),
+                ('referee_reward_amount', models.DecimalField(decimal_places=2, default=10.0, help_text='Fixed reward for new user (in cUSD)', max_digits=18)),
+                ('min_deposit_for_reward', models.DecimalField(decimal_places=2, default=50.0, help_text='Minimum deposit required for referral reward', max_digits=18)),
+                ('max_referrals_per_user', models.IntegerField(default=100, help_text='Maximum referrals per user')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Referral Program',
+                'verbose_name_plural': 'Referral Programs',
+            },
+        ),
+        migrations.CreateModel(
+            name='NotificationPreference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('wallet_address', models.CharField(db_index=True, max_length=42)),
+                ('email_enabled', models.BooleanField(default=True)),
+                ('email_goal_updates', models.BooleanField(default=True)),
+                ('email_deposits', models.BooleanField(default=True)),
+                ('email_withdrawals', models.BooleanField(default=True)),
+                ('email_yield_updates', models.BooleanField(default=True)),
+                ('email_referrals', models.BooleanField(default=True)),
+                ('email_announcements', models.BooleanField(default=True)),
+                ('email_security_alerts', models.BooleanField(default=True)),
+                ('in_app_enabled', models.BooleanField(default=True)),
+                ('in_app_goal_updates', models.BooleanField(default=True)),
+                ('in_app_transactions', models.BooleanField(default=True)),
+                ('in_app_referrals', models.BooleanField(default=True)),
+                ('in_app_announcements', models.BooleanField(default=True)),
+                ('email_frequency', models.CharField(choices=[('instant', 'Instant'), ('daily', 'Daily Digest'), ('weekly', 'Weekly Digest')], default='instant', max_length=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='notification_preferences', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Referral',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('referrer_wallet', models.CharField(db_index=True, max_length=42)),
+                ('referee_wallet', models.CharField(db_index=True, help_text='Wallet address of referred user', max_length=42)),
+                ('referral_code', models.CharField(db_index=True, help_text='Unique referral code', max_length=20, unique=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('active', 'Active'), ('rewarded', 'Rewarded'), ('expired', 'Expired')], default='pending', max_length=20)),
+                ('first_deposit_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=18, null=True)),
+                ('referrer_reward_amount', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('referee_reward_amount', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('referrer_reward_paid', models.BooleanField(default=False)),
+                ('referee_reward_paid', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('activated_at', models.DateTimeField(blank=True, null=True)),
+                ('rewarded_at', models.DateTimeField(blank=True, null=True)),
+                ('referee', models.ForeignKey(blank=True, help_text='User who was referred (null if not yet registered)', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='referral_received', to=settings.AUTH_USER_MODEL)),
+                ('referrer', models.ForeignKey(help_text='User who made the referral', on_delete=django.db.models.deletion.CASCADE, related_name='referrals_made', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReferralReward',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipient_wallet', models.CharField(max_length=42)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('reward_type', models.CharField(choices=[('referrer', 'Referrer Reward'), ('referee', 'Referee Bonus')], max_length=20)),
+                ('transaction_hash', models.CharField(blank=True, max_length=66)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('paid', 'Paid'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('paid_at', models.DateTimeField(blank=True, null=True)),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='referral_rewards', to=settings.AUTH_USER_MODEL)),
+                ('referral', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rewards', to='attestify.referral')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SavingsGoal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('wallet_address', models.CharField(db_index=True, help_text="User's wallet address", max_length=42)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('category', models.CharField(choices=[('emergency', 'Emergency Fund'), ('vacation', 'Vacation'), ('education', 'Education'), ('house', 'House/Property'), ('vehicle', 'Vehicle'), ('wedding', 'Wedding'), ('retirement', 'Retirement'), ('other', 'Other')], default='other', max_length=50)),
+                ('target_amount', models.DecimalField(decimal_places=2, help_text='Target amount in cUSD', max_digits=18, validators=[django.core.validators.MinValueValidator(1)])),
+                ('current_amount', models.DecimalField(decimal_places=2, default=0, help_text='Current saved amount', max_digits=18)),
+                ('target_date', models.DateField(blank=True, null=True)),
+                ('strategy', models.CharField(choices=[('conservative', 'Conservative'), ('balanced', 'Balanced'), ('growth', 'Growth')], default='balanced', max_length=20)),
+                ('status', models.CharField(choices=[('active', 'Active'), ('completed', 'Completed'), ('paused', 'Paused'), ('cancelled', 'Cancelled')], default='active', max_length=20)),
+                ('is_public', models.BooleanField(default=False, help_text='Allow sharing on community feed')),
+                ('color', models.CharField(default='#3B82F6', help_text='Hex color for UI display', max_length=7)),
+                ('icon', models.CharField(default='target', help_text='Icon identifier', max_length=50)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='savings_goals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='GoalProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount_added', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('previous_amount', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('new_amount', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('source', models.CharField(choices=[('deposit', 'Deposit'), ('yield', 'Yield Earnings'), ('manual', 'Manual Adjustment')], default='deposit', max_length=50)),
+                ('transaction_hash', models.CharField(blank=True, help_text='Blockchain transaction hash', max_length=66)),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('goal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_updates', to='attestify.savingsgoal')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='GoalMilestone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('target_amount', models.DecimalField(decimal_places=2, max_digits=18, validators=[django.core.validators.MinValueValidator(0)])),
+                ('achieved_at', models.DateTimeField(blank=True, null=True)),
+                ('order', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('goal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='milestones', to='attestify.savingsgoal')),
+            ],
+            options={
+                'ordering': ['order', 'target_amount'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserFollow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('follower', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='following', to=settings.AUTH_USER_MODEL)),
+                ('following', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='followers', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('wallet_address', models.CharField(db_index=True, max_length=42, unique=True)),
+                ('display_name', models.CharField(blank=True, help_text='Public display name', max_length=100)),
+                ('bio', models.TextField(blank=True, help_text='User bio for public profile', max_length=500)),
+                ('avatar_url', models.URLField(blank=True)),
+                ('is_public', models.BooleanField(default=False, help_text='Make profile visible to others')),
+                ('show_balance', models.BooleanField(default=False, help_text='Show balance on public profile')),
+                ('show_goals', models.BooleanField(default=False, help_text='Show goals on public profile')),
+                ('show_achievements', models.BooleanField(default=True, help_text='Show achievements on public profile')),
+                ('total_deposited', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_earned', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_referrals', models.IntegerField(default=0)),
+                ('total_goals_completed', models.IntegerField(default=0)),
+                ('followers_count', models.IntegerField(default=0)),
+                ('following_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='profile', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Achievement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('achievement_type', models.CharField(choices=[('first_deposit', 'First Deposit'), ('goal_completed', 'Goal Completed'), ('milestone_reached', 'Milestone Reached'), ('referral_master', 'Referral Master'), ('yield_earner', 'Yield Earner'), ('long_term_saver', 'Long Term Saver'), ('goal_setter', 'Goal Setter')], max_length=50)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('icon', models.CharField(default='trophy', max_length=50)),
+                ('data', models.JSONField(blank=True, default=dict, help_text='Achievement-specific data')),
+                ('is_public', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='achievements', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', 'achievement_type'], name='attestify_a_user_id_a51d3c_idx')],
+                'unique_together': {('user', 'achievement_type')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CommunityActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('activity_type', models.CharField(choices=[('goal_created', 'Goal Created'), ('goal_completed', 'Goal Completed'), ('milestone_reached', 'Milestone Reached'), ('achievement_earned', 'Achievement Earned')], max_length=50)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('is_public', models.BooleanField(default=True)),
+                ('likes_count', models.IntegerField(default=0)),
+                ('comments_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activities', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Community Activities',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['is_public', 'created_at'], name='attestify_c_is_publ_b875fd_idx'), models.Index(fields=['user', 'created_at'], name='attestify_c_user_id_b7f77f_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('wallet_address', models.CharField(db_index=True, max_length=42)),
+                ('notification_type', models.CharField(choices=[('goal_milestone', 'Goal Milestone'), ('goal_completed', 'Goal Completed'), ('deposit_success', 'Deposit Success'), ('withdrawal_success', 'Withdrawal Success'), ('yield_earned', 'Yield Earned'), ('referral_activated', 'Referral Activated'), ('referral_reward', 'Referral Reward'), ('system_announcement', 'System Announcement'), ('strategy_change', 'Strategy Change'), ('security_alert', 'Security Alert')], max_length=50)),
+                ('title', models.CharField(max_length=200)),
+                ('message', models.TextField()),
+                ('data', models.JSONField(blank=True, default=dict, help_text='Additional data for the notification')),
+                ('is_read', models.BooleanField(default=False)),
+                ('is_email_sent', models.BooleanField(default=False)),
+                ('action_url', models.URLField(blank=True, help_text='URL for action button')),
+                ('action_text', models.CharField(blank=True, max_length=50)),
+                ('priority', models.IntegerField(choices=[(1, 'Low'), (2, 'Normal'), (3, 'High'), (4, 'Urgent')], default=1)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('read_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', 'is_read', 'created_at'], name='attestify_n_user_id_a70d70_idx'), models.Index(fields=['wallet_address', 'is_read'], name='attestify_n_wallet__77b5b3_idx'), models.Index(fields=['notification_type', 'created_at'], name='attestify_n_notific_4d387e_idx')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='referral',
+            index=models.Index(fields=['referrer', 'status'], name='attestify_r_referre_71751b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='referral',
+            index=models.Index(fields=['referrer_wallet', 'status'], name='attestify_r_referre_b770fd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='referral',
+            index=models.Index(fields=['referral_code'], name='attestify_r_referra_862ec4_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='referral',
+            unique_together={('referrer', 'referee_wallet')},
+        ),
+        migrations.AddIndex(
+            model_name='referralreward',
+            index=models.Index(fields=['recipient', 'status'], name='attestify_r_recipie_3fe0b2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='referralreward',
+            index=models.Index(fields=['status', 'created_at'], name='attestify_r_status_6adebb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='savingsgoal',
+            index=models.Index(fields=['user', 'status'], name='attestify_s_user_id_26e592_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='savingsgoal',
+            index=models.Index(fields=['wallet_address', 'status'], name='attestify_s_wallet__092af1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goalprogress',
+            index=models.Index(fields=['goal', 'created_at'], name='attestify_g_goal_id_059ac6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userfollow',
+            index=models.Index(fields=['follower', 'created_at'], name='attestify_u_followe_7bd48a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userfollow',
+            index=models.Index(fields=['following', 'created_at'], name='attestify_u_followi_013c76_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='userfollow',
+            unique_together={('follower', 'following')},
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['wallet_address'], name='attestify_u_wallet__ae886a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['is_public', 'created_at'], name='attestify_u_is_publ_2a2431_idx'),
+        ),
+    ]
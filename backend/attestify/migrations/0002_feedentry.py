@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attestify', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(help_text='Copied from the activity so timelines page off a single index')),
+                ('activity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='attestify.communityactivity')),
+                ('owner', models.ForeignKey(help_text='User whose following timeline contains this entry', on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Feed Entries',
+                'ordering': ['-created_at', '-activity_id'],
+                'indexes': [models.Index(fields=['owner', '-created_at', '-activity'], name='attestify_f_owner_i_bc85cd_idx')],
+                'unique_together': {('owner', 'activity')},
+            },
+        ),
+    ]
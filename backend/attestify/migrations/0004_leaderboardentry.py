@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:58
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attestify', '0003_activity_engagement'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board', models.CharField(choices=[('deposited', 'Total Deposited'), ('earned', 'Total Earned'), ('referrals', 'Referrals'), ('goals', 'Goals Completed')], max_length=20)),
+                ('score', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('rank', models.PositiveIntegerField()),
+                ('refreshed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Leaderboard Entries',
+                'ordering': ['board', 'rank'],
+                'indexes': [models.Index(fields=['board', 'rank'], name='attestify_l_board_7ce5c2_idx'), models.Index(fields=['board', 'score'], name='attestify_l_board_3e2b75_idx')],
+                'unique_together': {('board', 'user')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attestify', '0005_outboxevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxevent',
+            name='handled_by',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
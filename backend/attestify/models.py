@@ -691,3 +691,176 @@ class UserFollow(models.Model):
     
     def __str__(self):
         return f"{self.follower.username} follows {self.following.username}"
+
+
+class FeedEntry(models.Model):
+    """Materialized follower timeline entry (fan-out-on-write inbox)"""
+    
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        help_text="User whose following timeline contains this entry"
+    )
+    activity = models.ForeignKey(
+        CommunityActivity,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    created_at = models.DateTimeField(
+        help_text="Copied from the activity so timelines page off a single index"
+    )
+    
+    class Meta:
+        ordering = ['-created_at', '-activity_id']
+        verbose_name_plural = "Feed Entries"
+        unique_together = [['owner', 'activity']]
+        indexes = [
+            models.Index(fields=['owner', '-created_at', '-activity']),
+        ]
+    
+    def __str__(self):
+        return f"{self.owner.username} ← activity {self.activity_id}"
+
+
+class ActivityLike(models.Model):
+    """A user's like on a community activity"""
+    
+    activity = models.ForeignKey(
+        CommunityActivity,
+        on_delete=models.CASCADE,
+        related_name='likes'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='activity_likes'
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-created_at']
+        unique_together = [['activity', 'user']]
+    
+    def __str__(self):
+        return f"{self.user.username} likes activity {self.activity_id}"
+
+
+class ActivityComment(models.Model):
+    """A comment on a community activity"""
+    
+    activity = models.ForeignKey(
+        CommunityActivity,
+        on_delete=models.CASCADE,
+        related_name='comments'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='activity_comments'
+    )
+    body = models.TextField(max_length=1000)
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['activity', '-created_at', '-id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} on activity {self.activity_id}: {self.body[:50]}"
+
+
+class ActivityCounterShard(models.Model):
+    """
+    Pending like/comment count deltas for an activity.
+    
+    Writes land on one of several shards per activity so concurrent likes
+    don't contend on the activity row; shards are periodically folded into
+    ``CommunityActivity.likes_count``/``comments_count``.
+    """
+    
+    activity = models.ForeignKey(
+        CommunityActivity,
+        on_delete=models.CASCADE,
+        related_name='counter_shards'
+    )
+    shard = models.PositiveSmallIntegerField()
+    likes_delta = models.IntegerField(default=0)
+    comments_delta = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = [['activity', 'shard']]
+    
+    def __str__(self):
+        return f"Activity {self.activity_id} shard {self.shard}: {self.likes_delta:+} likes, {self.comments_delta:+} comments"
+
+
+class LeaderboardEntry(models.Model):
+    """Materialized leaderboard rank, rebuilt periodically per board"""
+    
+    BOARD_CHOICES = [
+        ('deposited', 'Total Deposited'),
+        ('earned', 'Total Earned'),
+        ('referrals', 'Referrals'),
+        ('goals', 'Goals Completed'),
+    ]
+    
+    board = models.CharField(max_length=20, choices=BOARD_CHOICES)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='leaderboard_entries'
+    )
+    score = models.DecimalField(
+        max_digits=18,
+        decimal_places=2
+    )
+    rank = models.PositiveIntegerField()
+    refreshed_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['board', 'rank']
+        verbose_name_plural = "Leaderboard Entries"
+        unique_together = [['board', 'user']]
+        indexes = [
+            models.Index(fields=['board', 'rank']),
+            models.Index(fields=['board', 'score']),
+        ]
+    
+    def __str__(self):
+        return f"{self.board} #{self.rank}: {self.user.username} ({self.score})"
+
+
+# ============================================================================
+# DOMAIN EVENTS
+# ============================================================================
+
+class OutboxEvent(models.Model):
+    """Domain event recorded in the request transaction, consumed off-thread"""
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processed', 'Processed'),
+        ('failed', 'Failed'),
+    ]
+    
+    event_type = models.CharField(max_length=50, db_index=True)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # Handlers that have already run for this event, so retries skip them
+    handled_by = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.event_type} #{self.id} ({self.status})"
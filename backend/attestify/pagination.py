@@ -0,0 +1,57 @@
+"""
+Keyset (cursor) pagination helpers for feed-style endpoints.
+
+Cursors encode the ``(created_at, id)`` of the last row on a page so the next
+page is a simple indexed range scan instead of an OFFSET over the whole table.
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client supplies a malformed cursor"""
+
+
+def encode_cursor(created_at, pk):
+    """Encode a ``(created_at, id)`` position as an opaque URL-safe token"""
+    raw = f"{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor token back into a ``(created_at, id)`` tuple"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, pk = base64.urlsafe_b64decode(padded.encode()).decode().rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Parse a ``limit`` query param, clamping it to ``[1, maximum]``"""
+    if value in (None, ''):
+        return default
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    return max(1, min(size, maximum))
+
+
+def keyset_filter(queryset, position, time_field='created_at', id_field='id'):
+    """Restrict a newest-first queryset to rows strictly after ``position``"""
+    if position is None:
+        return queryset
+    created_at, pk = position
+    return queryset.filter(
+        Q(**{f'{time_field}__lt': created_at})
+        | Q(**{time_field: created_at, f'{id_field}__lt': pk})
+    )
@@ -13,6 +13,7 @@ from .models import (
     Achievement,
     CommunityActivity,
     UserFollow,
+    ActivityComment,
 )
 
 
@@ -174,3 +175,13 @@ class UserFollowSerializer(serializers.ModelSerializer):
                  'created_at']
         read_only_fields = ['follower', 'created_at']
 
+
+
+class ActivityCommentSerializer(serializers.ModelSerializer):
+    user_username = serializers.CharField(source='user.username', read_only=True)
+    user_display_name = serializers.CharField(source='user.profile.display_name', read_only=True, allow_null=True)
+    
+    class Meta:
+        model = ActivityComment
+        fields = ['id', 'activity', 'user', 'user_username', 'user_display_name', 'body', 'created_at']
+        read_only_fields = ['activity', 'user', 'created_at']
@@ -2,17 +2,34 @@
 Services for Attestify features - notification sending, achievement checking, etc.
 """
 import logging
+import random
+from decimal import Decimal
+from collections import defaultdict
+from heapq import merge
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
 from django.utils import timezone
 from django.contrib.auth.models import User
 from .models import (
     Notification,
     NotificationPreference,
-    Achievement,
     CommunityActivity,
     SavingsGoal,
+    GoalProgress,
     UserProfile,
     Referral,
+    UserFollow,
+    FeedEntry,
+    ActivityLike,
+    ActivityComment,
+    ActivityCounterShard,
+    LeaderboardEntry,
 )
+from .achievements import AchievementEngine
+from .pagination import encode_cursor, keyset_filter
+from .signals import profile_stats_changed
 
 logger = logging.getLogger(__name__)
 
@@ -126,90 +143,24 @@ class AchievementService:
     """Service for checking and awarding achievements"""
     
     @staticmethod
-    def check_and_award_achievement(user, achievement_type, title, description, data=None):
-        """Check if achievement exists, if not create it"""
-        try:
-            achievement, created = Achievement.objects.get_or_create(
-                user=user,
-                achievement_type=achievement_type,
-                defaults={
-                    'title': title,
-                    'description': description,
-                    'data': data or {},
-                    'is_public': True
-                }
-            )
-            
-            if created:
-                # Create community activity
-                try:
-                    profile = UserProfile.objects.get(user=user)
-                    if profile.is_public and profile.show_achievements:
-                        CommunityActivity.objects.create(
-                            user=user,
-                            activity_type='achievement_earned',
-                            title=f"{user.username} earned: {title}",
-                            description=description,
-                            data={'achievement_id': achievement.id},
-                            is_public=True
-                        )
-                except UserProfile.DoesNotExist:
-                    pass
-            
-            return achievement
-        except Exception as e:
-            logger.error(f"Error awarding achievement: {str(e)}")
-            return None
+    def evaluate_user(user, achievement_types=None):
+        """Run the declarative achievement rules for a single user"""
+        return AchievementEngine().evaluate(user_ids=[user.id], achievement_types=achievement_types)
     
     @staticmethod
     def check_first_deposit(user, wallet_address):
         """Check if this is user's first deposit"""
-        from .models import GoalProgress
-        progress_count = GoalProgress.objects.filter(
-            goal__user=user,
-            goal__wallet_address=wallet_address
-        ).count()
-        
-        if progress_count == 1:  # First deposit
-            AchievementService.check_and_award_achievement(
-                user=user,
-                achievement_type='first_deposit',
-                title='First Steps',
-                description='Made your first deposit on Attestify!',
-                data={'wallet_address': wallet_address}
-            )
+        AchievementService.evaluate_user(user, achievement_types=['first_deposit'])
     
     @staticmethod
-    def check_goal_completed(user, goal):
+    def check_goal_completed(user, goal=None):
         """Check achievements when goal is completed"""
-        # Goal completed achievement
-        AchievementService.check_and_award_achievement(
-            user=user,
-            achievement_type='goal_completed',
-            title='Goal Achiever',
-            description=f'Completed your goal: {goal.title}',
-            data={'goal_id': goal.id, 'target_amount': str(goal.target_amount)}
-        )
-        
-        # Update profile stats
-        try:
-            profile = UserProfile.objects.get(user=user)
-            profile.total_goals_completed += 1
-            profile.save()
-        except UserProfile.DoesNotExist:
-            pass
+        AchievementService.evaluate_user(user, achievement_types=['goal_completed'])
     
     @staticmethod
-    def check_referral_milestones(user, referral_count):
-        """Check referral-based achievements"""
-        if referral_count >= 10:
-            AchievementService.check_and_award_achievement(
-                user=user,
-                achievement_type='referral_master',
-                title='Referral Master',
-                description='Referred 10+ users to Attestify!',
-                data={'referral_count': referral_count}
-            )
+    def check_referral_milestones(user, referral_count=None):
+        """Check referral-based achievements (the rule counts activated referrals itself)"""
+        AchievementService.evaluate_user(user, achievement_types=['referral_master'])
 
 
 class CommunityService:
@@ -234,7 +185,7 @@ class CommunityService:
             'milestone_reached': f"{goal.user.username} reached a milestone in {goal.title}",
         }
         
-        CommunityActivity.objects.create(
+        activity = CommunityActivity.objects.create(
             user=goal.user,
             activity_type=activity_type,
             title=title_map.get(activity_type, goal.title),
@@ -242,4 +193,566 @@ class CommunityService:
             data={'goal_id': goal.id, 'category': goal.category},
             is_public=True
         )
+        CommunityService.publish_activity(activity)
+    
+    GLOBAL_FEED_CACHE_TTL = getattr(settings, 'COMMUNITY_FEED_CACHE_TTL', 30)
+    GLOBAL_FEED_VERSION_KEY = 'community_feed:version'
+    
+    @staticmethod
+    def publish_activity(activity):
+        """Distribute a newly created activity to timelines and the global feed"""
+        TimelineService.fan_out_activity(activity)
+        if activity.is_public:
+            CommunityService.invalidate_global_feed()
+    
+    @classmethod
+    def invalidate_global_feed(cls):
+        """Retire every cached global feed page by bumping the key version"""
+        try:
+            cache.incr(cls.GLOBAL_FEED_VERSION_KEY)
+        except ValueError:
+            cache.set(cls.GLOBAL_FEED_VERSION_KEY, 1, None)
+    
+    @classmethod
+    def global_feed_cache_key(cls, activity_type, cursor, limit):
+        """Cache key for one rendered page of the public global feed"""
+        version = cache.get_or_set(cls.GLOBAL_FEED_VERSION_KEY, 1, None)
+        return f"community_feed:v{version}:{activity_type or 'all'}:{limit}:{cursor or ''}"
+    
+    @staticmethod
+    def get_global_feed(activity_type=None, position=None, limit=20):
+        """
+        Return ``(activities, next_cursor)`` for the public feed using a single
+        joined query, newest first, starting after the given position.
+        """
+        activities = CommunityActivity.objects.filter(is_public=True)
+        if activity_type:
+            activities = activities.filter(activity_type=activity_type)
+        
+        page = list(
+            keyset_filter(activities, position)
+            .select_related('user', 'user__profile')
+            .order_by('-created_at', '-id')[:limit + 1]
+        )
+        has_more = len(page) > limit
+        page = page[:limit]
+        next_cursor = encode_cursor(page[-1].created_at, page[-1].id) if has_more else None
+        return page, next_cursor
+
+
+class TimelineService:
+    """
+    Hybrid fan-out follower timelines.
+    
+    Activities from regular users are pushed into each follower's
+    ``FeedEntry`` inbox when they are created (fan-out-on-write). Accounts
+    above ``FEED_FANOUT_FOLLOWER_THRESHOLD`` followers are skipped on write and
+    their recent activities are pulled in at read time instead
+    (fan-out-on-read), so a single post never writes millions of rows.
+    """
+    
+    DEFAULT_FANOUT_FOLLOWER_THRESHOLD = 1000
+    FANOUT_BATCH_SIZE = 1000
+    BACKFILL_LIMIT = 50
+    
+    @classmethod
+    def fanout_follower_threshold(cls):
+        """Follower count above which an author is pulled on read (read per call)"""
+        return getattr(settings, 'FEED_FANOUT_FOLLOWER_THRESHOLD', cls.DEFAULT_FANOUT_FOLLOWER_THRESHOLD)
+    
+    @classmethod
+    def is_high_fanout(cls, user_id):
+        """Whether a user's activities are pulled on read instead of pushed"""
+        return UserProfile.objects.filter(
+            user_id=user_id,
+            followers_count__gt=cls.fanout_follower_threshold()
+        ).exists()
+    
+    @classmethod
+    def fan_out_activity(cls, activity):
+        """Push a public activity into the author's and followers' timelines"""
+        if not activity.is_public:
+            return 0
+        
+        entries = [FeedEntry(owner_id=activity.user_id, activity=activity, created_at=activity.created_at)]
+        if cls.is_high_fanout(activity.user_id):
+            FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+            return 1
+        
+        follower_ids = UserFollow.objects.filter(
+            following_id=activity.user_id
+        ).values_list('follower_id', flat=True)
+        
+        written = 0
+        for follower_id in follower_ids.iterator(chunk_size=cls.FANOUT_BATCH_SIZE):
+            entries.append(FeedEntry(owner_id=follower_id, activity=activity, created_at=activity.created_at))
+            if len(entries) >= cls.FANOUT_BATCH_SIZE:
+                FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+                written += len(entries)
+                entries = []
+        if entries:
+            FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+            written += len(entries)
+        return written
+    
+    @classmethod
+    def backfill_followee(cls, follower, following):
+        """Seed a new follower's timeline with the followee's recent activities"""
+        if cls.is_high_fanout(following.pk):
+            return 0
+        recent = CommunityActivity.objects.filter(
+            user=following,
+            is_public=True
+        ).order_by('-created_at', '-id').values_list('id', 'created_at')[:cls.BACKFILL_LIMIT]
+        entries = [
+            FeedEntry(owner=follower, activity_id=activity_id, created_at=created_at)
+            for activity_id, created_at in recent
+        ]
+        FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+        return len(entries)
+    
+    @staticmethod
+    def remove_followee(follower, following):
+        """Drop an unfollowed user's activities from the follower's timeline"""
+        deleted, _ = FeedEntry.objects.filter(owner=follower, activity__user=following).delete()
+        return deleted
+    
+    @classmethod
+    def get_timeline(cls, user, position=None, limit=20):
+        """
+        Return ``(activities, next_cursor)`` for a user's following timeline,
+        newest first, starting after the ``(created_at, id)`` position.
+        """
+        inbox = keyset_filter(
+            FeedEntry.objects.filter(owner=user),
+            position,
+            id_field='activity_id'
+        ).order_by('-created_at', '-activity_id').values_list('created_at', 'activity_id')[:limit + 1]
+        
+        # High-follower followees are few per user, so this IN list stays small
+        pulled_from = UserFollow.objects.filter(
+            follower=user,
+            following__profile__followers_count__gt=cls.fanout_follower_threshold()
+        ).values_list('following_id', flat=True)
+        pulled = keyset_filter(
+            CommunityActivity.objects.filter(user_id__in=list(pulled_from), is_public=True),
+            position
+        ).order_by('-created_at', '-id').values_list('created_at', 'id')[:limit + 1]
+        
+        keys = []
+        seen = set()
+        for key in merge(list(inbox), list(pulled), reverse=True):
+            if key[1] not in seen:
+                seen.add(key[1])
+                keys.append(key)
+            if len(keys) > limit:
+                break
+        
+        has_more = len(keys) > limit
+        keys = keys[:limit]
+        by_id = CommunityActivity.objects.select_related('user', 'user__profile').in_bulk(
+            [activity_id for _, activity_id in keys]
+        )
+        activities = [by_id[activity_id] for _, activity_id in keys if activity_id in by_id]
+        
+        next_cursor = encode_cursor(*keys[-1]) if has_more and keys else None
+        return activities, next_cursor
+
 
+
+class FollowService:
+    """
+    Follow graph writes.
+    
+    Each follow/unfollow changes the ``UserFollow`` row and both denormalized
+    ``UserProfile`` counters in one transaction using F() expressions, so
+    profile reads never need a COUNT over the follow table.
+    """
+    
+    @staticmethod
+    def follow(follower, following):
+        """Follow a user; returns False if the relationship already existed"""
+        if follower.pk == following.pk:
+            raise ValueError("You cannot follow yourself")
+        
+        with transaction.atomic():
+            _, created = UserFollow.objects.get_or_create(follower=follower, following=following)
+            if not created:
+                return False
+            UserProfile.objects.filter(user=follower).update(following_count=F('following_count') + 1)
+            UserProfile.objects.filter(user=following).update(followers_count=F('followers_count') + 1)
+        
+        TimelineService.backfill_followee(follower, following)
+        return True
+    
+    @staticmethod
+    def unfollow(follower, following):
+        """Unfollow a user; returns False if there was nothing to remove"""
+        with transaction.atomic():
+            deleted, _ = UserFollow.objects.filter(follower=follower, following=following).delete()
+            if not deleted:
+                return False
+            UserProfile.objects.filter(user=follower, following_count__gt=0).update(
+                following_count=F('following_count') - 1
+            )
+            UserProfile.objects.filter(user=following, followers_count__gt=0).update(
+                followers_count=F('followers_count') - 1
+            )
+        
+        TimelineService.remove_followee(follower, following)
+        return True
+
+
+class EngagementService:
+    """
+    Likes and comments on community activities.
+    
+    Counter changes are written to one of ``COUNTER_SHARDS`` randomly chosen
+    ``ActivityCounterShard`` rows instead of the activity itself, and
+    ``flush_counters`` periodically folds them into
+    ``CommunityActivity.likes_count``/``comments_count``. A viral activity
+    therefore spreads its writes over many rows and the activity row is
+    touched once per flush rather than once per like.
+    """
+    
+    COUNTER_SHARDS = getattr(settings, 'ACTIVITY_COUNTER_SHARDS', 16)
+    FLUSH_BATCH_SIZE = 500
+    
+    @classmethod
+    def _bump(cls, activity_id, likes=0, comments=0):
+        """Add deltas to a random counter shard, creating it on first use"""
+        shard = random.randrange(cls.COUNTER_SHARDS)
+        shards = ActivityCounterShard.objects.filter(activity_id=activity_id, shard=shard)
+        changes = {
+            'likes_delta': F('likes_delta') + likes,
+            'comments_delta': F('comments_delta') + comments,
+        }
+        if not shards.update(**changes):
+            ActivityCounterShard.objects.bulk_create(
+                [ActivityCounterShard(activity_id=activity_id, shard=shard)],
+                ignore_conflicts=True
+            )
+            shards.update(**changes)
+    
+    @classmethod
+    def like(cls, user, activity):
+        """Like an activity; returns False if it was already liked"""
+        with transaction.atomic():
+            _, created = ActivityLike.objects.get_or_create(activity=activity, user=user)
+            if created:
+                cls._bump(activity.id, likes=1)
+        return created
+    
+    @classmethod
+    def unlike(cls, user, activity):
+        """Remove a like; returns False if there was none"""
+        with transaction.atomic():
+            deleted, _ = ActivityLike.objects.filter(activity=activity, user=user).delete()
+            if deleted:
+                cls._bump(activity.id, likes=-1)
+        return bool(deleted)
+    
+    @classmethod
+    def add_comment(cls, user, activity, body):
+        """Create a comment and count it"""
+        with transaction.atomic():
+            comment = ActivityComment.objects.create(activity=activity, user=user, body=body)
+            cls._bump(activity.id, comments=1)
+        return comment
+    
+    @staticmethod
+    def get_counts(activity):
+        """Current like/comment counts including deltas not yet flushed"""
+        pending = ActivityCounterShard.objects.filter(activity=activity).aggregate(
+            likes=Sum('likes_delta'),
+            comments=Sum('comments_delta')
+        )
+        return {
+            'likes_count': activity.likes_count + (pending['likes'] or 0),
+            'comments_count': activity.comments_count + (pending['comments'] or 0),
+        }
+    
+    @classmethod
+    def flush_counters(cls, batch_size=None):
+        """
+        Fold pending shard deltas into the activity counters.
+        
+        Shards are drained by subtracting exactly the amounts that were
+        read, so increments landing mid-flush are kept for the next run.
+        Returns the number of activity row updates issued.
+        """
+        batch_size = batch_size or cls.FLUSH_BATCH_SIZE
+        pending = ActivityCounterShard.objects.exclude(likes_delta=0, comments_delta=0).order_by('id')
+        
+        flushed = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                shards = list(
+                    pending.filter(id__gt=last_id)
+                    .values_list('id', 'activity_id', 'likes_delta', 'comments_delta')[:batch_size]
+                )
+                if not shards:
+                    break
+                last_id = shards[-1][0]
+                
+                totals = defaultdict(lambda: [0, 0])
+                for _, activity_id, likes, comments in shards:
+                    totals[activity_id][0] += likes
+                    totals[activity_id][1] += comments
+                
+                for activity_id, (likes, comments) in totals.items():
+                    CommunityActivity.objects.filter(id=activity_id).update(
+                        likes_count=F('likes_count') + likes,
+                        comments_count=F('comments_count') + comments
+                    )
+                for shard_id, _, likes, comments in shards:
+                    ActivityCounterShard.objects.filter(id=shard_id).update(
+                        likes_delta=F('likes_delta') - likes,
+                        comments_delta=F('comments_delta') - comments
+                    )
+            flushed += len(totals)
+        
+        return flushed
+
+
+class LeaderboardService:
+    """
+    Materialized leaderboards over ``UserProfile`` statistics.
+    
+    ``refresh`` periodically rewrites ``LeaderboardEntry`` ranks for a board
+    and caches the rendered top N, so reading the top of a board never sorts
+    profiles. "My rank" compares the caller's live score against the
+    snapshot with a single indexed COUNT on ``(board, score)``.
+    
+    Only public profiles are ranked, and balance boards additionally
+    require ``show_balance``.
+    """
+    
+    BOARDS = {
+        'deposited': {'field': 'total_deposited', 'requires_balance': True},
+        'earned': {'field': 'total_earned', 'requires_balance': True},
+        'referrals': {'field': 'total_referrals', 'requires_balance': False},
+        'goals': {'field': 'total_goals_completed', 'requires_balance': False},
+    }
+    TOP_N = 100
+    TOP_CACHE_TTL = getattr(settings, 'LEADERBOARD_CACHE_TTL', 300)
+    REFRESH_BATCH_SIZE = 5000
+    
+    @staticmethod
+    def _cache_key(board):
+        return f"leaderboard:{board}:top"
+    
+    @classmethod
+    def eligible_profiles(cls, board):
+        """Profiles that may appear on a board"""
+        config = cls.BOARDS[board]
+        profiles = UserProfile.objects.filter(is_public=True)
+        if config['requires_balance']:
+            profiles = profiles.filter(show_balance=True)
+        return profiles
+    
+    @classmethod
+    def refresh(cls, board):
+        """Recompute every rank on a board; returns the number of ranked users"""
+        field = cls.BOARDS[board]['field']
+        scored = cls.eligible_profiles(board).filter(**{f'{field}__gt': 0}).order_by(
+            f'-{field}', 'user_id'
+        ).values_list('user_id', field)
+        
+        refreshed_at = timezone.now()
+        ranked = 0
+        rank = 0
+        previous_score = None
+        with transaction.atomic():
+            LeaderboardEntry.objects.filter(board=board).delete()
+            batch = []
+            for user_id, score in scored.iterator(chunk_size=cls.REFRESH_BATCH_SIZE):
+                ranked += 1
+                if score != previous_score:
+                    # Standard competition ranking: ties share a rank (1, 2, 2, 4)
+                    rank = ranked
+                    previous_score = score
+                batch.append(LeaderboardEntry(
+                    board=board,
+                    user_id=user_id,
+                    score=score,
+                    rank=rank,
+                    refreshed_at=refreshed_at
+                ))
+                if len(batch) >= cls.REFRESH_BATCH_SIZE:
+                    LeaderboardEntry.objects.bulk_create(batch)
+                    batch = []
+            LeaderboardEntry.objects.bulk_create(batch)
+        
+        cache.delete(cls._cache_key(board))
+        cls.get_top(board)
+        return ranked
+    
+    @classmethod
+    def invalidate_top(cls, boards=None):
+        """Drop the cached top N so the next read rebuilds it"""
+        cache.delete_many([cls._cache_key(board) for board in boards or cls.BOARDS])
+    
+    @classmethod
+    def get_top(cls, board, limit=None):
+        """Top of a board, served from cache after the first read"""
+        limit = min(limit or cls.TOP_N, cls.TOP_N)
+        top = cache.get(cls._cache_key(board))
+        if top is None:
+            # Profiles made private since the last refresh drop out straight away
+            ranked = LeaderboardEntry.objects.filter(
+                board=board,
+                user_id__in=cls.eligible_profiles(board).values('user_id')
+            )
+            entries = ranked.select_related('user', 'user__profile').order_by('rank', 'user_id')[:cls.TOP_N]
+            top = {
+                'board': board,
+                'refreshed_at': None,
+                'total_ranked': ranked.count(),
+                'entries': [],
+            }
+            for entry in entries:
+                try:
+                    profile = entry.user.profile
+                except UserProfile.DoesNotExist:
+                    continue
+                top['refreshed_at'] = entry.refreshed_at.isoformat()
+                top['entries'].append({
+                    'rank': entry.rank,
+                    'username': entry.user.username,
+                    'display_name': profile.display_name,
+                    'avatar_url': profile.avatar_url,
+                    'wallet_address': profile.wallet_address,
+                    'score': str(entry.score),
+                })
+            cache.set(cls._cache_key(board), top, cls.TOP_CACHE_TTL)
+        return {**top, 'entries': top['entries'][:limit]}
+    
+    @classmethod
+    def get_rank(cls, board, user):
+        """
+        The user's rank for their live score, or None if they are not
+        eligible for the board.
+        """
+        field = cls.BOARDS[board]['field']
+        score = cls.eligible_profiles(board).filter(user=user).values_list(field, flat=True).first()
+        if score is None:
+            return None
+        
+        ahead = LeaderboardEntry.objects.filter(
+            board=board,
+            score__gt=score
+        ).exclude(user=user).count()
+        return {'board': board, 'rank': ahead + 1, 'score': str(score)}
+
+
+class ProfileStatsMaterializer:
+    """
+    Keeps the ``UserProfile`` statistics columns up to date.
+    
+    Event handlers apply per-batch deltas with F() expressions, so profile
+    pages read precomputed totals instead of aggregating on every request.
+    The outbox records each event as handled in the same savepoint as the
+    deltas, so a retried batch never applies an event twice. ``recompute``
+    rebuilds every total from grouped aggregate queries to repair drift
+    (e.g. from rows changed outside the event bus).
+    """
+    
+    REFERRAL_COUNTED_STATUSES = ('active', 'rewarded')
+    RECOMPUTE_BATCH_SIZE = 1000
+    STAT_FIELDS = ['total_deposited', 'total_earned', 'total_referrals', 'total_goals_completed']
+    
+    @staticmethod
+    def _apply(deltas):
+        """Apply ``{user_id: {field: delta}}`` with one UPDATE per user"""
+        touched = []
+        for user_id, changes in deltas.items():
+            changes = {field: F(field) + delta for field, delta in changes.items() if delta}
+            if changes:
+                UserProfile.objects.filter(user_id=user_id).update(**changes)
+                touched.append(user_id)
+        if touched:
+            profile_stats_changed.send(sender=UserProfile, user_ids=touched)
+    
+    @classmethod
+    def record_progress(cls, progress_entries):
+        """Add deposits and yield from ``(user_id, source, amount)`` tuples"""
+        deltas = defaultdict(lambda: defaultdict(Decimal))
+        for user_id, source, amount in progress_entries:
+            if source == 'deposit':
+                deltas[user_id]['total_deposited'] += Decimal(amount)
+            elif source == 'yield':
+                deltas[user_id]['total_earned'] += Decimal(amount)
+        cls._apply(deltas)
+    
+    @classmethod
+    def record_goals_completed(cls, user_ids):
+        """Count one completed goal per occurrence of a user id"""
+        deltas = defaultdict(lambda: defaultdict(int))
+        for user_id in user_ids:
+            deltas[user_id]['total_goals_completed'] += 1
+        cls._apply(deltas)
+    
+    @classmethod
+    def record_referrals(cls, referrer_ids):
+        """Count one activated referral per occurrence of a referrer id"""
+        deltas = defaultdict(lambda: defaultdict(int))
+        for referrer_id in referrer_ids:
+            deltas[referrer_id]['total_referrals'] += 1
+        cls._apply(deltas)
+    
+    @classmethod
+    def compute_totals(cls):
+        """Ground-truth ``{user_id: {field: value}}`` from grouped aggregates"""
+        totals = defaultdict(dict)
+        progress = GoalProgress.objects.values('goal__user_id').annotate(
+            deposited=Sum('amount_added', filter=Q(source='deposit')),
+            earned=Sum('amount_added', filter=Q(source='yield')),
+        ).order_by()
+        for row in progress:
+            totals[row['goal__user_id']]['total_deposited'] = row['deposited'] or Decimal('0')
+            totals[row['goal__user_id']]['total_earned'] = row['earned'] or Decimal('0')
+        
+        completed = SavingsGoal.objects.filter(status='completed').values('user_id').annotate(
+            total=Count('id')
+        ).order_by()
+        for row in completed:
+            totals[row['user_id']]['total_goals_completed'] = row['total']
+        
+        referrals = Referral.objects.filter(status__in=cls.REFERRAL_COUNTED_STATUSES).values(
+            'referrer_id'
+        ).annotate(total=Count('id')).order_by()
+        for row in referrals:
+            totals[row['referrer_id']]['total_referrals'] = row['total']
+        return totals
+    
+    @classmethod
+    def recompute(cls, batch_size=None, dry_run=False):
+        """Rewrite drifted profile totals; returns the number of profiles fixed"""
+        batch_size = batch_size or cls.RECOMPUTE_BATCH_SIZE
+        totals = cls.compute_totals()
+        empty = {'total_deposited': Decimal('0'), 'total_earned': Decimal('0'),
+                 'total_referrals': 0, 'total_goals_completed': 0}
+        
+        profiles = UserProfile.objects.only('id', 'user_id', *cls.STAT_FIELDS).order_by('pk')
+        fixed = 0
+        last_pk = 0
+        while True:
+            batch = list(profiles.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            
+            drifted = []
+            for profile in batch:
+                expected = {**empty, **totals.get(profile.user_id, {})}
+                if any(getattr(profile, field) != value for field, value in expected.items()):
+                    for field, value in expected.items():
+                        setattr(profile, field, value)
+                    drifted.append(profile)
+            if drifted and not dry_run:
+                UserProfile.objects.bulk_update(drifted, cls.STAT_FIELDS)
+                profile_stats_changed.send(sender=UserProfile, user_ids=[p.user_id for p in drifted])
+            fixed += len(drifted)
+        return fixed
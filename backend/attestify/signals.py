@@ -0,0 +1,22 @@
+"""
+Signals sent by the app, and model signal receivers connected when the app
+is ready.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .models import UserProfile
+
+# Sent with ``user_ids`` after profile totals are written with UPDATE queries,
+# which bypass post_save
+profile_stats_changed = Signal()
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def profile_visibility_changed(sender, instance, **kwargs):
+    # services imports this module for the signal above
+    from .services import LeaderboardService
+
+    # Privacy settings and display fields are baked into the cached top N
+    LeaderboardService.invalidate_top()
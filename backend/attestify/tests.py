@@ -1,3 +1,612 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .achievements import AchievementEngine
+from .events import GoalCreated, OutboxConsumer, publish, subscribe
+from .models import (
+    Achievement,
+    ActivityCounterShard,
+    CommunityActivity,
+    FeedEntry,
+    GoalMilestone,
+    GoalProgress,
+    Notification,
+    OutboxEvent,
+    Referral,
+    SavingsGoal,
+    UserFollow,
+    UserProfile,
+)
+from .services import (
+    AchievementService,
+    ProfileStatsMaterializer,
+    CommunityService,
+    NotificationService,
+    EngagementService,
+    FollowService,
+    LeaderboardService,
+    TimelineService,
+)
+
+
+def make_user(username, followers_count=0):
+    user = User.objects.create(username=username)
+    UserProfile.objects.create(
+        user=user,
+        wallet_address=f"0x{username:0>40}"[:42],
+        display_name=username.title(),
+        is_public=True,
+        followers_count=followers_count,
+    )
+    return user
+
+
+def make_activity(user, minutes_ago=0, **kwargs):
+    return CommunityActivity.objects.create(
+        user=user,
+        activity_type=kwargs.pop('activity_type', 'goal_created'),
+        title=kwargs.pop('title', f"{user.username} activity"),
+        description='',
+        created_at=timezone.now() - timedelta(minutes=minutes_ago),
+        **kwargs
+    )
+
+
+@override_settings(FEED_FANOUT_FOLLOWER_THRESHOLD=5)
+class TimelineServiceTests(TestCase):
+    def setUp(self):
+        self.reader = make_user('reader')
+        self.friend = make_user('friend')
+        self.celebrity = make_user('celebrity', followers_count=6)
+        self.stranger = make_user('stranger')
+        UserFollow.objects.create(follower=self.reader, following=self.friend)
+        UserFollow.objects.create(follower=self.reader, following=self.celebrity)
+
+    def test_fan_out_writes_author_and_follower_entries(self):
+        activity = make_activity(self.friend)
+        TimelineService.fan_out_activity(activity)
+        owners = set(FeedEntry.objects.filter(activity=activity).values_list('owner_id', flat=True))
+        self.assertEqual(owners, {self.friend.id, self.reader.id})
+
+    def test_high_fanout_author_is_not_pushed_to_followers(self):
+        activity = make_activity(self.celebrity)
+        TimelineService.fan_out_activity(activity)
+        owners = set(FeedEntry.objects.filter(activity=activity).values_list('owner_id', flat=True))
+        self.assertEqual(owners, {self.celebrity.id})
+
+    def test_private_activity_is_not_fanned_out(self):
+        activity = make_activity(self.friend, is_public=False)
+        self.assertEqual(TimelineService.fan_out_activity(activity), 0)
+        self.assertFalse(FeedEntry.objects.exists())
+
+    def test_timeline_merges_pushed_and_pulled_activities(self):
+        pushed_old = make_activity(self.friend, minutes_ago=30)
+        pulled = make_activity(self.celebrity, minutes_ago=20)
+        pushed_new = make_activity(self.friend, minutes_ago=10)
+        make_activity(self.stranger, minutes_ago=5)
+        for activity in CommunityActivity.objects.all():
+            TimelineService.fan_out_activity(activity)
+
+        activities, next_cursor = TimelineService.get_timeline(self.reader, limit=10)
+        self.assertEqual([a.id for a in activities], [pushed_new.id, pulled.id, pushed_old.id])
+        self.assertIsNone(next_cursor)
+
+    def test_timeline_cursor_pagination(self):
+        created = [make_activity(self.friend, minutes_ago=i) for i in range(5)]
+        for activity in created:
+            TimelineService.fan_out_activity(activity)
+
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        first = client.get('/api/attestify/community/following/', {'limit': 3}).json()
+        self.assertEqual([a['id'] for a in first['results']], [a.id for a in created[:3]])
+        second = client.get(
+            '/api/attestify/community/following/',
+            {'limit': 3, 'cursor': first['next_cursor']}
+        ).json()
+        self.assertEqual([a['id'] for a in second['results']], [a.id for a in created[3:]])
+        self.assertIsNone(second['next_cursor'])
+
+    def test_invalid_cursor_is_rejected(self):
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        response = client.get('/api/attestify/community/following/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+class CommunityFeedTests(TestCase):
+    url = '/api/attestify/community/feed/'
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        for i in range(25):
+            make_activity(make_user(f"member{i}"), minutes_ago=i)
+
+    def test_page_is_a_single_joined_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'limit': 20})
+        results = response.json()['results']
+        self.assertEqual(len(results), 20)
+        self.assertEqual(results[0]['user_display_name'], 'Member0')
+
+    def test_rendered_page_is_served_from_cache(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_publishing_activity_invalidates_cached_pages(self):
+        self.client.get(self.url)
+        activity = make_activity(make_user('newcomer'))
+        CommunityService.publish_activity(activity)
+        results = self.client.get(self.url).json()['results']
+        self.assertEqual(results[0]['id'], activity.id)
+
+    def test_limit_is_capped(self):
+        for i in range(30):
+            make_activity(make_user(f"extra{i}"), minutes_ago=100 + i)
+        results = self.client.get(self.url, {'limit': 1000}).json()['results']
+        self.assertEqual(len(results), 50)
+
+    def test_cursor_pages_through_feed(self):
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 10}
+            if cursor:
+                params['cursor'] = cursor
+            page = self.client.get(self.url, params).json()
+            seen.extend(item['id'] for item in page['results'])
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, list(
+            CommunityActivity.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        ))
+
+    def test_invalid_limit_and_type_are_rejected(self):
+        self.assertEqual(self.client.get(self.url, {'limit': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'type': 'nope'}).status_code, 400)
+
+
+class FollowTests(TestCase):
+    def setUp(self):
+        self.alice = make_user('alice')
+        self.bob = make_user('bob')
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+        self.url = f'/api/attestify/profiles/{self.bob.profile.wallet_address}/follow/'
+
+    def counts(self, user):
+        profile = UserProfile.objects.get(user=user)
+        return profile.followers_count, profile.following_count
+
+    def test_follow_and_unfollow_keep_counters_in_sync(self):
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['followers_count'], 1)
+        self.assertEqual(self.counts(self.alice), (0, 1))
+
+        # Following twice is idempotent
+        self.assertEqual(self.client.post(self.url).status_code, 200)
+        self.assertEqual(self.counts(self.bob), (1, 0))
+
+        self.client.delete(self.url)
+        self.client.delete(self.url)
+        self.assertEqual(self.counts(self.alice), (0, 0))
+        self.assertEqual(self.counts(self.bob), (0, 0))
+        self.assertFalse(UserFollow.objects.exists())
+
+    def test_cannot_follow_self(self):
+        url = f'/api/attestify/profiles/{self.alice.profile.wallet_address}/follow/'
+        self.assertEqual(self.client.post(url).status_code, 400)
+
+    def test_follow_backfills_and_unfollow_prunes_timeline(self):
+        activity = make_activity(self.bob)
+        FollowService.follow(self.alice, self.bob)
+        self.assertTrue(FeedEntry.objects.filter(owner=self.alice, activity=activity).exists())
+        FollowService.unfollow(self.alice, self.bob)
+        self.assertFalse(FeedEntry.objects.filter(owner=self.alice).exists())
+
+    def test_reconcile_command_repairs_drift(self):
+        UserFollow.objects.create(follower=self.alice, following=self.bob)
+        UserProfile.objects.filter(user=self.alice).update(followers_count=7)
+        out = StringIO()
+        call_command('reconcile_follow_counts', stdout=out)
+        self.assertIn('2 profile(s)', out.getvalue())
+        self.assertEqual(self.counts(self.alice), (0, 1))
+        self.assertEqual(self.counts(self.bob), (1, 0))
+
+
+class EngagementTests(TestCase):
+    def setUp(self):
+        self.author = make_user('author')
+        self.activity = make_activity(self.author)
+        self.fans = [make_user(f"fan{i}") for i in range(5)]
+
+    def test_likes_accumulate_in_shards_until_flushed(self):
+        for fan in self.fans:
+            self.assertTrue(EngagementService.like(fan, self.activity))
+        self.assertFalse(EngagementService.like(self.fans[0], self.activity))
+        EngagementService.unlike(self.fans[1], self.activity)
+
+        self.activity.refresh_from_db()
+        self.assertEqual(self.activity.likes_count, 0)
+        self.assertEqual(EngagementService.get_counts(self.activity)['likes_count'], 4)
+
+        EngagementService.flush_counters()
+        self.activity.refresh_from_db()
+        self.assertEqual(self.activity.likes_count, 4)
+        self.assertFalse(ActivityCounterShard.objects.exclude(likes_delta=0).exists())
+
+        # A second flush with nothing pending is a no-op
+        self.assertEqual(EngagementService.flush_counters(), 0)
+
+    def test_comment_endpoints(self):
+        client = APIClient()
+        client.force_authenticate(self.fans[0])
+        url = f'/api/attestify/community/activities/{self.activity.id}/comments/'
+        for i in range(3):
+            response = client.post(url, {'body': f"Nice {i}"}, format='json')
+            self.assertEqual(response.status_code, 201)
+        self.assertEqual(client.post(url, {'body': ''}, format='json').status_code, 400)
+
+        page = client.get(url, {'limit': 2}).json()
+        self.assertEqual([c['body'] for c in page['results']], ['Nice 2', 'Nice 1'])
+        self.assertEqual(len(client.get(url, {'cursor': page['next_cursor']}).json()['results']), 1)
+
+        call_command('flush_activity_counters', stdout=StringIO())
+        self.activity.refresh_from_db()
+        self.assertEqual(self.activity.comments_count, 3)
+
+    def test_like_endpoint_reports_pending_counts(self):
+        client = APIClient()
+        client.force_authenticate(self.fans[0])
+        url = f'/api/attestify/community/activities/{self.activity.id}/like/'
+        response = client.post(url)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['likes_count'], 1)
+        self.assertEqual(client.delete(url).json()['likes_count'], 0)
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = {}
+        for name, deposited, show_balance, is_public in [
+            ('whale', 500, True, True),
+            ('saver', 200, True, True),
+            ('twin', 200, True, True),
+            ('shy', 900, False, True),
+            ('hidden', 1000, True, False),
+        ]:
+            user = make_user(name)
+            UserProfile.objects.filter(user=user).update(
+                total_deposited=deposited,
+                show_balance=show_balance,
+                is_public=is_public,
+                total_referrals=deposited // 100,
+            )
+            self.users[name] = user
+
+    def test_refresh_ranks_only_eligible_profiles_with_ties(self):
+        self.assertEqual(LeaderboardService.refresh('deposited'), 3)
+        top = LeaderboardService.get_top('deposited')
+        self.assertEqual(
+            [(e['username'], e['rank']) for e in top['entries']],
+            [('whale', 1), ('saver', 2), ('twin', 2)]
+        )
+
+    def test_balance_privacy_only_applies_to_balance_boards(self):
+        LeaderboardService.refresh('referrals')
+        names = [e['username'] for e in LeaderboardService.get_top('referrals')['entries']]
+        self.assertEqual(names[0], 'shy')
+        self.assertNotIn('hidden', names)
+
+    def test_hiding_a_profile_drops_it_from_the_cached_top(self):
+        LeaderboardService.refresh('deposited')
+        profile = UserProfile.objects.get(user=self.users['whale'])
+        profile.show_balance = False
+        profile.save()
+
+        top = LeaderboardService.get_top('deposited')
+        self.assertEqual([e['username'] for e in top['entries']], ['saver', 'twin'])
+        self.assertEqual(top['total_ranked'], 2)
+
+    def test_my_rank_uses_live_score(self):
+        LeaderboardService.refresh('deposited')
+        self.assertEqual(LeaderboardService.get_rank('deposited', self.users['twin'])['rank'], 2)
+        UserProfile.objects.filter(user=self.users['twin']).update(total_deposited=600)
+        self.assertEqual(LeaderboardService.get_rank('deposited', self.users['twin'])['rank'], 1)
+        self.assertIsNone(LeaderboardService.get_rank('deposited', self.users['shy']))
+
+    def test_endpoints(self):
+        call_command('refresh_leaderboards', stdout=StringIO())
+        client = APIClient()
+        with self.assertNumQueries(0):
+            response = client.get('/api/attestify/leaderboards/deposited/', {'limit': 2})
+        self.assertEqual(len(response.json()['entries']), 2)
+        self.assertEqual(client.get('/api/attestify/leaderboards/nope/').status_code, 404)
+
+        me = client.get(
+            '/api/attestify/leaderboards/deposited/me/',
+            HTTP_X_WALLET_ADDRESS=self.users['saver'].profile.wallet_address
+        )
+        self.assertEqual(me.json()['rank'], 2)
+
+
+class AchievementEngineTests(TestCase):
+    def setUp(self):
+        self.saver = make_user('saver')
+        self.referrer = make_user('referrer')
+        self.idle = make_user('idle')
+        goal = SavingsGoal.objects.create(
+            user=self.saver,
+            wallet_address=self.saver.profile.wallet_address,
+            title='Rainy day',
+            target_amount=100,
+            created_at=timezone.now() - timedelta(days=400),
+        )
+        GoalProgress.objects.create(
+            goal=goal,
+            amount_added=50,
+            previous_amount=0,
+            new_amount=50,
+            created_at=timezone.now() - timedelta(days=200),
+        )
+        for i in range(10):
+            Referral.objects.create(
+                referrer=self.referrer,
+                referrer_wallet=self.referrer.profile.wallet_address,
+                referee_wallet=f"0xref{i}",
+                referral_code=f"CODE{i}",
+                status='active',
+            )
+
+    def awarded_types(self, user):
+        return set(Achievement.objects.filter(user=user).values_list('achievement_type', flat=True))
+
+    def test_sweep_awards_matching_rules_once(self):
+        awarded = AchievementEngine().evaluate(batch_size=2)
+        self.assertEqual(
+            self.awarded_types(self.saver),
+            {'first_deposit', 'goal_setter', 'long_term_saver'}
+        )
+        self.assertEqual(self.awarded_types(self.referrer), {'referral_master'})
+        self.assertEqual(self.awarded_types(self.idle), set())
+        self.assertEqual(awarded['first_deposit'], [self.saver.id])
+
+        # Public profiles announce new badges on the community feed
+        self.assertEqual(
+            CommunityActivity.objects.filter(activity_type='achievement_earned', user=self.saver).count(),
+            3
+        )
+
+        again = AchievementEngine().evaluate()
+        self.assertFalse(any(again.values()))
+
+    def test_sweep_queries_do_not_scale_with_users(self):
+        for i in range(20):
+            make_user(f"bystander{i}")
+        with self.assertNumQueries(9):
+            AchievementEngine(rules=[
+                rule for rule in AchievementEngine().rules.values()
+                if rule.achievement_type == 'referral_master'
+            ]).evaluate()
+
+    def test_single_user_checks_use_rules(self):
+        AchievementService.check_first_deposit(self.saver, self.saver.profile.wallet_address)
+        self.assertEqual(self.awarded_types(self.saver), {'first_deposit'})
+
+    def test_goal_completion_is_awarded_by_its_rule(self):
+        goal = SavingsGoal.objects.get(user=self.saver)
+        AchievementService.check_goal_completed(self.saver, goal)
+        self.assertFalse(Achievement.objects.exists())
+
+        SavingsGoal.objects.filter(id=goal.id).update(status='completed')
+        AchievementService.check_goal_completed(self.saver, goal)
+        AchievementService.check_goal_completed(self.saver, goal)
+
+        achievement = Achievement.objects.get(user=self.saver)
+        self.assertEqual((achievement.achievement_type, achievement.description),
+                         ('goal_completed', 'Completed a savings goal.'))
+
+
+class EventBusTests(TestCase):
+    def setUp(self):
+        self.user = make_user('depositor')
+        UserProfile.objects.filter(user=self.user).update(show_goals=True)
+        self.wallet = self.user.profile.wallet_address
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_goal(self):
+        response = self.client.post(
+            '/api/attestify/goals/',
+            {'title': 'Laptop', 'target_amount': '100', 'is_public': True},
+            format='json',
+            HTTP_X_WALLET_ADDRESS=self.wallet
+        )
+        return SavingsGoal.objects.get(id=response.json()['id'])
+
+    def test_progress_request_only_records_events(self):
+        goal = SavingsGoal.objects.create(user=self.user, wallet_address=self.wallet, title='Laptop', target_amount=100)
+        GoalMilestone.objects.create(goal=goal, title='Halfway', target_amount=50)
+
+        response = self.client.post(
+            f'/api/attestify/goals/{goal.id}/progress/',
+            {'amount_added': '100', 'transaction_hash': '0xabc'},
+            format='json',
+            HTTP_X_WALLET_ADDRESS=self.wallet
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(OutboxEvent.objects.values_list('event_type', flat=True)),
+            ['goal_progress_recorded', 'milestone_reached', 'goal_completed']
+        )
+        self.assertFalse(Notification.objects.exists())
+        self.assertFalse(Achievement.objects.exists())
+
+        call_command('run_event_worker', '--once', stdout=StringIO())
+        self.assertFalse(OutboxEvent.objects.exclude(status='processed').exists())
+        self.assertEqual(
+            set(Notification.objects.values_list('notification_type', flat=True)),
+            {'deposit_success', 'goal_milestone', 'goal_completed'}
+        )
+        self.assertEqual(
+            set(Achievement.objects.values_list('achievement_type', flat=True)),
+            {'first_deposit', 'milestone_reached', 'goal_completed'}
+        )
+
+    def test_racing_deposits_complete_a_goal_once(self):
+        goal = SavingsGoal.objects.create(user=self.user, wallet_address=self.wallet, title='Laptop', target_amount=100)
+        stale = SavingsGoal.objects.get(id=goal.id)
+
+        def deposit(amount):
+            return self.client.post(
+                f'/api/attestify/goals/{goal.id}/progress/',
+                {'amount_added': amount},
+                format='json',
+                HTTP_X_WALLET_ADDRESS=self.wallet
+            )
+
+        deposit('100')
+        # The second request loaded the goal before the first one committed
+        with mock.patch('attestify.views.get_object_or_404', return_value=stale):
+            response = deposit('50')
+
+        self.assertEqual(response.json()['current_amount'], '150.00')
+        goal.refresh_from_db()
+        self.assertEqual((goal.current_amount, goal.status), (150, 'completed'))
+        self.assertEqual(OutboxEvent.objects.filter(event_type='goal_completed').count(), 1)
+        self.assertEqual(
+            list(GoalProgress.objects.order_by('id').values_list('previous_amount', 'new_amount')),
+            [(0, 100), (100, 150)]
+        )
+
+    def test_goal_creation_is_announced_by_worker(self):
+        self.create_goal()
+        self.assertFalse(CommunityActivity.objects.exists())
+        OutboxConsumer().drain()
+        self.assertTrue(CommunityActivity.objects.filter(activity_type='goal_created').exists())
+
+    def test_failing_handler_is_retried_then_marked_failed(self):
+        calls = []
+
+        @subscribe(GoalCreated)
+        def explode(payloads):
+            calls.append(payloads)
+            raise RuntimeError('boom')
+
+        try:
+            publish(GoalCreated(goal_id=0, user_id=self.user.id))
+            consumer = OutboxConsumer()
+            with self.assertLogs('attestify.events', level='ERROR'):
+                for _ in range(OutboxConsumer.MAX_ATTEMPTS):
+                    consumer.process_batch()
+            event = OutboxEvent.objects.get()
+            self.assertEqual(event.status, 'failed')
+            self.assertEqual(event.attempts, OutboxConsumer.MAX_ATTEMPTS)
+            self.assertIn('boom', event.last_error)
+            self.assertEqual(consumer.process_batch(), 0)
+        finally:
+            from .events import _handlers
+            _handlers['goal_created'].remove(explode)
+
+
+    def test_retry_only_reruns_the_failing_handler(self):
+        calls = []
+
+        @subscribe(GoalCreated)
+        def flaky(payloads):
+            calls.append(payloads)
+            if len(calls) == 1:
+                raise RuntimeError('boom')
+
+        try:
+            self.create_goal()
+            consumer = OutboxConsumer()
+            with self.assertLogs('attestify.events', level='ERROR'):
+                consumer.process_batch()
+            consumer.process_batch()
+
+            self.assertEqual(len(calls), 2)
+            self.assertEqual(CommunityActivity.objects.filter(activity_type='goal_created').count(), 1)
+            event = OutboxEvent.objects.get()
+            self.assertEqual(event.status, 'processed')
+            self.assertIn('attestify.tests.EventBusTests.test_retry_only_reruns_the_failing_handler.<locals>.flaky',
+                          event.handled_by)
+        finally:
+            from .events import _handlers
+            _handlers['goal_created'].remove(flaky)
+
+
+class ProfileStatsTests(TestCase):
+    def setUp(self):
+        self.user = make_user('stacker')
+        self.wallet = self.user.profile.wallet_address
+        self.goal = SavingsGoal.objects.create(
+            user=self.user,
+            wallet_address=self.wallet,
+            title='Car',
+            target_amount=100
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_progress(self, amount, source='deposit'):
+        self.client.post(
+            f'/api/attestify/goals/{self.goal.id}/progress/',
+            {'amount_added': amount, 'source': source},
+            format='json'
+        )
+
+    def profile(self):
+        return UserProfile.objects.get(user=self.user)
+
+    def test_events_update_totals_incrementally(self):
+        self.add_progress('60.50')
+        self.add_progress('2.25', source='yield')
+        self.add_progress('40')
+        OutboxConsumer().drain()
+
+        profile = self.profile()
+        self.assertEqual(str(profile.total_deposited), '100.50')
+        self.assertEqual(str(profile.total_earned), '2.25')
+        self.assertEqual(profile.total_goals_completed, 1)
+
+    def test_retried_batch_does_not_count_twice(self):
+        self.add_progress('100')
+        failing = mock.patch.object(NotificationService, 'notify_goal_completed', side_effect=RuntimeError('down'))
+        with failing, self.assertLogs('attestify.events', level='ERROR'):
+            OutboxConsumer().process_batch()
+        OutboxConsumer().drain()
+
+        profile = self.profile()
+        self.assertEqual(profile.total_goals_completed, 1)
+        self.assertEqual(str(profile.total_deposited), '100.00')
+        self.assertFalse(OutboxEvent.objects.exclude(status='processed').exists())
+
+    def test_recompute_repairs_drift(self):
+        self.add_progress('100')
+        OutboxConsumer().drain()
+        UserProfile.objects.filter(user=self.user).update(total_deposited=5, total_referrals=3)
+
+        out = StringIO()
+        call_command('recompute_profile_stats', '--dry-run', stdout=out)
+        self.assertIn('Would fix stats on 1 profile(s)', out.getvalue())
+        self.assertEqual(ProfileStatsMaterializer.recompute(), 1)
+
+        profile = self.profile()
+        self.assertEqual(str(profile.total_deposited), '100.00')
+        self.assertEqual(profile.total_referrals, 0)
+        self.assertEqual(profile.total_goals_completed, 1)
+        self.assertEqual(ProfileStatsMaterializer.recompute(), 0)
@@ -26,5 +26,11 @@ urlpatterns = [
     path('profile/', views.user_profile, name='user-profile'),
     path('achievements/', views.achievements_list, name='achievements-list'),
     path('community/feed/', views.community_feed, name='community-feed'),
+    path('community/following/', views.following_feed, name='following-feed'),
+    path('community/activities/<int:activity_id>/like/', views.activity_like, name='activity-like'),
+    path('community/activities/<int:activity_id>/comments/', views.activity_comments, name='activity-comments'),
+    path('profiles/<str:target_wallet>/follow/', views.follow_user, name='follow-user'),
+    path('leaderboards/<str:board>/', views.leaderboard, name='leaderboard'),
+    path('leaderboards/<str:board>/me/', views.leaderboard_rank, name='leaderboard-rank'),
 ]
 
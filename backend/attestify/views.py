@@ -1,6 +1,8 @@
 import logging
 from decimal import Decimal
-from django.db.models import Q, Sum, Count
+from django.db.models import F, Q, Sum, Count
+from django.core.cache import cache
+from django.db import transaction
 from django.utils import timezone
 from rest_framework import status, viewsets
 from rest_framework.decorators import api_view, permission_classes, action
@@ -22,6 +24,7 @@ from .models import (
     Achievement,
     CommunityActivity,
     UserFollow,
+    ActivityComment,
 )
 from .serializers import (
     SavingsGoalSerializer,
@@ -39,6 +42,23 @@ from .serializers import (
     AchievementSerializer,
     CommunityActivitySerializer,
     UserFollowSerializer,
+    ActivityCommentSerializer,
+)
+from .services import (
+    CommunityService,
+    EngagementService,
+    FollowService,
+    LeaderboardService,
+    TimelineService,
+)
+from .pagination import decode_cursor, encode_cursor, keyset_filter, parse_page_size
+from .events import (
+    publish,
+    GoalCreated,
+    GoalProgressRecorded,
+    GoalCompleted,
+    MilestoneReached,
+    ReferralActivated,
 )
 
 logger = logging.getLogger(__name__)
@@ -86,7 +106,9 @@ def goals_list_create(request: Request) -> Response:
         
         serializer = SavingsGoalCreateSerializer(data=request.data)
         if serializer.is_valid():
-            goal = serializer.save(user=user, wallet_address=wallet_address)
+            with transaction.atomic():
+                goal = serializer.save(user=user, wallet_address=wallet_address)
+                publish(GoalCreated(goal_id=goal.id, user_id=user.id))
             return Response(
                 SavingsGoalSerializer(goal).data,
                 status=status.HTTP_201_CREATED
@@ -147,36 +169,57 @@ def update_goal_progress(request: Request, goal_id: int) -> Response:
     transaction_hash = request.data.get('transaction_hash', '')
     notes = request.data.get('notes', '')
     
-    previous_amount = goal.current_amount
-    goal.current_amount += amount_added
-    
-    # Check if goal is completed
-    if goal.current_amount >= goal.target_amount and goal.status == 'active':
-        goal.status = 'completed'
-        goal.completed_at = timezone.now()
-    
-    goal.save()
-    
-    # Create progress record
-    progress = GoalProgress.objects.create(
-        goal=goal,
-        amount_added=amount_added,
-        previous_amount=previous_amount,
-        new_amount=goal.current_amount,
-        source=source,
-        transaction_hash=transaction_hash,
-        notes=notes
-    )
-    
-    # Check milestones
-    milestones = GoalMilestone.objects.filter(
-        goal=goal,
-        achieved_at__isnull=True,
-        target_amount__lte=goal.current_amount
-    )
-    for milestone in milestones:
-        milestone.achieved_at = timezone.now()
-        milestone.save()
+    with transaction.atomic():
+        # Lock the goal so concurrent deposits are applied one after the other
+        goal = SavingsGoal.objects.select_for_update().get(pk=goal.pk)
+        goal.current_amount = F('current_amount') + amount_added
+        goal.save(update_fields=['current_amount', 'updated_at'])
+        goal.refresh_from_db(fields=['current_amount', 'status', 'completed_at'])
+        previous_amount = goal.current_amount - amount_added
+        
+        # Only the request whose update flips the status completes the goal
+        just_completed = goal.current_amount >= goal.target_amount and SavingsGoal.objects.filter(
+            pk=goal.pk, status='active'
+        ).update(status='completed', completed_at=timezone.now()) == 1
+        if just_completed:
+            goal.refresh_from_db(fields=['status', 'completed_at'])
+        
+        # Create progress record
+        progress = GoalProgress.objects.create(
+            goal=goal,
+            amount_added=amount_added,
+            previous_amount=previous_amount,
+            new_amount=goal.current_amount,
+            source=source,
+            transaction_hash=transaction_hash,
+            notes=notes
+        )
+        
+        # Check milestones
+        milestones = GoalMilestone.objects.filter(
+            goal=goal,
+            achieved_at__isnull=True,
+            target_amount__lte=goal.current_amount
+        )
+        milestone_ids = list(milestones.values_list('id', flat=True))
+        GoalMilestone.objects.filter(id__in=milestone_ids).update(achieved_at=timezone.now())
+        
+        # Side effects (notifications, achievements, feed) run in the event worker
+        events = [GoalProgressRecorded(
+            goal_id=goal.id,
+            user_id=goal.user_id,
+            progress_id=progress.id,
+            amount_added=str(amount_added),
+            source=source,
+            transaction_hash=transaction_hash
+        )]
+        events += [
+            MilestoneReached(goal_id=goal.id, user_id=goal.user_id, milestone_id=milestone_id)
+            for milestone_id in milestone_ids
+        ]
+        if just_completed:
+            events.append(GoalCompleted(goal_id=goal.id, user_id=goal.user_id))
+        publish(*events)
     
     return Response(SavingsGoalSerializer(goal).data)
 
@@ -277,10 +320,12 @@ def use_referral_code(request: Request) -> Response:
             )
         
         # Update referral
-        referral.referee_wallet = wallet_address
-        referral.status = 'active'
-        referral.activated_at = timezone.now()
-        referral.save()
+        with transaction.atomic():
+            referral.referee_wallet = wallet_address
+            referral.status = 'active'
+            referral.activated_at = timezone.now()
+            referral.save()
+            publish(ReferralActivated(referral_id=referral.id, referrer_id=referral.referrer_id))
         
         return Response(ReferralSerializer(referral).data)
     
@@ -521,14 +566,252 @@ def achievements_list(request: Request) -> Response:
 @permission_classes([AllowAny])
 def community_feed(request: Request) -> Response:
     """Get community activity feed"""
-    limit = int(request.query_params.get('limit', 20))
-    activity_type = request.query_params.get('type')
+    activity_type = request.query_params.get('type') or None
+    cursor = request.query_params.get('cursor') or None
+    
+    if activity_type and activity_type not in dict(CommunityActivity.ACTIVITY_TYPES):
+        return Response(
+            {'error': f'Unknown activity type: {activity_type}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        limit = parse_page_size(request.query_params.get('limit'))
+        position = decode_cursor(cursor)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    cache_key = CommunityService.global_feed_cache_key(activity_type, cursor, limit)
+    page = cache.get(cache_key)
+    if page is None:
+        activities, next_cursor = CommunityService.get_global_feed(
+            activity_type=activity_type,
+            position=position,
+            limit=limit
+        )
+        page = {
+            'results': CommunityActivitySerializer(activities, many=True).data,
+            'next_cursor': next_cursor,
+        }
+        cache.set(cache_key, page, CommunityService.GLOBAL_FEED_CACHE_TTL)
     
-    activities = CommunityActivity.objects.filter(is_public=True)
+    return Response(page)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def following_feed(request: Request) -> Response:
+    """Get activity from users the caller follows"""
+    wallet_address = request.headers.get('X-Wallet-Address', '').strip()
     
-    if activity_type:
-        activities = activities.filter(activity_type=activity_type)
+    if request.user.is_authenticated:
+        user = request.user
+    elif wallet_address:
+        profile = UserProfile.objects.filter(wallet_address=wallet_address).select_related('user').first()
+        if not profile:
+            return Response({'results': [], 'next_cursor': None})
+        user = profile.user
+    else:
+        return Response(
+            {'error': 'Wallet address or authentication required'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    
+    try:
+        limit = parse_page_size(request.query_params.get('limit'))
+        position = decode_cursor(request.query_params.get('cursor'))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
-    activities = activities.order_by('-created_at')[:limit]
+    activities, next_cursor = TimelineService.get_timeline(user, position=position, limit=limit)
     serializer = CommunityActivitySerializer(activities, many=True)
-    return Response(serializer.data)
+    return Response({'results': serializer.data, 'next_cursor': next_cursor})
+
+
+@api_view(['POST', 'DELETE'])
+@permission_classes([AllowAny])
+def follow_user(request: Request, target_wallet: str) -> Response:
+    """Follow (POST) or unfollow (DELETE) the user with the given wallet"""
+    wallet_address = request.headers.get('X-Wallet-Address', '').strip()
+    
+    if not wallet_address and not request.user.is_authenticated:
+        return Response(
+            {'error': 'Wallet address or authentication required'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    
+    user = request.user if request.user.is_authenticated else None
+    if not user:
+        user, _ = User.objects.get_or_create(
+            username=f"wallet_{wallet_address[:10]}",
+            defaults={'email': ''}
+        )
+    UserProfile.objects.get_or_create(
+        user=user,
+        defaults={'wallet_address': wallet_address}
+    )
+    
+    target = get_object_or_404(UserProfile.objects.select_related('user'), wallet_address=target_wallet)
+    
+    if request.method == 'POST':
+        try:
+            changed = FollowService.follow(user, target.user)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        response_status = status.HTTP_201_CREATED if changed else status.HTTP_200_OK
+        is_following = True
+    else:
+        FollowService.unfollow(user, target.user)
+        response_status = status.HTTP_200_OK
+        is_following = False
+    
+    target.refresh_from_db(fields=['followers_count', 'following_count'])
+    return Response(
+        {
+            'wallet_address': target.wallet_address,
+            'is_following': is_following,
+            'followers_count': target.followers_count,
+            'following_count': target.following_count,
+        },
+        status=response_status
+    )
+
+
+@api_view(['POST', 'DELETE'])
+@permission_classes([AllowAny])
+def activity_like(request: Request, activity_id: int) -> Response:
+    """Like (POST) or unlike (DELETE) a community activity"""
+    wallet_address = request.headers.get('X-Wallet-Address', '').strip()
+    
+    if not wallet_address and not request.user.is_authenticated:
+        return Response(
+            {'error': 'Wallet address or authentication required'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    
+    user = request.user if request.user.is_authenticated else None
+    if not user:
+        user, _ = User.objects.get_or_create(
+            username=f"wallet_{wallet_address[:10]}",
+            defaults={'email': ''}
+        )
+    
+    activity = get_object_or_404(CommunityActivity, id=activity_id, is_public=True)
+    
+    if request.method == 'POST':
+        changed = EngagementService.like(user, activity)
+        response_status = status.HTTP_201_CREATED if changed else status.HTTP_200_OK
+        liked = True
+    else:
+        EngagementService.unlike(user, activity)
+        response_status = status.HTTP_200_OK
+        liked = False
+    
+    return Response(
+        {'activity_id': activity.id, 'liked': liked, **EngagementService.get_counts(activity)},
+        status=response_status
+    )
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([AllowAny])
+def activity_comments(request: Request, activity_id: int) -> Response:
+    """List or add comments on a community activity"""
+    activity = get_object_or_404(CommunityActivity, id=activity_id, is_public=True)
+    
+    if request.method == 'GET':
+        try:
+            limit = parse_page_size(request.query_params.get('limit'))
+            position = decode_cursor(request.query_params.get('cursor'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        comments = list(
+            keyset_filter(ActivityComment.objects.filter(activity=activity), position)
+            .select_related('user', 'user__profile')
+            .order_by('-created_at', '-id')[:limit + 1]
+        )
+        next_cursor = None
+        if len(comments) > limit:
+            comments = comments[:limit]
+            next_cursor = encode_cursor(comments[-1].created_at, comments[-1].id)
+        
+        serializer = ActivityCommentSerializer(comments, many=True)
+        return Response({'results': serializer.data, 'next_cursor': next_cursor})
+    
+    elif request.method == 'POST':
+        wallet_address = request.headers.get('X-Wallet-Address', '').strip()
+        if not wallet_address and not request.user.is_authenticated:
+            return Response(
+                {'error': 'Wallet address or authentication required'},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        
+        user = request.user if request.user.is_authenticated else None
+        if not user:
+            user, _ = User.objects.get_or_create(
+                username=f"wallet_{wallet_address[:10]}",
+                defaults={'email': ''}
+            )
+        
+        serializer = ActivityCommentSerializer(data=request.data)
+        if serializer.is_valid():
+            comment = EngagementService.add_comment(user, activity, serializer.validated_data['body'])
+            return Response(
+                ActivityCommentSerializer(comment).data,
+                status=status.HTTP_201_CREATED
+            )
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def leaderboard(request: Request, board: str) -> Response:
+    """Get the top of a leaderboard"""
+    if board not in LeaderboardService.BOARDS:
+        return Response(
+            {'error': f'Unknown leaderboard: {board}'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    try:
+        limit = parse_page_size(
+            request.query_params.get('limit'),
+            default=LeaderboardService.TOP_N,
+            maximum=LeaderboardService.TOP_N
+        )
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response(LeaderboardService.get_top(board, limit=limit))
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def leaderboard_rank(request: Request, board: str) -> Response:
+    """Get the caller's rank on a leaderboard"""
+    wallet_address = request.headers.get('X-Wallet-Address', '').strip()
+    
+    if board not in LeaderboardService.BOARDS:
+        return Response(
+            {'error': f'Unknown leaderboard: {board}'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    if request.user.is_authenticated:
+        user = request.user
+    elif wallet_address:
+        user = User.objects.filter(profile__wallet_address=wallet_address).first()
+    else:
+        return Response(
+            {'error': 'Wallet address or authentication required'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    
+    rank = LeaderboardService.get_rank(board, user) if user else None
+    if rank is None:
+        return Response(
+            {'error': 'Profile is not eligible for this leaderboard'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    return Response(rank)